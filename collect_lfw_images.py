@@ -4,8 +4,6 @@
 """
 
 import os
-import shutil
-from tqdm import tqdm
 import sys
 
 def collect_lfw_images(source_dir: str, output_dir: str, max_images: int = 1000):
@@ -32,57 +30,37 @@ def collect_lfw_images(source_dir: str, output_dir: str, max_images: int = 1000)
     print(f"🎯 Цель: собрать до {max_images} изображений")
     print()
     
-    total_copied = 0
-    skipped = 0
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from src.dataset_materializer import DatasetMaterializer
+    from src.lfw_ingest import safe_person_name
     
-    # Обрабатываем каждую папку
-    for folder in tqdm(subfolders, desc="Обработка папок"):
+    # Собираем пары (источник, новое имя файла) до достижения лимита
+    items = []
+    for folder in subfolders:
         folder_path = os.path.join(source_dir, folder)
+        safe_folder = safe_person_name(folder)
         
         # Получаем все JPG файлы в папке
-        image_files = [f for f in os.listdir(folder_path) 
-                      if f.lower().endswith(('.jpg', '.jpeg'))]
-        
-        for image_file in image_files:
-            if total_copied >= max_images:
-                print(f"\n⚠️  Достигнут лимит в {max_images} изображений")
+        for image_file in os.listdir(folder_path):
+            if not image_file.lower().endswith(('.jpg', '.jpeg')):
+                continue
+            if len(items) >= max_images:
                 break
-            
-            source_path = os.path.join(folder_path, image_file)
-            
-            # Создаем уникальное имя файла
-            # Заменяем пробелы и другие символы
-            safe_folder = folder.replace(" ", "_").replace("'", "")
-            # Укорачиваем слишком длинные имена
-            if len(safe_folder) > 30:
-                safe_folder = safe_folder[:30]
-            
-            # Создаем новое имя файла
-            new_filename = f"{safe_folder}_{image_file}"
-            dest_path = os.path.join(output_dir, new_filename)
-            
-            # Если файл уже существует, добавляем номер
-            counter = 1
-            while os.path.exists(dest_path):
-                name, ext = os.path.splitext(new_filename)
-                dest_path = os.path.join(output_dir, f"{name}_{counter}{ext}")
-                counter += 1
-            
-            try:
-                # Копируем файл
-                shutil.copy2(source_path, dest_path)
-                total_copied += 1
-                
-            except Exception as e:
-                skipped += 1
-                print(f"⚠️  Ошибка копирования {source_path}: {e}")
+            items.append((os.path.join(folder_path, image_file), f"{safe_folder}_{image_file}"))
         
-        if total_copied >= max_images:
+        if len(items) >= max_images:
+            print(f"\n⚠️  Достигнут лимит в {max_images} изображений")
             break
     
+    # Совпадающие имена получают номер; файлы связываются ссылками, а не копируются
+    stats = DatasetMaterializer(output_dir).materialize(items, skip_existing=False,
+                                                        desc="Сбор изображений")
+    total_copied = stats["added"]
+    skipped = stats["failed"]
+    
     print("\n" + "=" * 60)
     print("📊 РЕЗУЛЬТАТЫ:")
-    print(f"✅ Скопировано изображений: {total_copied}")
+    print(f"✅ Собрано изображений: {total_copied}")
     print(f"⚠️  Пропущено: {skipped}")
     print(f"📁 Изображения сохранены в: {output_dir}")
     
@@ -133,6 +111,21 @@ def main():
     lfw_funneled = os.path.join(base_dir, "lfw_dataset", "lfw_funneled")
     
     if not os.path.exists(lfw_funneled):
+        # Архив, скачанный download_lfw.py, загружаем в датасет потоково без распаковки
+        info_file = os.path.join(base_dir, "lfw_dataset", "dataset_info.json")
+        if os.path.exists(info_file):
+            import json
+            sys.path.append(base_dir)
+            from src.lfw_ingest import LFWStreamIngestor
+            
+            with open(info_file, 'r') as f:
+                archive_path = json.load(f).get("archive_path")
+            if archive_path and os.path.exists(archive_path):
+                print(f"📦 Папка LFW не распакована, читаем архив: {archive_path}")
+                ingestor = LFWStreamIngestor(archive_path, max_per_person=13000, max_images=13000)
+                ingestor.ingest_to_dataset(os.path.join(base_dir, "dataset", "Unknown"))
+                return
+        
         print(f"❌ Папка LFW не найдена: {lfw_funneled}")
         print("\nСначала скачайте и распакуйте LFW датасет:")
         print("1. Запустите python download_lfw.py")
@@ -188,20 +181,15 @@ def add_to_project_dataset(source_dir: str, max_to_add: int = 13000):
     
     print(f"Добавляем {len(images_to_add)} изображений в {unknown_dir}")
     
-    added = 0
-    for image in tqdm(images_to_add, desc="Добавление в проект"):
-        source_path = os.path.join(source_dir, image)
-        dest_path = os.path.join(unknown_dir, f"lfw_{image}")
-        
-        # Если файл уже существует, пропускаем
-        if os.path.exists(dest_path):
-            continue
-        
-        try:
-            shutil.copy2(source_path, dest_path)
-            added += 1
-        except Exception as e:
-            print(f"⚠️  Ошибка копирования {image}: {e}")
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from src.dataset_materializer import DatasetMaterializer
+    
+    # Уже добавленные файлы пропускаются по списку имен папки, без stat на каждый файл
+    stats = DatasetMaterializer(unknown_dir).materialize(
+        [(os.path.join(source_dir, image), f"lfw_{image}") for image in images_to_add],
+        desc="Добавление в проект"
+    )
+    added = stats["added"]
     
     print(f"✅ Добавлено {added} новых изображений в датасет проекта")
 
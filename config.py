@@ -10,8 +10,19 @@ class Config:
     
     # Файлы моделей
     EMBEDDINGS_FILE = os.path.join(MODELS_DIR, "embeddings.pkl")
+    LFW_EMBEDDINGS_FILE = os.path.join(MODELS_DIR, "lfw_embeddings.pkl")  # Негативы из архива LFW
     CLASSIFIER_FILE = os.path.join(MODELS_DIR, "classifier.pkl")
     CENTROIDS_FILE = os.path.join(MODELS_DIR, "centroids.pkl")
+    MODEL_VERSION_FILE = os.path.join(MODELS_DIR, "model_version.json")
+    LABELS_FILE = os.path.join(MODELS_DIR, "labels.json")
+    DATASET_CATALOG_FILE = os.path.join(MODELS_DIR, "dataset_catalog.json")  # Кэш списков файлов датасета
+    DATASET_QUALITY_FILE = os.path.join(MODELS_DIR, "dataset_quality.json")  # Кэш лиц и метрик качества фото
+    CHIP_CACHE_FILE = os.path.join(MODELS_DIR, "face_chips.u8")  # Выровненные вырезки лиц датасета (memmap)
+    CHIP_CACHE_INDEX = os.path.join(MODELS_DIR, "face_chips.json")  # Индекс вырезок: фото -> строка файла
+    DETECTIONS_FILE = os.path.join(RESULTS_DIR, "detections.jsonl")  # Распознавания по изображениям (JSON Lines)
+    RESULT_CACHE_FILE = os.path.join(MODELS_DIR, "result_cache.pkl")  # Кэш результатов по хэшу содержимого файла
+    ENCODING_ARCHIVE_DIR = os.path.join(RESULTS_DIR, "encodings")  # Эмбеддинги лиц обработанных изображений
+    MODEL_POLL_INTERVAL = 1.0  # Как часто (сек) проверять публикацию новой версии модели
     
     # Настройки распознавания
     DISTANCE_THRESHOLD = 0.6
@@ -19,29 +30,101 @@ class Config:
     SCALE_FACTOR = 0.25  # Используется для уменьшения разрешения при обработке
     
     # Настройки производительности
+    ENCODING_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Процессов для извлечения эмбеддингов
+    RECOGNITION_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # Процессов пула распознавания (0 - без пула)
+    PIPELINE_READERS = 2  # Потоков чтения/декодирования при пакетной обработке
+    PIPELINE_WORKERS = 1  # Потоков распознавания без пула процессов
+    PIPELINE_WRITERS = 2  # Потоков кодирования/записи результатов
+    PIPELINE_QUEUE_DEPTH = 8  # Глубина очередей между стадиями конвейера
+    PIPELINE_BATCH_SIZE = 8  # Изображений в одном пакете распознавания (без пула процессов)
+    ENCODING_BATCH_SIZE = 64  # Лиц в одном вызове сети дескрипторов dlib
+    TRAIN_NUM_JITTERS = 0  # Случайных искажений вырезки лица при обучении (0 - без них; распознавание всегда без них)
+    TRAIN_AUGMENT_FLIP = False  # При обучении также кодировать зеркальную вырезку и усреднять эмбеддинги
+    TRAIN_AUGMENT_UNKNOWN = False  # Применять искажения и к папке Unknown (иначе только к известным людям)
+    CHIP_CACHE_ENABLED = True  # Кэшировать выровненные вырезки лиц датасета для переобучения
+    LANDMARK_MODEL = "small"  # Ключевые точки лица: small (5 точек, быстрее) или large (68 точек)
+    DRAW_LANDMARKS = False  # Рисовать ключевые точки лиц поверх рамок
+    MATERIALIZE_MODE = "auto"  # Наполнение датасета: auto (link -> reflink -> copy), link, reflink, copy
+    MATERIALIZE_WORKERS = 8  # Потоков для связывания/копирования файлов датасета
     PROCESS_EVERY_N_FRAMES = 3  # Обрабатывать каждый N-й кадр (для пропуска кадров)
     CAMERA_WIDTH = 580  # Ширина камеры (меньше = быстрее)
     CAMERA_HEIGHT = 580  # Высота камеры
     CACHE_RESULTS_FRAMES = 5  # Кэшировать результаты на N кадров
     GUI_UPDATE_INTERVAL = 0.033  # Интервал обновления GUI (30 FPS)
+    UI_LOG_MAX_LINES = 1000  # Максимум строк в логах GUI
     
-    # Настройки датасета
+    # Адаптивный пропуск кадров (подстраивает шаг обработки и масштаб на лету)
+    ADAPTIVE_FRAME_SKIP = True  # False - использовать статичный PROCESS_EVERY_N_FRAMES
+    TARGET_FPS = 30  # Целевой FPS видеопотока
+    RECOGNITION_CPU_BUDGET = 0.5  # Доля времени кадра, которую можно тратить на распознавание
+    ADAPTIVE_MIN_STRIDE = 1  # Минимальный шаг обработки (при сильном движении)
+    ADAPTIVE_MAX_STRIDE = 60  # Максимальный шаг обработки (на статичной сцене)
+    ADAPTIVE_MIN_SCALE = 0.15  # Минимальный масштаб детекции при нехватке CPU
+    
+    # Детекция только при движении в кадре
+    MOTION_GATED_DETECTION = True  # Пропускать детекцию на статичных кадрах
+    MOTION_BACKGROUND_ALPHA = 0.05  # Скорость обновления фоновой модели
+    MOTION_MIN_REGION_AREA = 16  # Минимальная площадь области изменений (пикс. уменьшенного кадра)
+    MOTION_REGION_MARGIN = 0.5  # Расширение области изменений (доля ее размера)
+    MOTION_FULL_SCAN_FRAMES = 150  # Полная детекция не реже, чем раз в N кадров
+    MOTION_PIXEL_THRESHOLD = 25  # Порог изменения яркости пикселя для движения
+    MOTION_IDLE_THRESHOLD = 0.002  # Доля изменившихся пикселей: ниже - сцена статична
+    MOTION_ACTIVE_THRESHOLD = 0.02  # Доля изменившихся пикселей: выше - активное движение
+    
+    # Повторная детекция вокруг лиц, найденных на предыдущем кадре
+    TRACK_HINTS_ENABLED = True  # Искать известные лица только в их окрестности
+    TRACK_WINDOW_MARGIN = 0.6  # Расширение окна поиска (доля размера лица)
+    TRACK_SCALE_TOLERANCE = 0.3  # Допустимое изменение размера лица между кадрами
+    TRACK_FULL_SCAN_INTERVAL = 10  # Полное сканирование кадра каждые N детекций с подсказками
+    
+    # Настройки датасета (начальные метки; остальные люди регистрируются
+    # автоматически по папкам DATASET_DIR в models/labels.json)
     LABELS = {
         0: "Aleksander",
         1: "Egor",
         -1: "Unknown"
     }
     
+    # Проверка качества фото датасета
+    QUALITY_GATES_ENABLED = False  # Не обучаться на мелких/размытых/повернутых лицах и фото с несколькими лицами
+    QUALITY_MIN_FACE_SIZE = 40  # Минимальная сторона лица (пикселей)
+    QUALITY_BLUR_THRESHOLD = 60.0  # Минимальная резкость лица (дисперсия лапласиана)
+    QUALITY_DOMINANT_FACE_RATIO = 2.0  # Во сколько раз главное лицо должно быть больше остальных
+    QUALITY_MAX_YAW = 0.35  # Максимальный поворот головы (смещение носа в долях межглазного расстояния)
+    QUALITY_MAX_ROLL = 25.0  # Максимальный наклон головы (градусов)
+    CAPTURE_CHECK_INTERVAL = 0.5  # Как часто (сек) проверять кадр для авто-снимка
+    DUPLICATE_MAX_DISTANCE = 6  # Порог расстояния Хэмминга dHash для почти одинаковых фото
+    
+    # Захват фото без окна (src/headless_capture.py)
+    CAPTURE_HEADLESS = False  # Всегда захватывать без окна (в Linux без DISPLAY - автоматически)
+    CAPTURE_DIVERSITY_DISTANCE = 0.15  # Минимальное расстояние эмбеддинга до уже сохраненных кадров
+    CAPTURE_TIMEOUT = 60.0  # Максимальное время захвата (сек)
+    CAPTURE_JPEG_QUALITY = 95  # Качество JPEG сохраняемых снимков
+    
     # Настройки GUI
     WINDOW_SIZE = "1300x800"
     THEME = "dark-blue"
     
     # Поддерживаемые форматы
     IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+    DATASET_EXTENSIONS = (".jpg", ".jpeg", ".png")  # Форматы фото в датасете
     VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
     
+    # Сохранение результатов обработки изображений
+    RESULT_OUTPUT_MODE = "full"  # results (только JSON), thumbnail, crops (вырезки лиц), full (размеченная копия)
+    RESULT_JPEG_QUALITY = 90  # Качество JPEG сохраняемых результатов
+    RESULT_THUMBNAIL_SIZE = 320  # Большая сторона миниатюры (пикселей)
+    RESULT_CROP_MARGIN = 0.2  # Отступ вокруг лица при вырезке (доля размера лица)
+    RESULT_CACHE_ENABLED = True  # Не распознавать повторно уже обработанные файлы
+    RESULT_CACHE_SIZE = 20000  # Максимум изображений в кэше результатов
+    RESULT_CACHE_SAVE_INTERVAL = 30.0  # Как часто (сек) сохранять кэш при обработке по одному файлу
+    ENCODING_ARCHIVE_ENABLED = True  # Сохранять эмбеддинги лиц для пересчета результатов после переобучения
+    ENCODING_ARCHIVE_SEGMENT = 50000  # Лиц в одном сегменте архива эмбеддингов
+    ENCODING_ARCHIVE_FLUSH_INTERVAL = 60.0  # Как часто (сек) записывать неполный сегмент при обработке по одному файлу
+    
     # Настройки автообработки
     AUTO_PROCESS_INTERVAL = 5  # секунд
+    UPLOADS_ARCHIVE_MODE = "move"  # move - переносить в uploads/processed, delete - удалять после обработки
     
     @staticmethod
     def setup_directories():
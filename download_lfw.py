@@ -5,36 +5,20 @@
 
 import sys
 import os
-import tarfile
-import shutil
+import argparse
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import kagglehub
 from src.dataset_utils import DatasetManager
 
-def extract_tar_gz(tar_path, extract_to):
-    """Распаковка .tgz архива"""
-    print(f"📦 Распаковка {tar_path}...")
-    try:
-        with tarfile.open(tar_path, 'r:gz') as tar:
-            # Считаем общее количество файлов для прогресс-бара
-            members = tar.getmembers()
-            total = len(members)
-            print(f"  Найдено {total} файлов в архиве")
-            
-            # Распаковываем
-            for i, member in enumerate(members, 1):
-                tar.extract(member, path=extract_to)
-                if i % 1000 == 0:
-                    print(f"  Распаковано {i}/{total} файлов")
-            
-        print(f"✅ Архив распакован в {extract_to}")
-        return True
-    except Exception as e:
-        print(f"❌ Ошибка распаковки: {e}")
-        return False
-
 def main():
+    parser = argparse.ArgumentParser(description="Скачивание LFW и добавление в проект")
+    parser.add_argument("--embeddings", action="store_true",
+                        help="извлечь эмбеддинги прямо из архива, не записывая изображения")
+    parser.add_argument("--max-per-person", type=int, default=10,
+                        help="максимум фото от одного человека")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Скачивание LFW (Labeled Faces in the Wild) датасета")
     print("=" * 60)
@@ -76,68 +60,31 @@ def main():
     size_mb = os.path.getsize(tar_file) / (1024*1024)
     print(f"   Размер: {size_mb:.1f} MB")
     
-    # 3. Распаковываем архив
-    print("\n3. Распаковка архива...")
-    
-    # Создаем папку для распаковки
-    extract_dir = os.path.join(os.path.dirname(__file__), "lfw_dataset")
-    os.makedirs(extract_dir, exist_ok=True)
-    
-    if extract_tar_gz(tar_file, extract_dir):
-        # 4. Ищем распакованную папку lfw_funneled
-        print("\n4. Поиск распакованной папки...")
-        
-        lfw_folder = None
-        for root, dirs, files in os.walk(extract_dir):
-            if "lfw_funneled" in dirs:
-                lfw_folder = os.path.join(root, "lfw_funneled")
-                break
-        
-        if lfw_folder and os.path.exists(lfw_folder):
-            print(f"✅ Найдена папка с изображениями: {lfw_folder}")
-            
-            # Подсчитываем количество людей
-            person_count = len([d for d in os.listdir(lfw_folder) 
-                              if os.path.isdir(os.path.join(lfw_folder, d))])
-            print(f"   Людей в датасете: {person_count}")
-            
-            # Подсчитываем общее количество фото
-            total_photos = 0
-            for person in os.listdir(lfw_folder)[:5]:  # Проверяем первые 5
-                person_path = os.path.join(lfw_folder, person)
-                if os.path.isdir(person_path):
-                    photos = len([f for f in os.listdir(person_path) 
-                                if f.lower().endswith('.jpg')])
-                    total_photos += photos
-                    if person_count <= 5:  # Показываем только если людей мало
-                        print(f"   {person}: {photos} фото")
-            
-            if person_count > 5:
-                print(f"   ... и еще {person_count-5} человек")
-            
-        else:
-            print("❌ Папка lfw_funneled не найдена после распаковки")
-            print("Содержимое распакованной папки:")
-            for item in os.listdir(extract_dir)[:10]:
-                print(f"  {item}")
-            return
-    else:
+    # 3а. Режим эмбеддингов: изображения декодируются в памяти и сразу кодируются
+    if args.embeddings:
+        print("\n3. Извлечение эмбеддингов напрямую из архива...")
+        from src.lfw_ingest import LFWStreamIngestor
+        ingestor = LFWStreamIngestor(tar_file, max_per_person=args.max_per_person)
+        ingestor.ingest_embeddings()
+        print("\nЭмбеддинги будут учтены при следующем обучении модели")
         return
     
-    # 5. Добавляем датасет в проект
-    print("\n5. Добавление лиц в папку 'Unknown'...")
+    # 3. Потоково загружаем изображения из архива сразу в датасет
+    #    (без распаковки и промежуточных копий, с продолжением после прерывания)
+    print("\n3. Добавление лиц в папку 'Unknown' напрямую из архива...")
+    manager = DatasetManager()
     try:
-        manager = DatasetManager()
-        # Добавляем только 10 фото от каждого человека (чтобы не перегружать)
-        added = manager.add_lfw_dataset(lfw_folder, max_per_person=10)
-        print(f"✅ Добавлено примерно {added} фото из LFW датасета!")
+        # По умолчанию только 10 фото от каждого человека (чтобы не перегружать)
+        added = manager.add_lfw_archive(tar_file, max_per_person=args.max_per_person)
+        print(f"✅ Добавлено {added} фото из LFW датасета!")
     except Exception as e:
         print(f"❌ Ошибка добавления: {e}")
         import traceback
         traceback.print_exc()
+        return
     
-    # 6. Показываем статистику
-    print("\n6. Обновление статистики...")
+    # 4. Показываем статистику
+    print("\n4. Обновление статистики...")
     try:
         stats = manager.get_dataset_stats()
         print("\nТекущая статистика датасета:")
@@ -163,15 +110,15 @@ def main():
     print("2. Нажмите 'Обновить модель' в GUI")
     print("=" * 60)
     
-    # Сохраняем путь к датасету для будущего использования
+    # Сохраняем путь к архиву для будущего использования
     dataset_info = {
-        "lfw_path": lfw_folder,
-        "extracted_dir": extract_dir,
         "archive_path": tar_file,
         "downloaded_at": os.path.getmtime(tar_file)
     }
     
-    info_file = os.path.join(extract_dir, "dataset_info.json")
+    info_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lfw_dataset")
+    os.makedirs(info_dir, exist_ok=True)
+    info_file = os.path.join(info_dir, "dataset_info.json")
     import json
     with open(info_file, 'w') as f:
         json.dump(dataset_info, f, indent=2)
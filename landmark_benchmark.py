@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Сравнение моделей ключевых точек лица (5 и 68 точек)
+
+Для фото датасета с известной рамкой лица (из кэша проверки качества)
+замеряется время ключевых точек и извлечения эмбеддингов для каждой модели,
+насколько отличаются эмбеддинги и совпадают ли результаты сопоставления
+с текущей моделью (и с именем папки человека).
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+
+def load_samples(limit: int) -> List[Tuple[str, str, np.ndarray, Tuple[int, int, int, int]]]:
+    """Фото датасета с хорошим качеством: (человек, путь, изображение RGB, рамка лица)"""
+    import face_recognition
+    from src.dataset_catalog import DatasetCatalog
+    from src.dataset_validator import DatasetValidator, STATUS_OK
+
+    catalog = DatasetCatalog()
+    paths = [(person, path) for person in catalog.people() for path in catalog.files(person)]
+    # Равномерная выборка по всему датасету
+    if len(paths) > limit:
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, limit).astype(int)]
+    quality = DatasetValidator().validate([path for _, path in paths])
+
+    samples = []
+    for person, path in paths:
+        record = quality.get(path)
+        if record is None or record["status"] != STATUS_OK:
+            continue
+        samples.append((person, path, face_recognition.load_image_file(path), tuple(record["faces"][0])))
+    return samples
+
+
+def measure(model: str, samples: List[Tuple[str, str, np.ndarray, Tuple[int, int, int, int]]]) -> Dict[str, object]:
+    """Время ключевых точек и эмбеддингов для одной модели"""
+    from src.batch_encoder import BatchEncoder
+
+    encoder = BatchEncoder(landmark_model=model)
+    started = time.perf_counter()
+    landmarks = [encoder.landmarks(image, [box]) for _, _, image, box in samples]
+    landmark_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chips = []
+    for (_, _, image, box), points in zip(samples, landmarks):
+        image_chips, _ = encoder.align(image, [box], landmarks=points)
+        chips.extend(image_chips)
+    align_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    encodings = encoder.encode_chips(chips)
+    encode_time = time.perf_counter() - started
+
+    count = max(len(samples), 1)
+    return {
+        "landmarks_ms": landmark_time / count * 1000,
+        "align_ms": align_time / count * 1000,
+        "encode_ms": encode_time / count * 1000,
+        "encodings": encodings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение моделей ключевых точек лица")
+    parser.add_argument("--limit", type=int, default=200, help="сколько фото датасета использовать")
+    parser.add_argument("--svm", action="store_true", help="сопоставлять SVM-классификатором")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("МОДЕЛИ КЛЮЧЕВЫХ ТОЧЕК")
+    print("=" * 60)
+
+    samples = load_samples(args.limit)
+    if not samples:
+        print("❌ В датасете нет фото с хорошим качеством")
+        sys.exit(1)
+    print(f"📷 Фото: {len(samples)}")
+
+    results = {model: measure(model, samples) for model in ("small", "large")}
+    print(f"\n{'модель':8} {'точки, мс':>10} {'выравн., мс':>12} {'эмбеддинг, мс':>14}")
+    for model, result in results.items():
+        print(f"{model:8} {result['landmarks_ms']:10.2f} {result['align_ms']:12.2f} {result['encode_ms']:14.2f}")
+
+    difference = np.linalg.norm(results["small"]["encodings"] - results["large"]["encodings"], axis=1)
+    print(f"\n📏 Расстояние между эмбеддингами small/large: "
+          f"среднее {difference.mean():.3f}, максимум {difference.max():.3f} "
+          f"(порог распознавания {Config.DISTANCE_THRESHOLD})")
+
+    from src.model_registry import ModelRegistry
+    snapshot = ModelRegistry().load_snapshot(use_svm=args.svm)
+    if not snapshot.centroids:
+        print("⚠️  Модель не обучена - сравнение результатов пропущено")
+        return
+
+    names = {}
+    for model, result in results.items():
+        labels, _, _ = snapshot.score(result["encodings"], use_svm=args.svm and snapshot.classifier is not None,
+                                      threshold=Config.DISTANCE_THRESHOLD)
+        names[model] = [snapshot.label_name(int(label)) for label in labels]
+        correct = sum(name == person for name, (person, _, _, _) in zip(names[model], samples))
+        print(f"🎯 {model}: совпадает с папкой {correct}/{len(samples)} ({correct / len(samples):.1%})")
+    agreement = sum(a == b for a, b in zip(names["small"], names["large"]))
+    print(f"🤝 Одинаковый результат у обеих моделей: {agreement}/{len(samples)} "
+          f"({agreement / len(samples):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,6 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
-from src.gui_app import FaceRecognitionApp
 
 def main():
     """Главная функция"""
@@ -27,13 +26,14 @@ def main():
     print("\n📊 Статистика датасета:")
     dataset_stats = {}
     
-    for person in ["Aleksander", "Egor"]:
-        person_dir = os.path.join(Config.DATASET_DIR, person)
-        if os.path.exists(person_dir):
-            photos = [f for f in os.listdir(person_dir) 
-                     if f.lower().endswith(('.jpg', '.png', '.jpeg'))]
-            dataset_stats[person] = len(photos)
-            print(f"  {person}: {len(photos)} фото")
+    from src.label_registry import LabelRegistry
+    from src.dataset_catalog import DatasetCatalog
+    catalog = DatasetCatalog()
+    existing = set(catalog.people())
+    for person in LabelRegistry().names(include_unknown=False):
+        if person in existing:
+            dataset_stats[person] = catalog.count(person)
+            print(f"  {person}: {dataset_stats[person]} фото")
         else:
             dataset_stats[person] = 0
             print(f"  {person}: 0 фото (папка не найдена)")
@@ -55,7 +55,9 @@ def main():
     
     print("\n🚀 Запуск графического интерфейса...")
     
-    # Запуск GUI
+    # Запуск GUI (модули интерфейса импортируются только здесь, модель
+    # распознавания загружается в фоне уже после появления окна)
+    from src.gui_app import FaceRecognitionApp
     app = FaceRecognitionApp()
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
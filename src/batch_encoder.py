@@ -0,0 +1,227 @@
+import math
+import threading
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+# Параметры выравнивания, с которыми обучена сеть дескрипторов dlib
+CHIP_SIZE = 150
+CHIP_PADDING = 0.25
+
+# Модели ключевых точек: название -> число точек
+LANDMARK_MODELS = {"small": 5, "large": 68}
+
+
+def load_pose_predictor(model: Optional[str] = None) -> object:
+    """
+    Предиктор ключевых точек dlib
+
+    Args:
+        model: small (5 точек: углы глаз и основание носа) или large (68 точек),
+               по умолчанию Config.LANDMARK_MODEL
+    """
+    import face_recognition.api as face_api
+    from config import Config
+
+    model = model or Config.LANDMARK_MODEL
+    if model == "small":
+        return face_api.pose_predictor_5_point
+    if model == "large":
+        return face_api.pose_predictor_68_point
+    raise ValueError(f"Неизвестная модель ключевых точек: {model}")
+
+
+def face_landmarks(rgb_image: np.ndarray, locations: Sequence[Tuple[int, int, int, int]],
+                   predictor: Optional[object] = None) -> np.ndarray:
+    """
+    Ключевые точки лиц по рамкам (top, right, bottom, left)
+
+    Returns:
+        np.ndarray: Координаты (k, число точек, 2) в пикселях изображения
+    """
+    import dlib
+
+    predictor = predictor or load_pose_predictor()
+    if not len(locations):
+        return np.empty((0, 0, 2), dtype=np.float32)
+    points = [
+        [(part.x, part.y) for part in predictor(rgb_image, dlib.rectangle(left, top, right, bottom)).parts()]
+        for top, right, bottom, left in locations
+    ]
+    return np.array(points, dtype=np.float32)
+
+
+def head_pose(points: np.ndarray) -> Tuple[float, float]:
+    """
+    Грубая оценка поворота головы по ключевым точкам (5 или 68)
+
+    Returns:
+        tuple: (рыскание - смещение носа от середины глаз в долях межглазного
+               расстояния, 0 для анфаса; крен - наклон линии глаз в градусах)
+    """
+    if len(points) == 68:
+        eye_a, eye_b, nose = points[36:42].mean(axis=0), points[42:48].mean(axis=0), points[30]
+    else:
+        eye_a, eye_b, nose = points[0:2].mean(axis=0), points[2:4].mean(axis=0), points[4]
+    if eye_a[0] > eye_b[0]:
+        eye_a, eye_b = eye_b, eye_a
+
+    direction = eye_b - eye_a
+    distance = float(np.hypot(direction[0], direction[1]))
+    if distance == 0:
+        return 0.0, 0.0
+    roll = math.degrees(math.atan2(direction[1], direction[0]))
+    yaw = float(np.dot(nose - (eye_a + eye_b) / 2, direction / distance)) / distance
+    return yaw, roll
+
+
+class BatchEncoder:
+    """
+    Пакетное извлечение эмбеддингов лиц
+
+    face_recognition.face_encodings вызывает сеть дескрипторов dlib отдельно
+    для каждого лица. Здесь те же шаги выполняются раздельно: ключевые точки
+    (shape_predictor) -> выровненная вырезка 150x150 (get_face_chips) ->
+    один вызов compute_face_descriptor на пакет вырезок, собранных с любого
+    числа изображений.
+
+    Ключевые точки считаются один раз и возвращаются вместе с эмбеддингами
+    (для отрисовки и оценки позы); уже известные точки (например, из кэша
+    проверки качества) можно передать, чтобы не считать их повторно.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, landmark_model: Optional[str] = None):
+        """
+        Args:
+            batch_size: Вырезок в одном вызове сети (по умолчанию Config.ENCODING_BATCH_SIZE)
+            landmark_model: small или large (по умолчанию Config.LANDMARK_MODEL)
+        """
+        import dlib
+        import face_recognition.api as face_api
+        from config import Config
+        self.config = Config
+        self.dlib = dlib
+        self.batch_size = batch_size or Config.ENCODING_BATCH_SIZE
+        self.landmark_model = landmark_model or Config.LANDMARK_MODEL
+        self.num_points = LANDMARK_MODELS[self.landmark_model]
+        self.pose_predictor = load_pose_predictor(self.landmark_model)
+        self.face_encoder = face_api.face_encoder
+        # Сеть dlib хранит промежуточные тензоры - один вызов за раз
+        self._lock = threading.Lock()
+
+    def landmarks(self, rgb_image: np.ndarray,
+                  locations: Sequence[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Ключевые точки лиц (k, число точек, 2) по рамкам (top, right, bottom, left)"""
+        return face_landmarks(rgb_image, locations, self.pose_predictor)
+
+    def align(self, rgb_image: np.ndarray, locations: Sequence[Tuple[int, int, int, int]],
+              landmarks: Optional[Sequence[Optional[np.ndarray]]] = None) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Выровненные вырезки лиц 150x150 (RGB, uint8)
+
+        Args:
+            landmarks: Уже известные точки лиц (None или точки другой модели - считаются заново)
+
+        Returns:
+            tuple: (вырезки, ключевые точки (k, число точек, 2))
+        """
+        if not len(locations):
+            return [], np.empty((0, self.num_points, 2), dtype=np.float32)
+
+        known = list(landmarks) if landmarks is not None else [None] * len(locations)
+        missing = [i for i, points in enumerate(known)
+                   if points is None or len(points) != self.num_points]
+        if missing:
+            computed = self.landmarks(rgb_image, [locations[i] for i in missing])
+            for i, points in zip(missing, computed):
+                known[i] = points
+        points = np.array(known, dtype=np.float32).reshape(len(locations), self.num_points, 2)
+
+        shapes = self.dlib.full_object_detections()
+        for (top, right, bottom, left), face_points in zip(locations, points):
+            shapes.append(self.dlib.full_object_detection(
+                self.dlib.rectangle(left, top, right, bottom),
+                [self.dlib.point(int(x), int(y)) for x, y in face_points]
+            ))
+        chips = list(self.dlib.get_face_chips(rgb_image, shapes, size=CHIP_SIZE, padding=CHIP_PADDING))
+        return chips, points
+
+    def encode_chips(self, chips: Sequence[np.ndarray], num_jitters: int = 0) -> np.ndarray:
+        """
+        Эмбеддинги выровненных вырезок
+
+        Returns:
+            np.ndarray: Матрица (N, 128)
+        """
+        if not len(chips):
+            return np.empty((0, 128))
+        parts: List[np.ndarray] = []
+        for start in range(0, len(chips), self.batch_size):
+            batch = [np.ascontiguousarray(chip, dtype=np.uint8) for chip in chips[start:start + self.batch_size]]
+            with self._lock:
+                descriptors = self.face_encoder.compute_face_descriptor(batch, num_jitters)
+            parts.append(np.array([np.array(descriptor) for descriptor in descriptors]))
+        return np.concatenate(parts)
+
+    def encode_augmented(self, chips: Sequence[np.ndarray], num_jitters: int = 0,
+                         flip: bool = False) -> np.ndarray:
+        """
+        Эмбеддинги вырезок, усредненные по искажениям (для обучения)
+
+        Args:
+            num_jitters: Случайных сдвигов/поворотов/масштабов вырезки
+                         (дескрипторы усредняет сама сеть dlib)
+            flip: Дополнительно кодировать зеркальную вырезку и усреднять с исходной
+
+        Returns:
+            np.ndarray: Матрица (N, 128)
+        """
+        if not flip or not len(chips):
+            return self.encode_chips(chips, num_jitters)
+        mirrored = [np.ascontiguousarray(chip[:, ::-1]) for chip in chips]
+        encodings = self.encode_chips(list(chips) + mirrored, num_jitters)
+        return (encodings[:len(chips)] + encodings[len(chips):]) / 2
+
+    def encode(self, rgb_image: np.ndarray, locations: Sequence[Tuple[int, int, int, int]],
+               num_jitters: int = 0, landmarks: Optional[Sequence[Optional[np.ndarray]]] = None
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Эмбеддинги всех лиц изображения одним вызовом сети
+
+        Returns:
+            tuple: (эмбеддинги (k, 128), ключевые точки (k, число точек, 2))
+        """
+        chips, points = self.align(rgb_image, locations, landmarks)
+        return self.encode_chips(chips, num_jitters), points
+
+    def encode_many(self, items: Sequence[Tuple], num_jitters: int = 0) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Эмбеддинги лиц нескольких изображений общими пакетами
+
+        Args:
+            items: (изображение RGB, рамки лиц) или (изображение RGB, рамки лиц, известные точки)
+
+        Returns:
+            list: (эмбеддинги (k, 128), ключевые точки) для каждого изображения
+        """
+        chips: List[np.ndarray] = []
+        points: List[np.ndarray] = []
+        counts: List[int] = []
+        for item in items:
+            image_chips, image_points = self.align(*item)
+            chips.extend(image_chips)
+            points.append(image_points)
+            counts.append(len(image_chips))
+
+        if not counts:
+            return []
+        encodings = np.split(self.encode_chips(chips, num_jitters), np.cumsum(counts)[:-1])
+        return list(zip(encodings, points))
+
+
+def encode_augmented_chips(chips: np.ndarray, num_jitters: int = 0, flip: bool = False) -> np.ndarray:
+    """
+    Усредненные по искажениям эмбеддинги вырезок (k, 150, 150, 3)
+
+    Выполняется в процессах пула при обучении.
+    """
+    return BatchEncoder().encode_augmented(chips, num_jitters, flip)
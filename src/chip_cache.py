@@ -0,0 +1,172 @@
+import os
+import json
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ChipCache:
+    """
+    Кэш выровненных вырезок лиц датасета
+
+    Вырезки 150x150 (RGB, uint8) хранятся подряд в одном файле, который
+    открывается через np.memmap; индекс (JSON) связывает фото датасета со
+    строкой файла и хранит mtime/размер фото и модель ключевых точек.
+    Вырезка строится один раз на фото, повторное обучение (другие jitter,
+    аугментации, кодировщик) читает готовые вырезки без декодирования,
+    детекции и выравнивания. Вырезки измененных фото дописываются в конец,
+    старые строки удаляются при сжатии (compact).
+    """
+
+    def __init__(self, data_file: Optional[str] = None, index_file: Optional[str] = None):
+        """
+        Args:
+            data_file: Файл вырезок (по умолчанию Config.CHIP_CACHE_FILE)
+            index_file: Файл индекса (по умолчанию Config.CHIP_CACHE_INDEX)
+        """
+        from config import Config
+        from src.batch_encoder import CHIP_SIZE
+        self.config = Config
+        self.data_file = data_file or Config.CHIP_CACHE_FILE
+        self.index_file = index_file or Config.CHIP_CACHE_INDEX
+        self.chip_shape = (CHIP_SIZE, CHIP_SIZE, 3)
+        self.chip_bytes = int(np.prod(self.chip_shape))
+        self.count = 0
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._chips: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Загрузка индекса; лишние строки после сбоя записи отрезаются"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                self.count, self.entries = int(index["count"]), index["entries"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Не удалось прочитать индекс вырезок лиц: {e}")
+                self.count, self.entries = 0, {}
+
+        expected = self.count * self.chip_bytes
+        size = os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+        if size < expected:
+            # Файла вырезок нет или он короче индекса - начинаем заново
+            self.count, self.entries, expected = 0, {}, 0
+        if size > expected:
+            os.truncate(self.data_file, expected)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _key(self, path: str) -> str:
+        """Ключ индекса: путь относительно датасета"""
+        return os.path.relpath(os.path.abspath(path), self.config.DATASET_DIR)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, размер) файла или None, если файла нет"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _array(self) -> np.ndarray:
+        """Все вырезки (memmap только для чтения)"""
+        if self._chips is None or len(self._chips) != self.count:
+            self._chips = np.memmap(self.data_file, dtype=np.uint8, mode='r',
+                                    shape=(self.count,) + self.chip_shape) if self.count else None
+        return self._chips if self._chips is not None else np.empty((0,) + self.chip_shape, dtype=np.uint8)
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        """
+        Вырезка лица фото, если фото не менялось с момента ее построения
+
+        Возвращается копия строки: пока живы представления memmap, файл
+        вырезок нельзя заменить при сжатии (в Windows замена не удается,
+        в POSIX представления продолжают держать старый файл).
+        """
+        entry = self.entries.get(self._key(path))
+        if entry is None or entry["landmark_model"] != self.config.LANDMARK_MODEL:
+            return None
+        if [entry["mtime_ns"], entry["size"]] != list(self._signature(path) or ()):
+            return None
+        with self._lock:
+            return np.array(self._array()[entry["row"]])
+
+    def get_many(self, paths: List[str]) -> Dict[str, np.ndarray]:
+        """Вырезки для набора фото: {путь: вырезка} (только найденные)"""
+        chips: Dict[str, np.ndarray] = {}
+        for path in paths:
+            chip = self.get(path)
+            if chip is not None:
+                chips[path] = chip
+        return chips
+
+    def add(self, path: str, chip: np.ndarray) -> int:
+        """
+        Дозапись вырезки фото (индекс сохраняется через save)
+
+        Returns:
+            int: Номер строки в файле вырезок
+        """
+        chip = np.ascontiguousarray(chip, dtype=np.uint8)
+        if chip.shape != self.chip_shape:
+            raise ValueError(f"Неверный размер вырезки: {chip.shape}")
+        signature = self._signature(path)
+        if signature is None:
+            raise FileNotFoundError(path)
+
+        with self._lock:
+            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+            with open(self.data_file, 'ab') as f:
+                f.write(chip.tobytes())
+                f.flush()
+                # Строка - по фактической позиции записи: в файл могут дописывать
+                # и другие процессы (обучение и онлайн-добавление)
+                row = f.tell() // self.chip_bytes - 1
+            self.count = max(self.count, row + 1)
+            self.entries[self._key(path)] = {
+                "row": row,
+                "mtime_ns": signature[0],
+                "size": signature[1],
+                "landmark_model": self.config.LANDMARK_MODEL,
+            }
+        return row
+
+    def save(self) -> None:
+        """Атомарное сохранение индекса (после дозаписи вырезок)"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_path = f"{self.index_file}.tmp{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"count": self.count, "entries": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_file)
+
+    def prune(self) -> None:
+        """Удаление записей об удаленных фото; сжатие, если больше половины строк не используется"""
+        with self._lock:
+            for key in [key for key in self.entries
+                        if not os.path.exists(os.path.join(self.config.DATASET_DIR, key))]:
+                del self.entries[key]
+        if self.count and len(self.entries) < self.count / 2:
+            self.compact()
+
+    def compact(self) -> None:
+        """Перезапись файла вырезок только с используемыми строками"""
+        with self._lock:
+            chips = self._array()
+            keys = sorted(self.entries, key=lambda key: self.entries[key]["row"])
+            tmp_path = f"{self.data_file}.tmp{os.getpid()}"
+            with open(tmp_path, 'wb') as f:
+                for row, key in enumerate(keys):
+                    f.write(chips[self.entries[key]["row"]].tobytes())
+                    self.entries[key]["row"] = row
+            # Наружу выдаются только копии строк, поэтому после сброса ссылки
+            # файл вырезок больше никем не отображен
+            self._chips = None
+            del chips
+            os.replace(tmp_path, self.data_file)
+            self.count = len(keys)
+        self.save()
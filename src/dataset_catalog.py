@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def scan_images(directory: str, extensions: Sequence[str]) -> List[str]:
+    """
+    Имена файлов изображений в папке (os.scandir, без stat на каждый файл)
+
+    Args:
+        directory: Папка
+        extensions: Допустимые расширения (в нижнем регистре)
+    """
+    extensions = tuple(extensions)
+    with os.scandir(directory) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.name.lower().endswith(extensions) and entry.is_file()
+        )
+
+
+class DatasetCatalog:
+    """
+    Каталог файлов датасета с отслеживанием изменений папок
+
+    Для каждой папки человека хранится список фото и mtime папки на момент
+    сканирования. Добавление, удаление и переименование файлов меняют mtime
+    папки, поэтому повторно сканируются только изменившиеся папки, а каталог
+    сохраняется на диск и переживает перезапуск.
+
+    Папки, измененные менее RACY_WINDOW секунд назад до сканирования,
+    пересканируются при следующем обращении: иначе файл, добавленный в тот же
+    квант времени mtime, мог бы остаться незамеченным.
+    """
+
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, root: Optional[str] = None, cache_file: Optional[str] = None,
+                 extensions: Optional[Sequence[str]] = None):
+        """
+        Args:
+            root: Корень датасета (по умолчанию Config.DATASET_DIR)
+            cache_file: Файл каталога (по умолчанию Config.DATASET_CATALOG_FILE)
+            extensions: Расширения фото (по умолчанию Config.DATASET_EXTENSIONS)
+        """
+        from config import Config
+        self.config = Config
+        self.root = root or Config.DATASET_DIR
+        self.cache_file = cache_file or Config.DATASET_CATALOG_FILE
+        self.extensions = tuple(extensions or Config.DATASET_EXTENSIONS)
+
+        self._lock = threading.Lock()
+        # {папка: {"mtime_ns": ..., "scanned_ns": ..., "files": [...]}}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._root_state: Dict[str, Any] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Загрузка сохраненного каталога"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Не удалось прочитать каталог датасета: {e}")
+            return
+        if data.get("root") != self.root or tuple(data.get("extensions", ())) != self.extensions:
+            return
+        self._root_state = data.get("root_state", {})
+        self.entries = data.get("entries", {})
+
+    def _save(self) -> None:
+        """Атомарное сохранение каталога"""
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp_path = f"{self.cache_file}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "root": self.root,
+                "extensions": list(self.extensions),
+                "root_state": self._root_state,
+                "entries": self.entries,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_file)
+
+    def _is_fresh(self, state: Dict[str, Any], mtime_ns: int) -> bool:
+        """Можно ли доверять сохраненному состоянию папки"""
+        return (
+            state.get("mtime_ns") == mtime_ns
+            and state.get("scanned_ns", 0) - mtime_ns > self.RACY_WINDOW_NS
+        )
+
+    def refresh(self) -> bool:
+        """
+        Обновление каталога: пересканируются только изменившиеся папки
+
+        Returns:
+            bool: Были ли изменения
+        """
+        with self._lock:
+            if not os.path.isdir(self.root):
+                changed = bool(self.entries)
+                self.entries, self._root_state = {}, {}
+                return changed
+
+            changed = False
+            root_mtime = os.stat(self.root).st_mtime_ns
+            if self._is_fresh(self._root_state, root_mtime):
+                people = list(self.entries)
+            else:
+                with os.scandir(self.root) as entries:
+                    people = sorted(entry.name for entry in entries if entry.is_dir())
+                self._root_state = {"mtime_ns": root_mtime, "scanned_ns": time.time_ns()}
+                for person in set(self.entries) - set(people):
+                    del self.entries[person]
+                changed = True
+
+            for person in people:
+                person_dir = os.path.join(self.root, person)
+                try:
+                    mtime_ns = os.stat(person_dir).st_mtime_ns
+                except OSError:
+                    # Папку удалили после чтения корня
+                    self.entries.pop(person, None)
+                    self._root_state = {}
+                    changed = True
+                    continue
+
+                state = self.entries.get(person)
+                if state is not None and self._is_fresh(state, mtime_ns):
+                    continue
+                files = scan_images(person_dir, self.extensions)
+                if state is None or state.get("files") != files or state.get("mtime_ns") != mtime_ns:
+                    changed = True
+                self.entries[person] = {
+                    "mtime_ns": mtime_ns,
+                    "scanned_ns": time.time_ns(),
+                    "files": files,
+                }
+
+            if changed or not os.path.exists(self.cache_file):
+                self._save()
+            return changed
+
+    def people(self) -> List[str]:
+        """Имена папок людей"""
+        self.refresh()
+        return sorted(self.entries)
+
+    def files(self, person: str, full_paths: bool = True) -> List[str]:
+        """
+        Фото человека
+
+        Args:
+            person: Имя папки
+            full_paths: Вернуть полные пути (иначе - только имена файлов)
+        """
+        self.refresh()
+        names = list(self.entries.get(person, {}).get("files", []))
+        if not full_paths:
+            return names
+        person_dir = os.path.join(self.root, person)
+        return [os.path.join(person_dir, name) for name in names]
+
+    def count(self, person: str) -> int:
+        """Количество фото человека (0, если папки нет)"""
+        self.refresh()
+        return len(self.entries.get(person, {}).get("files", []))
+
+    def counts(self) -> Dict[str, int]:
+        """Словарь {имя_человека: количество_фото}"""
+        self.refresh()
+        return {person: len(state["files"]) for person, state in sorted(self.entries.items())}
+
+    def invalidate(self, person: Optional[str] = None) -> None:
+        """Принудительное пересканирование папки (или всего датасета)"""
+        with self._lock:
+            self._root_state = {}
+            if person is None:
+                self.entries = {}
+            else:
+                self.entries.pop(person, None)
@@ -0,0 +1,176 @@
+import os
+import sys
+import errno
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# ioctl FICLONE (Linux): копирование файла через общие блоки (Btrfs, XFS)
+FICLONE = 0x40049409
+
+# Ошибки, означающие, что способ невозможен в этой паре папок (а не проблему с файлом)
+UNSUPPORTED_ERRNOS = {
+    "link": {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK},
+    "reflink": {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY},
+}
+
+
+def reflink_file(src: str, dst: str) -> None:
+    """Клонирование файла через reflink (только Linux, поддерживающие ФС)"""
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflink поддерживается только в Linux")
+    import fcntl
+
+    with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+        try:
+            fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+        except OSError:
+            f_dst.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+class DatasetMaterializer:
+    """
+    Наполнение папки датасета файлами без копирования данных
+
+    Файл связывается жесткой ссылкой, при невозможности (другая ФС, Windows
+    без NTFS) - клонируется через reflink, и только затем копируется.
+    Имена назначения выбираются по множеству имен, прочитанному из папки
+    один раз, без проверки os.path.exists для каждого файла. Операции
+    выполняются в пуле потоков.
+
+    Файлы датасета только читаются, поэтому общая с источником жесткая ссылка
+    безопасна; изменять такие файлы на месте нельзя.
+    """
+
+    METHODS = ("link", "reflink", "copy")
+
+    def __init__(self, dest_dir: str, mode: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Args:
+            dest_dir: Папка назначения
+            mode: auto, link, reflink или copy (по умолчанию Config.MATERIALIZE_MODE)
+            workers: Число потоков (по умолчанию Config.MATERIALIZE_WORKERS)
+        """
+        from config import Config
+        self.config = Config
+        self.dest_dir = dest_dir
+        self.mode = mode or Config.MATERIALIZE_MODE
+        self.workers = workers or Config.MATERIALIZE_WORKERS
+
+        os.makedirs(dest_dir, exist_ok=True)
+        # Имена, уже занятые в папке назначения (читаются один раз)
+        self.taken: Set[str] = set(os.listdir(dest_dir))
+        # Способы, которые не сработали для этой пары ФС, больше не пробуем
+        self._disabled: Set[str] = set()
+
+    def unique_name(self, filename: str) -> str:
+        """Свободное имя файла в папке назначения (с номером при совпадении)"""
+        name = filename
+        base, ext = os.path.splitext(filename)
+        counter = 1
+        while name in self.taken:
+            name = f"{base}_{counter}{ext}"
+            counter += 1
+        self.taken.add(name)
+        return name
+
+    def plan(self, items: Iterable[Tuple[str, str]], skip_existing: bool = True) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Выбор путей назначения
+
+        Args:
+            items: Пары (исходный файл, желаемое имя в папке назначения)
+            skip_existing: Пропускать файлы, имя которых уже занято
+                           (иначе подбирается свободное имя с номером)
+
+        Returns:
+            tuple: (пары (источник, назначение), число пропущенных)
+        """
+        planned: List[Tuple[str, str]] = []
+        skipped = 0
+        for src, filename in items:
+            if skip_existing:
+                if filename in self.taken:
+                    skipped += 1
+                    continue
+                self.taken.add(filename)
+            else:
+                filename = self.unique_name(filename)
+            planned.append((src, os.path.join(self.dest_dir, filename)))
+        return planned, skipped
+
+    def _candidate_methods(self) -> List[str]:
+        """Способы наполнения в порядке предпочтения"""
+        methods = list(self.METHODS) if self.mode == "auto" else [self.mode]
+        return [method for method in methods if method not in self._disabled]
+
+    def materialize_file(self, src: str, dst: str) -> str:
+        """
+        Размещение одного файла
+
+        Returns:
+            str: Использованный способ (link, reflink или copy)
+        """
+        last_error: Optional[OSError] = None
+        for method in self._candidate_methods():
+            try:
+                if method == "link":
+                    os.link(src, dst)
+                elif method == "reflink":
+                    reflink_file(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+                return method
+            except FileExistsError:
+                raise
+            except OSError as e:
+                # Ошибки исходного файла (нет файла, нет доступа) не говорят
+                # о способе - список способов не меняется
+                if method == "copy" or (e.errno is not None and e.errno not in UNSUPPORTED_ERRNOS[method]):
+                    raise
+                last_error = e
+                # Способ не работает для этих папок (другая ФС, нет поддержки) - отключаем его
+                if self.mode == "auto":
+                    self._disabled.add(method)
+        raise last_error or OSError(f"Нет доступного способа для {src}")
+
+    def materialize(self, items: Iterable[Tuple[str, str]], skip_existing: bool = True,
+                    desc: str = "Наполнение датасета") -> Dict[str, int]:
+        """
+        Размещение набора файлов в папке назначения
+
+        Args:
+            items: Пары (исходный файл, желаемое имя в папке назначения)
+            skip_existing: Пропускать файлы, имя которых уже занято
+            desc: Подпись индикатора прогресса
+
+        Returns:
+            dict: Количество файлов по способам, пропущенных и ошибок
+        """
+        from tqdm import tqdm
+
+        planned, skipped = self.plan(items, skip_existing=skip_existing)
+        stats: Dict[str, int] = {method: 0 for method in self.METHODS}
+        stats.update({"added": 0, "skipped": skipped, "failed": 0})
+
+        def run(pair: Tuple[str, str]) -> Optional[str]:
+            src, dst = pair
+            try:
+                return self.materialize_file(src, dst)
+            except OSError as e:
+                print(f"⚠️  Ошибка добавления {src}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for method in tqdm(executor.map(run, planned), total=len(planned), desc=desc):
+                if method is None:
+                    stats["failed"] += 1
+                else:
+                    stats[method] += 1
+                    stats["added"] += 1
+
+        print(f"🔗 Ссылок: {stats['link']}, reflink: {stats['reflink']}, копий: {stats['copy']}")
+        return stats
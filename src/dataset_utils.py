@@ -1,9 +1,8 @@
 import os
+import sys
+import time
 import cv2
 import numpy as np
-from PIL import Image
-import shutil
-from tqdm import tqdm
 import warnings
 from typing import Dict, List, Optional, Tuple, Any
 warnings.filterwarnings("ignore")
@@ -12,29 +11,66 @@ class DatasetManager:
     def __init__(self):
         from config import Config
         self.config = Config
+        from src.dataset_catalog import DatasetCatalog
+        # Кэшированный каталог файлов датасета
+        self.catalog = DatasetCatalog()
+        from src.dataset_validator import DatasetValidator
+        # Проверка качества фото (кэш рамок лиц и метрик)
+        self.validator = DatasetValidator()
+        # Пути к фото, сохраненным последним вызовом capture_photos
+        self.last_captured: List[str] = []
+        # Эмбеддинги этих фото, если они уже посчитаны при захвате
+        self.last_encodings: Optional[List[np.ndarray]] = None
     
-    def capture_photos(self, person_name: str, num_photos: int = 30) -> int:
+    def capture_photos(self, person_name: str, num_photos: int = 30,
+                       headless: Optional[bool] = None, source: Optional[Any] = None) -> int:
         """
         Захват фото с веб-камеры для указанного человека
         
         Args:
-            person_name: Имя человека (Aleksander или Egor)
+            person_name: Имя человека (папка в DATASET_DIR)
             num_photos: Количество фото для захвата
+            headless: Захват без окна (по умолчанию Config.CAPTURE_HEADLESS,
+                      в Linux без DISPLAY - всегда)
+            source: Индекс камеры или путь к видеофайлу (по умолчанию Config.CAMERA_INDEX)
         
         Returns:
             int: Количество сохраненных фото
         """
+        from src.headless_capture import HeadlessCapture, open_video_source
+        
+        if headless is None:
+            headless = self.config.CAPTURE_HEADLESS or (
+                sys.platform.startswith("linux") and not os.environ.get("DISPLAY")
+            )
+        if headless:
+            capture = HeadlessCapture(person_name, num_photos, source=source)
+            capture.run()
+            self.last_captured = list(capture.saved_paths)
+            self.last_encodings = list(capture.encodings)
+            return self.catalog.count(person_name)
+        
         person_dir = os.path.join(self.config.DATASET_DIR, person_name)
         os.makedirs(person_dir, exist_ok=True)
         
-        cap = cv2.VideoCapture(self.config.CAMERA_INDEX, cv2.CAP_DSHOW)
+        cap = open_video_source(source)
         if not cap.isOpened():
             raise RuntimeError("Не удалось открыть камеру")
         
+        self.last_captured = []
+        self.last_encodings = None
+        
         print(f"📸 Захват {num_photos} фото для {person_name}")
         print("Нажмите 'q' для выхода или 'c' для ручного захвата")
         
+        from src.dataset_validator import STATUS_OK
+        from src.phash_index import PHashIndex
+        
+        # Индекс хэшей уже имеющихся фото - почти одинаковые кадры не сохраняем
+        duplicates = PHashIndex.from_paths(self.catalog.files(person_name), self.validator)
+        
         count = 0
+        last_check = 0.0
         while count < num_photos:
             ret, frame = cap.read()
             if not ret:
@@ -53,29 +89,50 @@ class DatasetManager:
             if key == ord('q'):
                 break
             elif key == ord('c'):
-                # Ручной захват
+                # Ручной захват (сохраняется всегда, качество только проверяется)
                 filename = os.path.join(person_dir, f"manual_{count+1:03d}.jpg")
+                record = self.validator.check_frame(frame)
                 cv2.imwrite(filename, frame)
+                self.validator.remember(filename, record)
+                duplicates.add(filename, int(record["dhash"], 16))
+                self.last_captured.append(filename)
                 count += 1
                 print(f"  📸 Снимок {count}/{num_photos} сохранен")
+                if record["status"] != STATUS_OK:
+                    print(f"  ⚠️  Низкое качество снимка: {record['status']}")
             
-            # Автоматический захват каждые 2 секунды
+            # Автоматический захват только кадров, прошедших проверку качества
             if cv2.getWindowProperty(f'Захват фото - {person_name}', cv2.WND_PROP_VISIBLE) >= 1:
-                if count < num_photos and count % 5 == 0:
+                now = time.time()
+                if (count < num_photos and count % 5 == 0
+                        and now - last_check >= self.config.CAPTURE_CHECK_INTERVAL):
+                    last_check = now
+                    record = self.validator.check_frame(frame)
+                    if record["status"] != STATUS_OK:
+                        print(f"  ⏭️  Кадр пропущен: {record['status']}")
+                        continue
+                    frame_hash = int(record["dhash"], 16)
+                    if duplicates.is_duplicate(frame_hash):
+                        print("  ⏭️  Кадр пропущен: почти такой же снимок уже есть")
+                        continue
                     filename = os.path.join(person_dir, f"auto_{count+1:03d}.jpg")
                     cv2.imwrite(filename, frame)
+                    self.validator.remember(filename, record)
+                    duplicates.add(filename, frame_hash)
+                    self.last_captured.append(filename)
                     count += 1
                     print(f"  🤖 Авто-снимок {count}/{num_photos}")
         
         cap.release()
         cv2.destroyAllWindows()
+        if self.last_captured:
+            self.validator.save()
         
         # Подсчитываем итоговое количество
-        photos = [f for f in os.listdir(person_dir) 
-                 if f.lower().endswith(('.jpg', '.png', '.jpeg'))]
+        total = self.catalog.count(person_name)
         
-        print(f"\n✅ Завершено! Сохранено {len(photos)} фото в {person_dir}")
-        return len(photos)
+        print(f"\n✅ Завершено! Сохранено {total} фото в {person_dir}")
+        return total
     
     def get_dataset_stats(self) -> Dict[str, int]:
         """
@@ -84,19 +141,8 @@ class DatasetManager:
         Returns:
             dict: Словарь {имя_человека: количество_фото}
         """
-        stats: Dict[str, int] = {}
-        
-        if not os.path.exists(self.config.DATASET_DIR):
-            return stats
-        
-        for person in os.listdir(self.config.DATASET_DIR):
-            person_path = os.path.join(self.config.DATASET_DIR, person)
-            if os.path.isdir(person_path):
-                photos = [f for f in os.listdir(person_path) 
-                         if f.lower().endswith(('.jpg', '.png', '.jpeg'))]
-                stats[person] = len(photos)
-        
-        return stats
+        # Пересканируются только папки, изменившиеся с прошлого вызова
+        return self.catalog.counts()
     
     def add_lfw_dataset(self, lfw_path: str, max_per_person: int = 10) -> int:
         """
@@ -135,11 +181,12 @@ class DatasetManager:
             print("⚠️  Не найдено папок с изображениями")
             return 0
         
-        added = 0
-        skipped = 0
+        from src.dataset_materializer import DatasetMaterializer
+        from src.lfw_ingest import safe_person_name
         
-        # Обрабатываем первых 50 человек (для скорости)
-        for person_name in tqdm(person_folders[:50], desc="Добавление лиц"):
+        # Собираем пары (источник, имя в датасете) для первых 50 человек (для скорости)
+        items: List[Tuple[str, str]] = []
+        for person_name in person_folders[:50]:
             person_path = os.path.join(lfw_path, person_name)
             
             # Получаем JPG файлы
@@ -147,32 +194,43 @@ class DatasetManager:
                      if f.lower().endswith(('.jpg', '.jpeg'))]
             photos = photos[:max_per_person]
             
+            safe_name = safe_person_name(person_name)
             for photo in photos:
-                src = os.path.join(person_path, photo)
-                
-                # Создаем безопасное имя файла
-                safe_name = person_name.replace(" ", "_").replace("'", "")
-                if len(safe_name) > 30:
-                    safe_name = safe_name[:30]
-                
-                dst = os.path.join(unknown_dir, f"lfw_{safe_name}_{photo}")
-                
-                if os.path.exists(dst):
-                    skipped += 1
-                    continue
-                
-                try:
-                    shutil.copy2(src, dst)
-                    added += 1
-                except Exception as e:
-                    print(f"⚠️  Ошибка копирования {src}: {e}")
-                    skipped += 1
+                items.append((os.path.join(person_path, photo), f"lfw_{safe_name}_{photo}"))
+        
+        # Файлы связываются ссылками, а не копируются
+        stats = DatasetMaterializer(unknown_dir).materialize(items, desc="Добавление лиц")
+        added = stats["added"]
+        skipped = stats["skipped"] + stats["failed"]
         
         print(f"\n✅ Добавлено: {added} фото")
         print(f"⚠️  Пропущено: {skipped} фото")
         
         return added
     
+    def add_lfw_archive(self, tar_path: str, max_per_person: int = 10,
+                        max_people: Optional[int] = None) -> int:
+        """
+        Добавление лиц из архива LFW (.tgz) в папку 'Unknown' за один проход
+        
+        Архив читается потоково, без распаковки и промежуточных копий;
+        прерванную загрузку можно запустить повторно - она продолжится.
+        
+        Args:
+            tar_path: Путь к архиву LFW
+            max_per_person: Максимальное количество фото от одного человека
+            max_people: Максимальное количество людей (None - все)
+        
+        Returns:
+            int: Количество добавленных фото
+        """
+        from src.lfw_ingest import LFWStreamIngestor
+        
+        ingestor = LFWStreamIngestor(tar_path, max_per_person=max_per_person,
+                                     max_people=max_people)
+        stats = ingestor.ingest_to_dataset(os.path.join(self.config.DATASET_DIR, "Unknown"))
+        return stats["added"]
+    
     def clear_dataset(self, person_name: Optional[str] = None) -> None:
         """
         Очистка датасета
@@ -0,0 +1,297 @@
+import os
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Статусы проверки фото
+STATUS_OK = "ok"
+STATUS_NO_FACE = "no_face"
+STATUS_MULTIPLE_FACES = "multiple_faces"
+STATUS_SMALL_FACE = "small_face"
+STATUS_BLURRY = "blurry"
+STATUS_BAD_POSE = "bad_pose"
+STATUS_UNREADABLE = "unreadable"
+
+
+def compute_dhash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Разностный перцептивный хэш (dHash) изображения
+
+    Args:
+        gray: Изображение в оттенках серого
+        hash_size: Сторона хэша (64 бита при 8)
+
+    Returns:
+        int: Хэш
+    """
+    import cv2
+
+    resized = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (resized[:, 1:] > resized[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def assess_image(rgb_image: np.ndarray, config: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Поиск лиц и оценка качества изображения
+
+    Args:
+        rgb_image: Изображение в RGB
+        config: Настройки (по умолчанию Config)
+
+    Returns:
+        dict: Лица (top, right, bottom, left) по убыванию площади, метрики,
+              ключевые точки главного лица и статус
+    """
+    import cv2
+    import face_recognition
+    from src.batch_encoder import face_landmarks, head_pose, load_pose_predictor
+
+    if config is None:
+        from config import Config
+        config = Config
+
+    gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY)
+    locations = face_recognition.face_locations(rgb_image)
+    locations.sort(key=lambda box: (box[2] - box[0]) * (box[1] - box[3]), reverse=True)
+
+    record: Dict[str, Any] = {
+        "faces": [list(map(int, box)) for box in locations],
+        "width": int(rgb_image.shape[1]),
+        "height": int(rgb_image.shape[0]),
+        "face_size": 0,
+        "blur": 0.0,
+        "dhash": f"{compute_dhash(gray):016x}",
+        "landmark_model": config.LANDMARK_MODEL,
+    }
+
+    if not locations:
+        record["status"] = STATUS_NO_FACE
+        return record
+
+    top, right, bottom, left = locations[0]
+    record["face_size"] = int(min(bottom - top, right - left))
+    face = gray[max(top, 0):bottom, max(left, 0):right]
+    if face.size:
+        record["blur"] = float(cv2.Laplacian(face, cv2.CV_64F).var())
+
+    # Ключевые точки главного лица: для выравнивания при обучении и оценки позы
+    points = face_landmarks(rgb_image, [locations[0]], load_pose_predictor(config.LANDMARK_MODEL))[0]
+    yaw, roll = head_pose(points)
+    record["landmarks"] = points.astype(int).tolist()
+    record["yaw"], record["roll"] = round(yaw, 3), round(roll, 1)
+
+    if len(locations) > 1:
+        areas = [(b - t) * (r - l) for t, r, b, l in locations[:2]]
+        if areas[0] < areas[1] * config.QUALITY_DOMINANT_FACE_RATIO:
+            record["status"] = STATUS_MULTIPLE_FACES
+            return record
+    if record["face_size"] < config.QUALITY_MIN_FACE_SIZE:
+        record["status"] = STATUS_SMALL_FACE
+    elif record["blur"] < config.QUALITY_BLUR_THRESHOLD:
+        record["status"] = STATUS_BLURRY
+    elif abs(yaw) > config.QUALITY_MAX_YAW or abs(roll) > config.QUALITY_MAX_ROLL:
+        record["status"] = STATUS_BAD_POSE
+    else:
+        record["status"] = STATUS_OK
+    return record
+
+
+def assess_path(path: str) -> Dict[str, Any]:
+    """
+    Проверка файла изображения
+
+    Выполняется в процессах пула, поэтому импорты - внутри функции.
+    """
+    import face_recognition
+
+    try:
+        image = face_recognition.load_image_file(path)
+    except Exception:
+        return {"faces": [], "status": STATUS_UNREADABLE}
+    return assess_image(image)
+
+
+def is_trainable(record: Optional[Dict[str, Any]], config: Optional[Any] = None) -> bool:
+    """
+    Подходит ли фото для обучения
+
+    С QUALITY_GATES_ENABLED нужен статус ok; без него берутся все фото с
+    найденным лицом (кодируется самое крупное), как до проверки качества.
+    """
+    if config is None:
+        from config import Config
+        config = Config
+    if record is None:
+        return False
+    if config.QUALITY_GATES_ENABLED:
+        return record["status"] == STATUS_OK
+    return bool(record.get("faces"))
+
+
+class DatasetValidator:
+    """
+    Проверка фото датасета с кэшированием результатов
+
+    Лица ищутся один раз на файл; рамки лиц и метрики качества (резкость,
+    размер лица, число лиц, перцептивный хэш) сохраняются в
+    models/dataset_quality.json и пересчитываются только для новых или
+    измененных файлов (по mtime и размеру). Обучение пропускает плохие фото
+    не открывая их, а для хороших берет готовую рамку лица.
+
+    Кэш пишут несколько экземпляров (обучение, захват фото, в том числе в
+    другом процессе), поэтому save() под блокировкой файла перечитывает его
+    и добавляет только свои изменения, а validate() сначала подхватывает
+    чужие записи.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Args:
+            cache_file: Файл кэша (по умолчанию Config.DATASET_QUALITY_FILE)
+            workers: Число процессов (по умолчанию Config.ENCODING_WORKERS)
+        """
+        from config import Config
+        self.config = Config
+        self.cache_file = cache_file or Config.DATASET_QUALITY_FILE
+        self.workers = workers or Config.ENCODING_WORKERS
+        self._lock = threading.Lock()
+        self.records: Dict[str, Dict[str, Any]] = {}
+        # Изменения этого экземпляра, еще не записанные на диск
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+        self.records = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Чтение кэша проверок с диска"""
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Не удалось прочитать кэш качества: {e}")
+            return {}
+
+    def reload(self) -> None:
+        """Перечитывание кэша с диска с сохранением своих незаписанных изменений"""
+        records = self._read()
+        with self._lock:
+            for key in self._removed:
+                records.pop(key, None)
+            for key in self._changed:
+                records[key] = self.records[key]
+            self.records = records
+
+    def save(self) -> None:
+        """Атомарное сохранение кэша (слиянием с записями других экземпляров)"""
+        from src.file_lock import file_lock
+
+        with file_lock(self.cache_file):
+            self.reload()
+            with self._lock:
+                tmp_path = f"{self.cache_file}.tmp{os.getpid()}"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.records, f, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_file)
+                self._changed.clear()
+                self._removed.clear()
+
+    def _key(self, path: str) -> str:
+        """Ключ кэша: путь относительно датасета"""
+        return os.path.relpath(os.path.abspath(path), self.config.DATASET_DIR)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, размер) файла или None, если файла нет"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_cached(self, path: str) -> Optional[Dict[str, Any]]:
+        """Результат проверки из кэша, если файл не менялся"""
+        record = self.records.get(self._key(path))
+        signature = self._signature(path)
+        if record is None or signature is None:
+            return None
+        if (record.get("mtime_ns"), record.get("size")) != signature:
+            return None
+        # Точки другой модели (или записи без точек) пересчитываются
+        if record.get("faces") and record.get("landmark_model") != self.config.LANDMARK_MODEL:
+            return None
+        return record
+
+    def remember(self, path: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Запоминание результата проверки файла (кэш сохраняется через save)"""
+        signature = self._signature(path)
+        if signature is not None:
+            record["mtime_ns"], record["size"] = signature
+        key = self._key(path)
+        with self._lock:
+            self.records[key] = record
+            self._changed.add(key)
+            self._removed.discard(key)
+        return record
+
+    def validate(self, paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Проверка набора файлов (новые и измененные - в пуле процессов)
+
+        Args:
+            paths: Пути к фото
+
+        Returns:
+            dict: {путь: результат проверки}
+        """
+        # Фото могли проверить другие экземпляры (захват, менеджер датасета)
+        self.reload()
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+        for path in paths:
+            record = self.get_cached(path)
+            if record is None:
+                pending.append(path)
+            else:
+                results[path] = record
+
+        if pending:
+            print(f"🔎 Проверка качества: {len(pending)} новых фото "
+                  f"({len(results)} из кэша)")
+            if self.workers > 1 and len(pending) > 1:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    checked = executor.map(assess_path, pending, chunksize=8)
+                    for path, record in zip(pending, checked):
+                        results[path] = self.remember(path, record)
+            else:
+                for path in pending:
+                    results[path] = self.remember(path, assess_path(path))
+            self.prune()
+            self.save()
+
+        return results
+
+    def prune(self) -> None:
+        """Удаление из кэша записей об удаленных файлах"""
+        with self._lock:
+            for key in [key for key in self.records
+                        if not os.path.exists(os.path.join(self.config.DATASET_DIR, key))]:
+                del self.records[key]
+                self._removed.add(key)
+                self._changed.discard(key)
+
+    def check_frame(self, frame_bgr: np.ndarray) -> Dict[str, Any]:
+        """Проверка кадра с камеры перед сохранением (без кэширования)"""
+        import cv2
+        return assess_image(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB), self.config)
+
+    @staticmethod
+    def summarize(results: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Количество фото по статусам"""
+        summary: Dict[str, int] = {}
+        for record in results.values():
+            summary[record["status"]] = summary.get(record["status"], 0) + 1
+        return summary
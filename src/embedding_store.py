@@ -0,0 +1,103 @@
+import os
+import pickle
+import numpy as np
+from typing import List, Optional, Tuple, Union
+
+
+class EmbeddingStore:
+    """
+    Хранилище эмбеддингов с дозаписью
+
+    Основной файл (X, y) перезаписывается при полном обучении, а новые
+    эмбеддинги (онлайн-добавление людей, внешние наборы) дописываются
+    отдельными чанками в папку <файл>.d за O(новых образцов).
+
+    Файлы могут содержать третий элемент - веса образцов (например, для
+    почти одинаковых фото); без него вес образца равен 1.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к основному pickle-файлу с эмбеддингами (X, y)
+        """
+        self.path = path
+        self.chunks_dir = f"{path}.d"
+
+    def _chunk_files(self) -> List[str]:
+        """Файлы чанков в порядке записи"""
+        if not os.path.isdir(self.chunks_dir):
+            return []
+        return sorted(
+            os.path.join(self.chunks_dir, name)
+            for name in os.listdir(self.chunks_dir)
+            if name.startswith("chunk_") and name.endswith(".pkl")
+        )
+
+    def exists(self) -> bool:
+        """Есть ли в хранилище данные"""
+        return os.path.exists(self.path) or bool(self._chunk_files())
+
+    def load(self, with_weights: bool = False) -> Union[Tuple[np.ndarray, np.ndarray],
+                                                       Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Загрузка всех эмбеддингов (основной файл + чанки)
+
+        Args:
+            with_weights: Вернуть также веса образцов
+
+        Returns:
+            tuple: (эмбеддинги, метки) или (эмбеддинги, метки, веса)
+        """
+        X_parts: List[np.ndarray] = []
+        y_parts: List[np.ndarray] = []
+        w_parts: List[np.ndarray] = []
+
+        for file_path in ([self.path] if os.path.exists(self.path) else []) + self._chunk_files():
+            with open(file_path, 'rb') as f:
+                data = pickle.load(f)
+            X, y = data[0], data[1]
+            if len(X):
+                X_parts.append(np.asarray(X))
+                y_parts.append(np.asarray(y))
+                w_parts.append(np.asarray(data[2], dtype=float) if len(data) > 2
+                               else np.ones(len(X)))
+
+        if not X_parts:
+            X_all, y_all, w_all = np.empty((0, 128)), np.empty((0,), dtype=int), np.empty((0,))
+        else:
+            X_all, y_all, w_all = np.concatenate(X_parts), np.concatenate(y_parts), np.concatenate(w_parts)
+        if with_weights:
+            return X_all, y_all, w_all
+        return X_all, y_all
+
+    def append(self, X: np.ndarray, y: np.ndarray) -> str:
+        """
+        Дозапись эмбеддингов новым чанком
+
+        Returns:
+            str: Путь к записанному чанку
+        """
+        from src.model_registry import ModelRegistry
+
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        existing = self._chunk_files()
+        index = int(os.path.basename(existing[-1])[6:-4]) + 1 if existing else 0
+        chunk_path = os.path.join(self.chunks_dir, f"chunk_{index:06d}.pkl")
+
+        ModelRegistry.write_atomic(chunk_path, (np.asarray(X), np.asarray(y)))
+        return chunk_path
+
+    def replace(self, X: np.ndarray, y: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        """Перезапись всего хранилища (чанки удаляются)"""
+        from src.model_registry import ModelRegistry
+
+        ModelRegistry.write_atomic(self.path, (X, y) if weights is None else (X, y, weights))
+        for chunk_path in self._chunk_files():
+            os.remove(chunk_path)
+
+    def compact(self) -> None:
+        """Слияние чанков в основной файл"""
+        if self._chunk_files():
+            X, y, weights = self.load(with_weights=True)
+            self.replace(X, y, weights)
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import pickle
+import argparse
+import threading
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class EncodingArchive:
+    """
+    Архив эмбеддингов лиц обработанных изображений
+
+    Для каждого найденного лица сохраняются источник, координаты, эмбеддинг
+    (float32) и результат сопоставления. Лица накапливаются в памяти и
+    записываются сегментами (segment_NNNNNN.pkl) по ENCODING_ARCHIVE_SEGMENT
+    лиц. После переобучения или смены порога результаты пересчитываются
+    без повторной обработки изображений: сегменты читаются по очереди и
+    сопоставляются с новой моделью матричными операциями
+    (ModelSnapshot.score), новые метки пишутся рядом (segment_NNNNNN.scores.pkl).
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_size: Optional[int] = None):
+        """
+        Args:
+            directory: Папка архива (по умолчанию Config.ENCODING_ARCHIVE_DIR)
+            segment_size: Лиц в сегменте (по умолчанию Config.ENCODING_ARCHIVE_SEGMENT)
+        """
+        from config import Config
+        from src.label_registry import LabelRegistry
+        self.config = Config
+        self.directory = directory or Config.ENCODING_ARCHIVE_DIR
+        self.segment_size = segment_size or Config.ENCODING_ARCHIVE_SEGMENT
+        self.labels = LabelRegistry()
+
+        self._sources: List[str] = []
+        self._image_index: List[int] = []
+        self._locations: List[Tuple[int, int, int, int]] = []
+        self._encodings: List[np.ndarray] = []
+        self._labels: List[int] = []
+        self._confidences: List[float] = []
+        self._version = 0
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+
+    def _segment_files(self) -> List[str]:
+        """Файлы сегментов в порядке записи"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith("segment_") and name.endswith(".pkl") and not name.endswith(".scores.pkl")
+        )
+
+    @staticmethod
+    def _scores_path(segment_path: str) -> str:
+        return f"{segment_path[:-4]}.scores.pkl"
+
+    def add(self, source: str, results: List[Dict[str, Any]], model_version: int = 0) -> None:
+        """
+        Добавление лиц одного изображения (результаты с эмбеддингами)
+
+        Args:
+            source: Путь или имя изображения
+            results: Результаты распознавания (FaceRecognizer.match_encodings)
+            model_version: Версия модели, которой получены результаты
+        """
+        # Метка берется из результата: реестр имен мог устареть (новые люди после запуска)
+        faces = [result for result in results if result.get('encoding') is not None]
+        if not faces:
+            return
+        with self._lock:
+            image_index = len(self._sources)
+            self._sources.append(source)
+            for result in faces:
+                self._image_index.append(image_index)
+                self._locations.append(tuple(int(value) for value in result['location']))
+                self._encodings.append(np.asarray(result['encoding'], dtype=np.float32))
+                label = result.get('label')
+                self._labels.append(int(label) if label is not None else self.labels.get_label(result['name']))
+                self._confidences.append(float(result['confidence']))
+            self._version = model_version
+            full = len(self._encodings) >= self.segment_size
+        if full:
+            self.flush()
+
+    def flush(self, force: bool = True) -> Optional[str]:
+        """
+        Запись накопленных лиц новым сегментом
+
+        Args:
+            force: False - записывать не чаще Config.ENCODING_ARCHIVE_FLUSH_INTERVAL
+                   (и всегда при заполнении сегмента)
+
+        Returns:
+            str: Путь к сегменту или None, если записывать нечего
+        """
+        from src.model_registry import ModelRegistry
+
+        with self._lock:
+            if not self._encodings:
+                return None
+            if not force and len(self._encodings) < self.segment_size and \
+                    time.time() - self._last_flush < self.config.ENCODING_ARCHIVE_FLUSH_INTERVAL:
+                return None
+            segment = {
+                "sources": self._sources,
+                "image_index": np.array(self._image_index, dtype=np.int32),
+                "locations": np.array(self._locations, dtype=np.int32).reshape(-1, 4),
+                "encodings": np.stack(self._encodings),
+            }
+            scores = {
+                "version": self._version,
+                "labels": np.array(self._labels, dtype=np.int32),
+                "confidences": np.array(self._confidences, dtype=np.float32),
+            }
+            self._sources, self._image_index, self._locations = [], [], []
+            self._encodings, self._labels, self._confidences = [], [], []
+            self._last_flush = time.time()
+
+            existing = self._segment_files()
+            index = int(os.path.basename(existing[-1])[8:-4]) + 1 if existing else 0
+            segment_path = os.path.join(self.directory, f"segment_{index:06d}.pkl")
+            # Сначала оценки, затем сегмент: сегмент без оценок не появится
+            ModelRegistry.write_atomic(self._scores_path(segment_path), scores)
+            ModelRegistry.write_atomic(segment_path, segment)
+        return segment_path
+
+    def segments(self) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+        """Сегменты архива: (путь, данные сегмента, текущие оценки)"""
+        for segment_path in self._segment_files():
+            with open(segment_path, 'rb') as f:
+                segment = pickle.load(f)
+            with open(self._scores_path(segment_path), 'rb') as f:
+                scores = pickle.load(f)
+            yield segment_path, segment, scores
+
+    def rescore(self, recognizer: Optional[Any] = None, use_svm: bool = False,
+                block_size: int = 65536) -> Dict[str, Any]:
+        """
+        Пересчет результатов всех лиц архива текущей моделью
+
+        Args:
+            recognizer: FaceRecognizer, модель и параметры которого используются
+                        (по умолчанию снимок модели загружается из ModelRegistry)
+            use_svm: Использовать SVM (если recognizer не передан)
+            block_size: Лиц в одном матричном блоке
+
+        Returns:
+            dict: Статистика: лиц, изображений, изменившихся меток, распознаваний по именам
+        """
+        from src.model_registry import ModelRegistry
+
+        self.flush()
+        if recognizer is not None:
+            model = recognizer.model
+            use_svm = recognizer.use_svm
+        else:
+            model = ModelRegistry().load_snapshot(use_svm=use_svm)
+        use_svm = use_svm and model.classifier is not None
+        if not model.centroids:
+            raise RuntimeError("Модель не обучена")
+
+        stats: Dict[str, Any] = {"version": model.version, "segments": 0, "faces": 0,
+                                 "images": 0, "changed": 0, "recognitions": {}}
+        started = time.time()
+        for segment_path, segment, scores in self.segments():
+            encodings = segment["encodings"]
+            labels = np.empty(len(encodings), dtype=np.int32)
+            confidences = np.empty(len(encodings), dtype=np.float32)
+            for start in range(0, len(encodings), block_size):
+                block = slice(start, start + block_size)
+                labels[block], confidences[block], _ = model.score(
+                    encodings[block], use_svm=use_svm, threshold=self.config.DISTANCE_THRESHOLD
+                )
+
+            stats["segments"] += 1
+            stats["faces"] += len(labels)
+            stats["images"] += len(segment["sources"])
+            stats["changed"] += int(np.count_nonzero(labels != scores["labels"]))
+            values, counts = np.unique(labels, return_counts=True)
+            for label, count in zip(values, counts):
+                name = model.label_name(int(label))
+                stats["recognitions"][name] = stats["recognitions"].get(name, 0) + int(count)
+
+            ModelRegistry.write_atomic(self._scores_path(segment_path), {
+                "version": model.version, "labels": labels, "confidences": confidences,
+            })
+
+        stats["time"] = round(time.time() - started, 3)
+        return stats
+
+    def iter_results(self, model: Optional[Any] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Текущие результаты по изображениям: (источник, список лиц)
+
+        Args:
+            model: Снимок модели для имен классов (по умолчанию загружается из ModelRegistry)
+        """
+        from src.model_registry import ModelRegistry
+
+        if model is None:
+            model = ModelRegistry().load_snapshot()
+        for _, segment, scores in self.segments():
+            faces: Dict[int, List[Dict[str, Any]]] = {}
+            for i, image_index in enumerate(segment["image_index"]):
+                label = int(scores["labels"][i])
+                faces.setdefault(int(image_index), []).append({
+                    'location': tuple(int(value) for value in segment["locations"][i]),
+                    'name': model.label_name(label),
+                    'confidence': float(scores["confidences"][i]),
+                })
+            for image_index, source in enumerate(segment["sources"]):
+                yield source, faces.get(image_index, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет результатов архива эмбеддингов текущей моделью")
+    parser.add_argument("--svm", action="store_true", help="использовать SVM-классификатор")
+    parser.add_argument("--export", default=None, help="сохранить результаты по изображениям в JSON Lines")
+    args = parser.parse_args()
+
+    archive = EncodingArchive()
+    stats = archive.rescore(use_svm=args.svm)
+    print(f"✅ Пересчитано {stats['faces']} лиц на {stats['images']} изображениях "
+          f"за {stats['time']:.1f} с (версия модели {stats['version']}, "
+          f"изменилось меток: {stats['changed']})")
+    for name, count in sorted(stats["recognitions"].items(), key=lambda item: -item[1]):
+        print(f"  {name:20}: {count}")
+
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as f:
+            for source, faces in archive.iter_results():
+                f.write(json.dumps({"source": source, "faces": faces}, ensure_ascii=False) + "\n")
+        print(f"📄 Результаты сохранены: {args.export}")
+
+
+if __name__ == "__main__":
+    main()
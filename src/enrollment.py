@@ -0,0 +1,151 @@
+import os
+import numpy as np
+import face_recognition
+from typing import Any, Dict, List, Optional
+import warnings
+warnings.filterwarnings("ignore")
+
+
+class OnlineEnroller:
+    """
+    Онлайн-добавление людей в галерею без полного переобучения
+
+    Кодирует только новые фото, дописывает эмбеддинги в хранилище, обновляет
+    центроиды скользящим средним за O(новых образцов) и публикует новую версию
+    модели, которую работающий FaceRecognizer подхватывает без остановки.
+
+    SVM-классификатор при этом не переобучается - он обновится при следующем
+    полном обучении (FaceTrainer.train_full_model).
+    """
+
+    def __init__(self, recognizer: Optional[Any] = None):
+        """
+        Args:
+            recognizer: Работающий FaceRecognizer, которому нужно сообщить об изменениях
+                        (None - перезагрузку модели выполняет вызывающий код)
+        """
+        from config import Config
+        from src.model_registry import ModelRegistry
+        from src.embedding_store import EmbeddingStore
+        from src.label_registry import LabelRegistry
+        self.config = Config
+        self.labels = LabelRegistry()
+        self.recognizer = recognizer
+        self.registry = ModelRegistry()
+        self.store = EmbeddingStore(Config.EMBEDDINGS_FILE)
+
+    def encode_images(self, image_paths: List[str]) -> List[np.ndarray]:
+        """
+        Извлечение эмбеддингов из новых фото так же, как при полном обучении
+
+        Фото проходят проверку качества (DatasetValidator), лицо выравнивается
+        по рамке и ключевым точкам из проверки, вырезки кодируются BatchEncoder
+        с искажениями обучения и сохраняются в кэш вырезок, чтобы следующее
+        полное обучение их не строило заново.
+        """
+        from src.dataset_validator import DatasetValidator, STATUS_UNREADABLE, is_trainable
+        from src.batch_encoder import BatchEncoder
+        from src.chip_cache import ChipCache
+
+        encoder = BatchEncoder()
+        chip_cache = ChipCache() if self.config.CHIP_CACHE_ENABLED else None
+        quality = DatasetValidator().validate(image_paths)
+        chips = chip_cache.get_many(image_paths) if chip_cache is not None else {}
+
+        good_paths: List[str] = []
+        for img_path in image_paths:
+            record = quality.get(img_path)
+            if not is_trainable(record, self.config):
+                status = record["status"] if record else STATUS_UNREADABLE
+                print(f"    ⚠️  Фото пропущено ({status}): {os.path.basename(img_path)}")
+                continue
+            if img_path not in chips:
+                try:
+                    image = face_recognition.load_image_file(img_path)
+                    landmarks = [np.array(record["landmarks"])] if record.get("landmarks") else None
+                    image_chips, _ = encoder.align(image, [tuple(record["faces"][0])], landmarks)
+                except Exception as e:
+                    print(f"    ❌ Ошибка {os.path.basename(img_path)}: {e}")
+                    continue
+                chips[img_path] = image_chips[0]
+                if chip_cache is not None:
+                    chip_cache.add(img_path, image_chips[0])
+            good_paths.append(img_path)
+
+        if chip_cache is not None:
+            chip_cache.save()
+        if not good_paths:
+            return []
+        encodings = encoder.encode_augmented(
+            np.array([chips[img_path] for img_path in good_paths]),
+            self.config.TRAIN_NUM_JITTERS, self.config.TRAIN_AUGMENT_FLIP
+        )
+        return list(encodings)
+
+    def enroll(self, person_name: str, image_paths: List[str],
+               encodings: Optional[List[np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Добавление новых фото человека в галерею
+
+        Args:
+            person_name: Имя человека
+            image_paths: Пути к новым фото (уже сохраненным в датасете)
+            encodings: Эмбеддинги этих фото, если они уже посчитаны (например,
+                       при захвате без окна) - тогда фото не кодируются повторно
+
+        Returns:
+            dict: Статистика добавления
+        """
+        print(f"➕ Онлайн-добавление {person_name}: {len(image_paths)} фото")
+
+        if encodings is None:
+            encodings = self.encode_images(image_paths)
+        stats: Dict[str, Any] = {
+            "person": person_name,
+            "images": len(image_paths),
+            "added": len(encodings),
+            "version": None,
+        }
+        if not encodings:
+            print("❌ Нет эмбеддингов для добавления")
+            return stats
+
+        # Чтение-изменение-публикация не пересекается с полным обучением
+        with self.registry.lock():
+            snapshot = self.registry.load_snapshot()
+            centroids = dict(snapshot.centroids or {})
+            label_names = dict(snapshot.label_names)
+            counts = dict(snapshot.counts or {})
+
+            # Для моделей без сохраненных количеств считаем их один раз по хранилищу
+            if centroids and not counts and self.store.exists():
+                _, y, w = self.store.load(with_weights=True)
+                counts = {int(label): float(w[y == label].sum()) for label in np.unique(y)}
+
+            label = self.labels.get_label(person_name, create=True)
+            X_new = np.array(encodings)
+            y_new = np.full(len(encodings), label)
+
+            # 1. Дописываем эмбеддинги в хранилище
+            self.store.append(X_new, y_new)
+
+            # 2. Обновляем центроид скользящим средним
+            old_count = counts.get(label, 0)
+            new_count = old_count + len(X_new)
+            if label in centroids and old_count:
+                centroids[label] = (centroids[label] * old_count + X_new.sum(axis=0)) / new_count
+            else:
+                centroids[label] = X_new.mean(axis=0)
+            counts[label] = new_count
+            label_names[label] = person_name
+
+            # 3. Публикуем новую версию модели
+            self.registry.write_atomic(self.config.CENTROIDS_FILE, (centroids, label_names, counts))
+            stats["version"] = self.registry.publish()
+            stats["label"] = label
+
+        if self.recognizer is not None:
+            self.recognizer.reload_models_async()
+
+        print(f"✅ Добавлено {len(X_new)} эмбеддингов для {person_name} (класс {label})")
+        return stats
@@ -1,8 +1,8 @@
 import cv2
 import numpy as np
-import pickle
-import face_recognition
 import os
+import threading
+import time
 from typing import Dict, List, Tuple, Optional, Any
 import warnings
 warnings.filterwarnings("ignore")
@@ -14,10 +14,20 @@ class FaceRecognizer:
         """
         from config import Config
         self.config = Config
+        # Выбор пользователя; SVM применяется, только если классификатор есть в снимке модели
         self.use_svm = use_svm
-        self.classifier: Optional[Any] = None
-        self.centroids: Optional[Dict[int, np.ndarray]] = None
-        self.label_names: Dict[int, str] = {}
+        
+        from src.model_registry import ModelRegistry, ModelSnapshot
+        self.registry = ModelRegistry()
+        from src.label_registry import LabelRegistry
+        self.labels = LabelRegistry()
+        from src.batch_encoder import BatchEncoder
+        self.encoder = BatchEncoder()
+        # Текущий снимок модели; заменяется целиком при перезагрузке
+        self.model: ModelSnapshot = ModelSnapshot.empty()
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._last_version_check = 0.0
         
         # Загружаем детектор лиц OpenCV
         cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
@@ -34,55 +44,154 @@ class FaceRecognizer:
         
         self.load_models()
     
+    @property
+    def centroids(self) -> Optional[Dict[int, np.ndarray]]:
+        return self.model.centroids
+    
+    @property
+    def label_names(self) -> Dict[int, str]:
+        return self.model.label_names
+    
+    @property
+    def classifier(self) -> Optional[Any]:
+        return self.model.classifier
+    
     def load_models(self) -> None:
         """Загрузка обученных моделей"""
         try:
-            # Загружаем центроиды
-            if os.path.exists(self.config.CENTROIDS_FILE):
-                with open(self.config.CENTROIDS_FILE, 'rb') as f:
-                    self.centroids, self.label_names = pickle.load(f)
-                print(f"✅ Загружены центроиды для {len(self.centroids)} классов")
-                print(f"   Классы: {list(self.label_names.values())}")
+            snapshot = self.registry.load_snapshot(use_svm=self.use_svm)
+            
+            if snapshot.centroids is not None:
+                print(f"✅ Загружены центроиды для {len(snapshot.centroids)} классов")
+                print(f"   Классы: {list(snapshot.label_names.values())}")
             else:
                 print("⚠️  Центроиды не найдены")
-                self.centroids = None
             
-            # Загружаем SVM классификатор если нужно
-            if self.use_svm and os.path.exists(self.config.CLASSIFIER_FILE):
-                with open(self.config.CLASSIFIER_FILE, 'rb') as f:
-                    self.classifier = pickle.load(f)
+            if self.use_svm and snapshot.classifier is not None:
                 print("✅ SVM классификатор загружен")
             elif self.use_svm:
-                print("⚠️  SVM классификатор не найден")
-                self.use_svm = False
+                print("⚠️  SVM классификатор не найден, используются центроиды")
+            
+            # Атомарная замена снимка: кадр в обработке дорабатывает со старым
+            self.labels.load()
+            self.model = snapshot
                 
         except Exception as e:
             print(f"❌ Ошибка загрузки моделей: {e}")
-            self.centroids = None
-            self.classifier = None
     
-    def detect_faces_opencv(self, frame: np.ndarray, scale_factor: float = 1.0) -> List[Tuple[int, int, int, int]]:
-        """Детекция лиц с использованием OpenCV (оптимизированная версия)"""
-        if self.face_cascade is None:
-            return []
+    def reload_models_async(self) -> Optional[threading.Thread]:
+        """
+        Фоновая перезагрузка моделей без остановки распознавания
+        
+        Каскад Хаара и другие тяжелые ресурсы переиспользуются, заменяется
+        только снимок модели (центроиды, классификатор).
+        
+        Returns:
+            Thread: Поток загрузки (уже идущей, если она была запущена раньше)
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return self._reload_thread
         
-        # Уменьшаем разрешение для быстрой детекции
+        def reload_thread():
+            try:
+                self.load_models()
+            finally:
+                self._reload_lock.release()
+        
+        thread = threading.Thread(target=reload_thread, daemon=True)
+        self._reload_thread = thread
+        thread.start()
+        return thread
+    
+    def reload_models(self, attempts: int = 3) -> None:
+        """
+        Перезагрузка моделей с ожиданием последней опубликованной версии
+        
+        Если перезагрузка уже идет, вызов дожидается ее и повторяет загрузку,
+        когда она прочитала не последнюю версию.
+        """
+        for _ in range(attempts):
+            thread = self.reload_models_async()
+            if thread is not None:
+                thread.join()
+            if self.registry.current_version() == self.model.version:
+                return
+    
+    def refresh_if_updated(self) -> bool:
+        """
+        Проверка опубликованной версии модели (не чаще MODEL_POLL_INTERVAL)
+        
+        Вызывается между кадрами; при появлении новой версии запускает
+        фоновую перезагрузку.
+        
+        Returns:
+            bool: Запущена ли перезагрузка
+        """
+        now = time.monotonic()
+        if now - self._last_version_check < self.config.MODEL_POLL_INTERVAL:
+            return False
+        self._last_version_check = now
+        
+        if self._reload_lock.locked() or self.registry.current_version() == self.model.version:
+            return False
+        return self.reload_models_async() is not None
+    
+    def prepare_frame(self, frame: np.ndarray, scale_factor: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Подготовка уменьшенного кадра и его grayscale-версии для детекции
+        
+        Результат можно переиспользовать вне детекции (например, для оценки
+        движения в кадре), чтобы не масштабировать кадр повторно.
+        
+        Returns:
+            tuple: (уменьшенный кадр BGR, уменьшенный кадр в grayscale)
+        """
         if scale_factor != 1.0:
             small_frame = cv2.resize(frame, (0, 0), fx=scale_factor, fy=scale_factor)
         else:
             small_frame = frame
         
-        # Конвертируем в grayscale
         gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+        return small_frame, gray
+    
+    def detect_faces_opencv(self, frame: np.ndarray, scale_factor: float = 1.0,
+                            gray: Optional[np.ndarray] = None,
+                            regions: Optional[List[Tuple[int, int, int, int]]] = None,
+                            hints: Optional[List[Tuple[int, int, int, int]]] = None
+                            ) -> Tuple[List[Tuple[int, int, int, int]], bool]:
+        """
+        Детекция лиц с использованием OpenCV (оптимизированная версия)
         
-        # Оптимизированные параметры для скорости (меньше точность, но быстрее)
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.2,  # Увеличено для скорости
-            minNeighbors=3,   # Уменьшено для скорости
-            minSize=(20, 20), # Уменьшено для скорости
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
+        Args:
+            frame: Кадр для обработки
+            scale_factor: Масштаб уменьшения кадра для детекции
+            gray: Уже подготовленный уменьшенный grayscale-кадр (см. prepare_frame)
+            regions: Области (x, y, w, h) уменьшенного кадра, в которых искать лица.
+                     None - искать по всему кадру
+            hints: Рамки лиц (top, right, bottom, left) с предыдущего кадра в координатах
+                   исходного кадра. Лица ищутся только в окрестности этих рамок (и в regions).
+                   Как часто сканировать кадр целиком, решает вызывающий код
+        
+        Returns:
+            tuple: (рамки лиц (top, right, bottom, left) на исходном кадре,
+                    был ли кадр просканирован целиком)
+        """
+        full_scan = not hints and regions is None
+        if self.face_cascade is None:
+            return [], full_scan
+        
+        # Уменьшаем разрешение и конвертируем в grayscale, если это не сделано заранее
+        if gray is None:
+            _, gray = self.prepare_frame(frame, scale_factor)
+        
+        if hints:
+            faces = self._detect_in_regions(gray, regions or [])
+            faces.extend(self._detect_around_hints(gray, hints, scale_factor))
+            faces = self._suppress_duplicates(faces)
+        elif regions is not None:
+            faces = self._detect_in_regions(gray, regions)
+        else:
+            faces = self._detect_multiscale(gray)
         
         # Конвертируем формат (x, y, w, h) в (top, right, bottom, left) и масштабируем обратно
         face_locations = []
@@ -94,35 +203,116 @@ class FaceRecognizer:
             left = int(x / scale_factor)
             face_locations.append((top, right, bottom, left))
         
-        return face_locations
+        return face_locations, full_scan
     
-    def recognize_faces(self, frame: np.ndarray, use_scale: bool = True) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
-        """
-        Распознавание лиц на кадре с использованием OpenCV для детекции (оптимизированная версия)
+    def _detect_multiscale(self, gray: np.ndarray, min_size: int = 20,
+                           max_size: Optional[int] = None) -> Any:
+        """Запуск каскада Хаара на grayscale-изображении"""
+        # Оптимизированные параметры для скорости (меньше точность, но быстрее)
+        return self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.2,  # Увеличено для скорости
+            minNeighbors=3,   # Уменьшено для скорости
+            minSize=(min_size, min_size), # Уменьшено для скорости
+            maxSize=(max_size, max_size) if max_size else (0, 0),
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+    
+    def _detect_in_regions(self, gray: np.ndarray,
+                           regions: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+        """Поиск лиц только внутри заданных областей с переводом координат в кадр"""
+        faces: List[Tuple[int, int, int, int]] = []
+        for (rx, ry, rw, rh) in regions:
+            roi = gray[ry:ry + rh, rx:rx + rw]
+            if roi.shape[0] < 20 or roi.shape[1] < 20:
+                continue
+            for (x, y, w, h) in self._detect_multiscale(roi):
+                faces.append((int(x) + rx, int(y) + ry, int(w), int(h)))
+        return faces
+    
+    def _detect_around_hints(self, gray: np.ndarray, hints: List[Tuple[int, int, int, int]],
+                             scale_factor: float) -> List[Tuple[int, int, int, int]]:
+        """Повторная детекция в расширенном окне вокруг каждого известного лица в узком диапазоне масштабов"""
+        from src.motion_detector import expand_region
         
-        Args:
-            frame: Кадр для обработки
-            use_scale: Использовать ли уменьшение разрешения для ускорения
+        height, width = gray.shape[:2]
+        tolerance = self.config.TRACK_SCALE_TOLERANCE
+        faces: List[Tuple[int, int, int, int]] = []
+        
+        for (top, right, bottom, left) in hints:
+            x, y = int(left * scale_factor), int(top * scale_factor)
+            w = max(1, int((right - left) * scale_factor))
+            h = max(1, int((bottom - top) * scale_factor))
+            size = max(w, h)
+            
+            rx, ry, rw, rh = expand_region((x, y, w, h), self.config.TRACK_WINDOW_MARGIN, width, height)
+            min_size = max(20, int(size * (1 - tolerance)))
+            max_size = max(min_size + 1, int(np.ceil(size * (1 + tolerance))))
+            
+            roi = gray[ry:ry + rh, rx:rx + rw]
+            if roi.shape[0] < min_size or roi.shape[1] < min_size:
+                continue
+            for (fx, fy, fw, fh) in self._detect_multiscale(roi, min_size, max_size):
+                faces.append((int(fx) + rx, int(fy) + ry, int(fw), int(fh)))
+        
+        return faces
+    
+    @staticmethod
+    def _suppress_duplicates(faces: List[Tuple[int, int, int, int]],
+                             iou_threshold: float = 0.3) -> List[Tuple[int, int, int, int]]:
+        """Удаление повторных детекций одного лица из пересекающихся окон"""
+        kept: List[Tuple[int, int, int, int]] = []
+        for (x, y, w, h) in faces:
+            duplicate = False
+            for (kx, ky, kw, kh) in kept:
+                inter_w = min(x + w, kx + kw) - max(x, kx)
+                inter_h = min(y + h, ky + kh) - max(y, ky)
+                if inter_w <= 0 or inter_h <= 0:
+                    continue
+                inter = inter_w * inter_h
+                if inter / float(w * h + kw * kh - inter) > iou_threshold:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append((x, y, w, h))
+        return kept
+    
+    def locate_faces(self, frame: np.ndarray, use_scale: bool = True,
+                     scale_factor: Optional[float] = None,
+                     prepared: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                     regions: Optional[List[Tuple[int, int, int, int]]] = None,
+                     hints: Optional[List[Tuple[int, int, int, int]]] = None
+                     ) -> Tuple[Optional[Tuple[np.ndarray, List[Tuple[int, int, int, int]], List[Tuple[int, int, int, int]]]], bool]:
         """
-        if self.centroids is None:
-            return frame, []
+        Детекция лиц и подготовка кадра к извлечению эмбеддингов
         
+        Returns:
+            tuple: ((кадр RGB для эмбеддингов, рамки лиц на нем, рамки лиц на исходном кадре)
+                    или None, если лиц нет; был ли кадр просканирован целиком)
+        """
         # Проверка на пустой кадр
         if frame is None or frame.size == 0:
-            return frame, []
+            return None, False
         
         # Определяем масштаб для обработки
-        scale_factor = self.config.SCALE_FACTOR if use_scale else 1.0
+        if not use_scale:
+            scale_factor = 1.0
+        elif scale_factor is None:
+            scale_factor = self.config.SCALE_FACTOR
+        
+        if prepared is None:
+            prepared = self.prepare_frame(frame, scale_factor)
+        small_frame, gray = prepared
         
         # Детекция лиц с OpenCV на уменьшенном разрешении
-        face_locations = self.detect_faces_opencv(frame, scale_factor=scale_factor)
+        face_locations, full_scan = self.detect_faces_opencv(frame, scale_factor=scale_factor,
+                                                             gray=gray, regions=regions, hints=hints)
         
         if not face_locations:
-            return frame, []
+            return None, full_scan
         
         # Для извлечения эмбеддингов используем уменьшенное разрешение для скорости
         if use_scale and scale_factor < 1.0:
-            small_frame = cv2.resize(frame, (0, 0), fx=scale_factor, fy=scale_factor)
             # Масштабируем координаты лиц для уменьшенного кадра
             scaled_locations = []
             for (top, right, bottom, left) in face_locations:
@@ -138,63 +328,145 @@ class FaceRecognizer:
             processing_frame = frame
             processing_locations = face_locations
         
-        # Конвертация BGR -> RGB для face_recognition
+        # Конвертация BGR -> RGB для dlib
         rgb_frame = cv2.cvtColor(processing_frame, cv2.COLOR_BGR2RGB)
         
         # Убеждаемся, что массив является непрерывным (contiguous) и имеет правильный dtype
         rgb_frame = np.ascontiguousarray(rgb_frame, dtype=np.uint8)
         
-        # Извлечение эмбеддингов только для найденных лиц
-        # Используем num_jitters=0 для скорости (меньше точность, но быстрее)
-        face_encodings = face_recognition.face_encodings(
-            rgb_frame,
-            known_face_locations=processing_locations,
-            num_jitters=0  # Отключаем jitter для скорости
-        )
+        return (rgb_frame, processing_locations, face_locations), full_scan
+    
+    def recognize_faces(self, frame: np.ndarray, use_scale: bool = True,
+                        scale_factor: Optional[float] = None,
+                        prepared: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                        regions: Optional[List[Tuple[int, int, int, int]]] = None,
+                        hints: Optional[List[Tuple[int, int, int, int]]] = None
+                        ) -> Tuple[np.ndarray, List[Dict[str, Any]], bool]:
+        """
+        Распознавание лиц на кадре с использованием OpenCV для детекции (оптимизированная версия)
+        
+        Args:
+            frame: Кадр для обработки
+            use_scale: Использовать ли уменьшение разрешения для ускорения
+            scale_factor: Масштаб обработки (по умолчанию Config.SCALE_FACTOR)
+            prepared: Результат prepare_frame для этого кадра и масштаба
+            regions: Области уменьшенного кадра для детекции (None - весь кадр)
+            hints: Рамки лиц с предыдущего кадра для повторной детекции вокруг них
+        
+        Returns:
+            tuple: (кадр, результаты распознавания, был ли кадр просканирован целиком)
+        """
+        # Снимок модели фиксируется на весь кадр
+        model = self.model
+        if model.centroids is None:
+            return frame, [], False
+        
+        located, full_scan = self.locate_faces(frame, use_scale, scale_factor, prepared, regions, hints)
+        if located is None:
+            return frame, [], full_scan
+        rgb_frame, processing_locations, face_locations = located
+        
+        # Эмбеддинги всех лиц кадра одним вызовом сети (num_jitters=0 для скорости)
+        face_encodings, landmarks = self.encoder.encode(rgb_frame, processing_locations)
+        
+        results = self.match_encodings(list(face_encodings), face_locations, model)
+        self._attach_landmarks(results, landmarks, frame.shape[1] / rgb_frame.shape[1])
+        
+        return frame, results, full_scan
+    
+    def recognize_batch(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        Распознавание лиц на нескольких изображениях
+        
+        Лица всех изображений кодируются общими пакетами (BatchEncoder),
+        что выгодно, когда на каждом изображении одно-два лица.
+        
+        Returns:
+            list: Результаты распознавания для каждого изображения
+        """
+        model = self.model
+        if model.centroids is None:
+            return [[] for _ in frames]
+        
+        located = [self.locate_faces(frame) for frame in frames]
+        encodings = iter(self.encoder.encode_many(
+            [(rgb_frame, locations) for rgb_frame, locations, _ in filter(None, located)]
+        ))
+        
+        results: List[List[Dict[str, Any]]] = []
+        for frame, item in zip(frames, located):
+            if item is None:
+                results.append([])
+                continue
+            face_encodings, landmarks = next(encodings)
+            frame_results = self.match_encodings(list(face_encodings), item[2], model)
+            self._attach_landmarks(frame_results, landmarks, frame.shape[1] / item[0].shape[1])
+            results.append(frame_results)
+        return results
+    
+    @staticmethod
+    def _attach_landmarks(results: List[Dict[str, Any]], landmarks: np.ndarray, scale: float) -> None:
+        """Ключевые точки (в координатах исходного кадра) и поза головы для каждого лица"""
+        from src.batch_encoder import head_pose
+        
+        for result, points in zip(results, landmarks):
+            result['landmarks'] = points * scale
+            result['pose'] = head_pose(points)
+    
+    def match_encodings(self, encodings: List[np.ndarray], locations: List[Tuple[int, int, int, int]],
+                        model: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Сопоставление эмбеддингов лиц с моделью
+        
+        Args:
+            encodings: Эмбеддинги лиц
+            locations: Координаты лиц (top, right, bottom, left)
+            model: Снимок модели (по умолчанию текущий)
+        
+        Returns:
+            list: Результаты распознавания
+        """
+        if model is None:
+            model = self.model
+        if model.centroids is None or len(encodings) == 0:
+            return []
         
         results: List[Dict[str, Any]] = []
+        use_svm = self.use_svm and model.classifier is not None
         
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            # Распознавание
-            if self.use_svm and self.classifier is not None:
-                # Используем SVM классификатор
-                probs = self.classifier.predict_proba([face_encoding])[0]
-                confidence = np.max(probs)
-                label_idx = np.argmax(probs)
-                
-                if confidence < 0.6:
-                    name = "Unknown"
-                    confidence = 1 - confidence
-                else:
-                    name = self.config.LABELS.get(label_idx, f"Class_{label_idx}")
-            
-            else:
-                # Используем метод центроидов
-                if self.centroids is None:
-                    continue
-                    
-                distances: Dict[int, float] = {}
-                for label, centroid in self.centroids.items():
-                    distances[label] = np.linalg.norm(face_encoding - centroid)
-                
-                best_label = min(distances, key=distances.get)
-                best_distance = distances[best_label]
-                
-                if best_distance > self.config.DISTANCE_THRESHOLD:
-                    name = "Unknown"
-                    confidence = 1 - (best_distance / 2.0)
-                else:
-                    name = self.label_names.get(best_label, f"Class_{best_label}")
-                    confidence = 1 - (best_distance / self.config.DISTANCE_THRESHOLD)
-            
+        # Метки, уверенность и расстояния до центроидов одной матричной операцией
+        encodings_matrix = np.asarray(encodings)
+        labels, confidences, distances = model.score(
+            encodings_matrix, use_svm=use_svm, threshold=self.config.DISTANCE_THRESHOLD
+        )
+        
+        for i, (top, right, bottom, left) in enumerate(locations[:len(encodings_matrix)]):
             results.append({
                 'location': (top, right, bottom, left),
-                'name': name,
-                'confidence': confidence,
-                'distance': best_distance if not self.use_svm else None
+                'label': int(labels[i]),
+                'name': model.label_name(int(labels[i])),
+                'confidence': float(confidences[i]),
+                'distance': None if use_svm else float(distances[i]),
+                'encoding': encodings_matrix[i]
             })
         
-        return frame, results
+        return results
+    
+    def rematch(self, results: List[Dict[str, Any]], model: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Повторное сопоставление готовых результатов (с эмбеддингами) текущими
+        моделью, порогом и методом; ключевые точки и поза сохраняются
+        """
+        matched = self.match_encodings([result['encoding'] for result in results],
+                                       [result['location'] for result in results], model)
+        return [dict(result, **update) for result, update in zip(results, matched)]
+    
+    def match_signature(self, model: Optional[Any] = None) -> Tuple[int, bool, float]:
+        """Параметры сопоставления: при их изменении результаты нужно пересчитать"""
+        if model is None:
+            model = self.model
+        return (model.version, bool(self.use_svm and model.classifier is not None),
+                float(self.config.DISTANCE_THRESHOLD))
     
     def draw_results(self, frame: np.ndarray, results: List[Dict[str, Any]]) -> np.ndarray:
         """Отрисовка результатов на кадре"""
@@ -210,17 +482,16 @@ class FaceRecognizer:
             right = min(frame.shape[1], right + padding)
             bottom = min(frame.shape[0], bottom + padding)
             
-            if name == "Aleksander":
-                color = (0, 255, 0)  # Зеленый
-            elif name == "Egor":
-                color = (255, 0, 0)  # Синий
-            elif name == "Unknown":
-                color = (0, 0, 255)  # Красный
-            else:
-                color = (0, 255, 255)  # Желтый
+            # Цвет рамки определяется реестром меток
+            color = self.labels.color(name)
             
             cv2.rectangle(frame, (left, top), (right, bottom), color, 1)
             
+            # Ключевые точки, посчитанные при извлечении эмбеддинга
+            if self.config.DRAW_LANDMARKS and result.get('landmarks') is not None:
+                for x, y in result['landmarks']:
+                    cv2.circle(frame, (int(x), int(y)), 2, color, cv2.FILLED)
+            
             # Фоновая рамка для текста сверху
             text_height = 20
             text_top = max(0, top - text_height)
@@ -238,6 +509,7 @@ class FaceRecognizer:
     def get_model_info(self) -> Dict[str, Any]:
         """Получение информации о загруженных моделях"""
         info: Dict[str, Any] = {
+            "version": self.model.version,
             "centroids_loaded": self.centroids is not None,
             "svm_loaded": self.classifier is not None,
             "num_classes": len(self.centroids) if self.centroids else 0,
@@ -0,0 +1,32 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# Блокировки между потоками по пути файла (flock - между процессами)
+_thread_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Монопольный доступ к файлу на время чтения-изменения-записи
+
+    Блокируется файл-спутник "<path>.lock", сам файл заменяется атомарно
+    как обычно. В Windows (без fcntl) блокировка действует только между
+    потоками одного процесса.
+    """
+    path = os.path.abspath(path)
+    with _registry_lock:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with thread_lock, open(f"{path}.lock", 'a') as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
@@ -3,22 +3,37 @@ import cv2
 import numpy as np
 import json
 from datetime import datetime
-import shutil
+import threading
 from typing import Dict, List, Tuple, Optional, Any
 import warnings
 warnings.filterwarnings("ignore")
 
 class FileProcessor:
-    def __init__(self, recognizer: Any):
+    def __init__(self, recognizer: Any, pool: Optional[Any] = None, use_cache: bool = False,
+                 archive_encodings: bool = False):
         """
         Инициализация процессора файлов
         
         Args:
             recognizer: Объект FaceRecognizer
+            pool: RecognitionWorkerPool для параллельной пакетной обработки
+            use_cache: Использовать кэш результатов по содержимому файла
+                       (если включен Config.RESULT_CACHE_ENABLED)
+            archive_encodings: Сохранять эмбеддинги лиц в архив для пересчета результатов
+                               (если включен Config.ENCODING_ARCHIVE_ENABLED)
         """
         from config import Config
+        from src.label_registry import LabelRegistry
+        from src.result_writer import ResultWriter
+        from src.result_cache import ResultCache
+        from src.encoding_archive import EncodingArchive
         self.config = Config
         self.recognizer = recognizer
+        self.pool = pool
+        self.labels = LabelRegistry()
+        self.writer = ResultWriter(recognizer.draw_results)
+        self.cache = ResultCache() if use_cache and Config.RESULT_CACHE_ENABLED else None
+        self.archive = EncodingArchive() if archive_encodings and Config.ENCODING_ARCHIVE_ENABLED else None
     
     def process_single_image(self, image_path: str, save_result: bool = True) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
         """
@@ -31,28 +46,62 @@ class FileProcessor:
         Returns:
             tuple: (обработанное изображение, результаты)
         """
-        # Загружаем изображение
-        image = cv2.imread(image_path)
+        # Загружаем изображение (байты нужны и для ключа кэша)
+        data = np.fromfile(image_path, dtype=np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
         if image is None:
             raise ValueError(f"Не удалось загрузить изображение: {image_path}")
         
-        # Распознаем лица
-        processed_image, results = self.recognizer.recognize_faces(image)
-        processed_image = self.recognizer.draw_results(processed_image, results)
+        cache_key = self.cache.content_key(data) if self.cache is not None else None
+        processed = self.process_image(image, image_path, save_result=save_result, cache_key=cache_key)
+        if self.cache is not None:
+            self.cache.save(force=False)
+        if self.archive is not None:
+            self.archive.flush(force=False)
+        return processed
+    
+    def process_image(self, image: np.ndarray, image_path: str, save_result: bool = True,
+                      cache_key: Optional[str] = None) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """
+        Обработка уже декодированного изображения
         
-        # Сохраняем результат если нужно
-        if save_result and results:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.basename(image_path)
-            result_path = os.path.join(
-                self.config.RESULTS_DIR, 
-                "images", 
-                f"result_{timestamp}_{filename}"
-            )
-            cv2.imwrite(result_path, processed_image)
+        Args:
+            image: Изображение (BGR)
+            image_path: Путь или имя источника (для имени файла результата)
+            save_result: Сохранять ли результат
+            cache_key: Хэш содержимого файла для кэша результатов
         
+        Returns:
+            tuple: (обработанное изображение, результаты)
+        """
+        # Распознаем лица (или берем результаты из кэша)
+        results = self._cached_results(cache_key)
+        if results is None:
+            _, results, _ = self.recognizer.recognize_faces(image)
+            self._remember_results(image_path, cache_key, results)
+        processed_image = image
+        
+        # Сохраняем результат если нужно (до разметки: вырезки и миниатюры берутся с чистого кадра)
+        if save_result:
+            self.writer.write(image_path, processed_image, results)
+        
+        processed_image = self.recognizer.draw_results(processed_image, results)
         return processed_image, results
     
+    def _cached_results(self, cache_key: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Результаты из кэша (None - нет в кэше или кэш выключен)"""
+        if self.cache is None or cache_key is None:
+            return None
+        return self.cache.lookup(cache_key, self.recognizer)
+    
+    def _remember_results(self, image_path: str, cache_key: Optional[str],
+                          results: List[Dict[str, Any]]) -> None:
+        """Новые результаты - в кэш и в архив эмбеддингов (результаты из кэша уже там)"""
+        if self.cache is not None and cache_key is not None:
+            self.cache.put(cache_key, results, self.recognizer)
+        if self.archive is not None:
+            self.archive.add(image_path, results, self.recognizer.model.version)
+    
     def process_directory(self, directory_path: str) -> Dict[str, Any]:
         """
         Пакетная обработка всех изображений в директории
@@ -72,15 +121,15 @@ class FileProcessor:
         }
         
         # Инициализация счетчиков
-        for label in self.config.LABELS.values():
-            statistics["recognitions"][label] = 0
+        for name in self.labels.names():
+            statistics["recognitions"][name] = 0
         
-        # Находим все изображения
-        image_files: List[str] = []
-        for file in os.listdir(directory_path):
-            ext = os.path.splitext(file)[1].lower()
-            if ext in self.config.IMAGE_EXTENSIONS:
-                image_files.append(os.path.join(directory_path, file))
+        # Находим все изображения (один проход os.scandir)
+        from src.dataset_catalog import scan_images
+        image_files: List[str] = [
+            os.path.join(directory_path, file)
+            for file in scan_images(directory_path, self.config.IMAGE_EXTENSIONS)
+        ]
         
         statistics["total"] = len(image_files)
         
@@ -89,31 +138,112 @@ class FileProcessor:
         
         print(f"🔍 Найдено {len(image_files)} изображений для обработки")
         
-        # Обрабатываем каждое изображение
-        for i, image_path in enumerate(image_files, 1):
-            try:
-                filename = os.path.basename(image_path)
-                print(f"  Обработка {i}/{len(image_files)}: {filename}")
-                
-                _, results = self.process_single_image(image_path, save_result=True)
-                
-                statistics["processed"] += 1
-                statistics["faces_found"] += len(results)
-                
-                # Считаем распознавания
-                for result in results:
-                    name = result['name']
-                    if name in statistics["recognitions"]:
-                        statistics["recognitions"][name] += 1
-                    else:
-                        statistics["recognitions"][name] = 1
-                        
-            except Exception as e:
+        # Чтение, распознавание и запись идут параллельно (конвейер с ограниченными очередями)
+        from src.pipeline import ImagePipeline
+        
+        recognize_lock = threading.Lock()
+        
+        def read_image(image_path: str) -> Tuple[Optional[np.ndarray], Optional[str], Optional[List[Dict[str, Any]]]]:
+            # Файл читается целиком; кэш проверяется до декодирования
+            data = np.fromfile(image_path, dtype=np.uint8)
+            cache_key = self.cache.content_key(data) if self.cache is not None else None
+            cached = self._cached_results(cache_key)
+            if cached is not None and not self.writer.needs_image:
+                return None, cache_key, cached
+            
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Не удалось загрузить изображение: {image_path}")
+            return image, cache_key, cached
+        
+        def recognize(image_path: str, decoded: Tuple[Optional[np.ndarray], Optional[str], Optional[List[Dict[str, Any]]]]
+                      ) -> Tuple[Optional[np.ndarray], List[Dict[str, Any]]]:
+            image, cache_key, cached = decoded
+            if cached is not None:
+                return image, cached
+            # Кадр уходит в пул процессов через разделяемую память, обратно - только результаты.
+            # Сопоставление повторяется здесь: порог и метод (настройки GUI) и версия
+            # модели - этого процесса, они же попадают в подпись кэша
+            results = self.pool.submit_frame(image, name=image_path).result()["results"]
+            results = self.recognizer.rematch(results)
+            self._remember_results(image_path, cache_key, results)
+            return image, results
+        
+        def recognize_batch(image_paths: List[str],
+                            decoded: List[Tuple[Optional[np.ndarray], Optional[str], Optional[List[Dict[str, Any]]]]]
+                            ) -> List[Tuple[Optional[np.ndarray], List[Dict[str, Any]]]]:
+            # Лица нескольких изображений кодируются общими пакетами (BatchEncoder)
+            outputs = [(image, cached) for image, _, cached in decoded]
+            fresh = [i for i, (_, _, cached) in enumerate(decoded) if cached is None]
+            if fresh:
+                with recognize_lock:
+                    batch_results = self.recognizer.recognize_batch([decoded[i][0] for i in fresh])
+                for i, results in zip(fresh, batch_results):
+                    self._remember_results(image_paths[i], decoded[i][1], results)
+                    outputs[i] = (decoded[i][0], results)
+            return outputs
+        
+        def write_result(image_path: str, processed: Tuple[Optional[np.ndarray], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+            # Разметка и кодирование изображения - в потоках записи, по режиму ResultWriter
+            image, results = processed
+            self.writer.write(image_path, image, results)
+            return results
+        
+        done = 0
+        
+        def on_result(image_path: str, results: Optional[List[Dict[str, Any]]],
+                      error: Optional[Exception]) -> None:
+            nonlocal done
+            done += 1
+            print(f"  Обработано {done}/{len(image_files)}: {os.path.basename(image_path)}")
+            if error is not None:
                 statistics["failed"] += 1
-                print(f"  ❌ Ошибка обработки {image_path}: {e}")
+                print(f"  ❌ Ошибка обработки {image_path}: {error}")
+            else:
+                self._count_results(statistics, results)
+        
+        cache_before = self.cache.stats() if self.cache is not None else {}
+        
+        if self.pool is not None:
+            pipeline = ImagePipeline(read_image, recognize, write_result, workers=self.pool.workers)
+        else:
+            pipeline = ImagePipeline(read_image, recognize_batch, write_result,
+                                     batch_size=self.config.PIPELINE_BATCH_SIZE)
+        metrics = pipeline.run(image_files, on_result)
+        statistics["pipeline"] = metrics
+        
+        if self.archive is not None:
+            self.archive.flush()
+        if self.cache is not None:
+            self.cache.save()
+            # Обращения к кэшу за эту обработку
+            statistics["cache"] = {key: value - cache_before[key] if key != "entries" else value
+                                   for key, value in self.cache.stats().items()}
+            print(f"💾 Кэш результатов: {statistics['cache']['hits']} попаданий, "
+                  f"{statistics['cache']['rematched']} пересопоставлено, "
+                  f"{statistics['cache']['misses']} промахов")
+        
+        print(f"📈 Загрузка стадий за {metrics['wall_time']:.1f} с: "
+              f"чтение {metrics['read']['utilization']:.0%}, "
+              f"распознавание {metrics['process']['utilization']:.0%}, "
+              f"запись {metrics['write']['utilization']:.0%}")
         
         return statistics
     
+    @staticmethod
+    def _count_results(statistics: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+        """Учет результатов одного изображения в статистике"""
+        statistics["processed"] += 1
+        statistics["faces_found"] += len(results)
+        
+        # Считаем распознавания
+        for result in results:
+            name = result['name']
+            if name in statistics["recognitions"]:
+                statistics["recognitions"][name] += 1
+            else:
+                statistics["recognitions"][name] = 1
+    
     def create_report(self, statistics: Dict[str, Any], output_file: Optional[str] = None) -> str:
         """
         Создание отчета
@@ -153,6 +283,15 @@ class FileProcessor:
             if count > 0:
                 report_lines.append(f"{name:20}: {count:4} раз")
         
+        # Загрузка стадий конвейера пакетной обработки
+        if "pipeline" in statistics:
+            metrics = statistics["pipeline"]
+            report_lines.extend(["", "ЗАГРУЗКА СТАДИЙ:", "-" * 30])
+            for stage, title in (("read", "Чтение"), ("process", "Распознавание"), ("write", "Запись")):
+                report_lines.append(f"{title:20}: {metrics[stage]['utilization']:.0%} "
+                                    f"({metrics[stage]['threads']} потоков)")
+            report_lines.append(f"{'Общее время':20}: {metrics['wall_time']:.1f} с")
+        
         report_text = "\n".join(report_lines)
         
         # Сохраняем в файл
@@ -188,20 +327,11 @@ class FileProcessor:
                             save_result=True
                         )
                         
-                        # Перемещаем в архив
-                        archive_dir = os.path.join(self.config.UPLOADS_DIR, "processed")
-                        os.makedirs(archive_dir, exist_ok=True)
-                        
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        archive_path = os.path.join(
-                            archive_dir, 
-                            f"processed_{timestamp}_{file}"
-                        )
-                        
-                        shutil.move(file_path, archive_path)
+                        # Перемещаем в архив или удаляем (Config.UPLOADS_ARCHIVE_MODE)
+                        archive_path = self.writer.archive_upload(file_path)
                         processed_files.append({
                             "original": file,
-                            "processed": os.path.basename(archive_path),
+                            "processed": os.path.basename(archive_path) if archive_path else None,
                             "faces_found": len(results),
                             "recognitions": [r['name'] for r in results]
                         })
@@ -0,0 +1,123 @@
+import math
+
+
+class AdaptiveFrameController:
+    """
+    Адаптивный контроллер пропуска кадров для живого видеопотока
+
+    Учитывает задержку распознавания и движение в кадре (см. MotionDetector)
+    и на лету подбирает шаг обработки и масштаб детекции так, чтобы
+    распознавание укладывалось в заданный бюджет CPU.
+    """
+
+    # Коэффициент экспоненциального сглаживания измерений
+    SMOOTHING = 0.2
+    # Шаг изменения масштаба детекции за одну адаптацию
+    SCALE_STEP = 0.05
+
+    def __init__(self):
+        from config import Config
+        self.config = Config
+
+        self.stride = max(1, Config.PROCESS_EVERY_N_FRAMES)
+        self.scale_factor = Config.SCALE_FACTOR
+        self.cache_frames = Config.CACHE_RESULTS_FRAMES
+
+        self.avg_latency = 0.0  # Сглаженное время распознавания одного кадра (сек)
+        self.motion_level = 0.0  # Сглаженная доля изменившихся пикселей
+        self.frames_since_process = 0
+
+    def update_motion(self, ratio: float) -> float:
+        """
+        Учет движения в кадре
+
+        Args:
+            ratio: Доля изменившихся пикселей (см. MotionDetector.update)
+
+        Returns:
+            float: Сглаженная доля изменившихся пикселей (0..1)
+        """
+        self.motion_level += self.SMOOTHING * (ratio - self.motion_level)
+        # Резкое движение учитываем сразу, без сглаживания
+        if ratio > self.motion_level:
+            self.motion_level = ratio
+
+        # Шаг пересчитываем сразу: на статичной сцене распознавание почти не
+        # запускается, и record_latency вызывается слишком редко
+        self._adapt(rescale=False)
+        return self.motion_level
+
+    def should_process(self) -> bool:
+        """Нужно ли запускать распознавание на текущем кадре"""
+        self.frames_since_process += 1
+
+        # Появление движения после простоя - распознаем сразу
+        if (self.motion_level >= self.config.MOTION_ACTIVE_THRESHOLD
+                and self.stride > self.config.ADAPTIVE_MIN_STRIDE):
+            self.stride = self._latency_stride()
+
+        if self.frames_since_process >= self.stride:
+            self.frames_since_process = 0
+            return True
+        return False
+
+    def record_latency(self, seconds: float) -> None:
+        """Учет времени распознавания и адаптация параметров"""
+        if self.avg_latency == 0.0:
+            self.avg_latency = seconds
+        else:
+            self.avg_latency += self.SMOOTHING * (seconds - self.avg_latency)
+
+        self._adapt()
+
+    def _frame_budget(self) -> float:
+        """Время (сек), которое в среднем можно тратить на распознавание за кадр"""
+        return self.config.RECOGNITION_CPU_BUDGET / max(1, self.config.TARGET_FPS)
+
+    def _latency_stride(self) -> int:
+        """Минимальный шаг, при котором распознавание укладывается в бюджет CPU"""
+        stride = math.ceil(self.avg_latency / self._frame_budget()) if self.avg_latency else 1
+        return max(self.config.ADAPTIVE_MIN_STRIDE, min(self.config.ADAPTIVE_MAX_STRIDE, stride))
+
+    def _motion_stride(self) -> int:
+        """Шаг обработки, соответствующий текущему уровню движения"""
+        idle = self.config.MOTION_IDLE_THRESHOLD
+        active = self.config.MOTION_ACTIVE_THRESHOLD
+        min_stride = self.config.ADAPTIVE_MIN_STRIDE
+        max_stride = self.config.ADAPTIVE_MAX_STRIDE
+
+        if self.motion_level <= idle:
+            return max_stride
+        if self.motion_level >= active:
+            return min_stride
+
+        # Линейная интерполяция между простоем и активным движением
+        t = (self.motion_level - idle) / (active - idle)
+        return int(round(max_stride - t * (max_stride - min_stride)))
+
+    def _adapt(self, rescale: bool = True) -> None:
+        """
+        Пересчет шага обработки, масштаба детекции и времени жизни кэша
+
+        Args:
+            rescale: Менять ли масштаб детекции. Масштаб зависит от задержки
+                     распознавания, поэтому меняется только после ее измерения
+        """
+        latency_stride = self._latency_stride()
+        motion_stride = self._motion_stride()
+        self.stride = max(latency_stride, motion_stride)
+
+        # Результаты должны жить не меньше одного шага, иначе рамки мерцают
+        self.cache_frames = max(self.config.CACHE_RESULTS_FRAMES, self.stride)
+        if not rescale:
+            return
+
+        # Если даже при нужном для движения шаге не укладываемся в бюджет -
+        # уменьшаем масштаб детекции; при большом запасе - возвращаем его
+        load = self.avg_latency / (self.stride * self._frame_budget())
+        if latency_stride > motion_stride:
+            self.scale_factor = max(self.config.ADAPTIVE_MIN_SCALE,
+                                    self.scale_factor - self.SCALE_STEP)
+        elif load < 0.5:
+            self.scale_factor = min(self.config.SCALE_FACTOR,
+                                    self.scale_factor + self.SCALE_STEP)
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+from typing import Any, Optional, Tuple
+
+
+class FrameRenderer:
+    """
+    Быстрый вывод видеокадров в Tk-виджет
+
+    Масштабирует кадр через cv2.resize в заранее выделенный буфер, конвертирует
+    цвет в тот же буфер и обновляет один и тот же PhotoImage через paste, вместо
+    создания нового PIL-изображения и PhotoImage на каждый кадр.
+
+    Все методы должны вызываться только из главного потока Tk.
+    """
+
+    def __init__(self, label: Any):
+        """
+        Args:
+            label: Виджет (CTkLabel/tk.Label), в котором показывается видео
+        """
+        self.label = label
+        self.size: Tuple[int, int] = (0, 0)
+        self.resized: Optional[np.ndarray] = None
+        self.rgb: Optional[np.ndarray] = None
+        self.photo: Optional[ImageTk.PhotoImage] = None
+
+    def _allocate(self, width: int, height: int) -> None:
+        """Выделение буферов и PhotoImage под новый размер виджета"""
+        self.size = (width, height)
+        self.resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.photo = ImageTk.PhotoImage(Image.new("RGB", (width, height)))
+        self.label.configure(image=self.photo, text="")
+        self.label.image = self.photo
+
+    def render(self, frame: np.ndarray) -> None:
+        """
+        Отображение кадра BGR в виджете
+
+        Args:
+            frame: Кадр OpenCV (BGR)
+        """
+        width = self.label.winfo_width()
+        height = self.label.winfo_height()
+        if width <= 1 or height <= 1:
+            height, width = frame.shape[:2]
+
+        if (width, height) != self.size:
+            self._allocate(width, height)
+
+        # INTER_AREA лучше при уменьшении, INTER_LINEAR - при увеличении
+        if width < frame.shape[1] or height < frame.shape[0]:
+            interpolation = cv2.INTER_AREA
+        else:
+            interpolation = cv2.INTER_LINEAR
+
+        if (width, height) == (frame.shape[1], frame.shape[0]):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        else:
+            cv2.resize(frame, (width, height), dst=self.resized, interpolation=interpolation)
+            cv2.cvtColor(self.resized, cv2.COLOR_BGR2RGB, dst=self.rgb)
+
+        # frombuffer не копирует данные, paste копирует их сразу в Tk-изображение
+        image = Image.frombuffer("RGB", (width, height), self.rgb, "raw", "RGB", 0, 1)
+        self.photo.paste(image)
+
+    def reset(self) -> None:
+        """Освобождение буферов (например, после остановки камеры)"""
+        self.size = (0, 0)
+        self.resized = None
+        self.rgb = None
+        self.photo = None
@@ -1,8 +1,6 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-import cv2
-from PIL import Image, ImageTk
 import threading
 import time
 from datetime import datetime
@@ -20,21 +18,30 @@ class FaceRecognitionApp(ctk.CTk):
         super().__init__()
         
         from config import Config
-        from src.face_recognizer import FaceRecognizer
-        from src.dataset_utils import DatasetManager
-        from src.train_model import FaceTrainer
-        from src.file_processor import FileProcessor
+        from src.ui_bus import UIUpdateBus
+        from src.label_registry import LabelRegistry
         
         self.config = Config
-        self.recognizer: Optional[FaceRecognizer] = None
-        self.file_processor: Optional[FileProcessor] = None
-        self.dataset_manager = DatasetManager()
-        self.trainer = FaceTrainer()
+        # Все обновления GUI из рабочих потоков идут через шину
+        self.ui_bus = UIUpdateBus()
+        self.label_registry = LabelRegistry()
+        
+        # Тяжелые модули (OpenCV, dlib, face_recognition, scikit-learn) импортируются
+        # при первом обращении или в фоновом потоке, окно появляется сразу
+        self.recognizer: Optional[Any] = None
+        self.file_processor: Optional[Any] = None
+        self._worker_pool: Optional[Any] = None
+        self._dataset_manager: Optional[Any] = None
+        self._trainer: Optional[Any] = None
+        self._lazy_lock = threading.Lock()
+        self._recognizer_lock = threading.Lock()
+        # Устанавливается, когда фоновая загрузка модели завершена (успешно или нет)
+        self.model_ready = threading.Event()
         
         self.setup_ui()
         self.is_running = False
         self.is_monitoring = False
-        self.cap: Optional[cv2.VideoCapture] = None
+        self.cap: Optional[Any] = None
         self.processed_files = queue.Queue()
         
         # Переменные для оптимизации производительности
@@ -42,15 +49,21 @@ class FaceRecognitionApp(ctk.CTk):
         self.cached_frame_count = 0
         self.frame_counter = 0
         
+        # Отрисовка видео в главном потоке (создается с первым кадром)
+        self.frame_renderer: Optional[Any] = None
+        
         # Запускаем мониторинг папки uploads
         self.start_upload_monitor()
         
-        # Загружаем модель если она существует
-        self.load_recognizer()
+        # Загружаем модель в фоне, если она существует
+        self.start_model_loading()
+        
+        # Запускаем цикл применения обновлений GUI
+        self.drain_ui_bus()
     
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
-        self.title("Система распознавания лиц - Aleksander и Egor")
+        self.title("Система распознавания лиц")
         self.geometry(self.config.WINDOW_SIZE)
         
         # Создаем вкладки
@@ -99,14 +112,18 @@ class FaceRecognitionApp(ctk.CTk):
         self.video_label.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Счетчики распознавания
-        stats_frame = ctk.CTkFrame(tab)
-        stats_frame.pack(fill="x", padx=10, pady=(0, 10))
+        self.stats_frame = ctk.CTkFrame(tab)
+        self.stats_frame.pack(fill="x", padx=10, pady=(0, 10))
         
         self.stats_labels = {}
-        for name in ["Aleksander", "Egor", "Unknown"]:
-            label = ctk.CTkLabel(stats_frame, text=f"{name}: 0")
-            label.pack(side="left", padx=20)
-            self.stats_labels[name] = label
+        for name in self.label_registry.names():
+            self.add_stats_label(name)
+    
+    def add_stats_label(self, name: str):
+        """Добавление счетчика распознаваний для класса"""
+        label = ctk.CTkLabel(self.stats_frame, text=f"{name}: 0")
+        label.pack(side="left", padx=20)
+        self.stats_labels[name] = label
     
     def setup_images_tab(self):
         """Настройка вкладки работы с изображениями"""
@@ -236,14 +253,22 @@ class FaceRecognitionApp(ctk.CTk):
         ctk.CTkLabel(right_frame, text="⚙️ Управление", 
                     font=("Arial", 16, "bold")).pack(pady=20)
         
-        # Кнопки захвата фото
-        ctk.CTkButton(right_frame, text="📸 Захватить фото Aleksanderа",
-                     command=lambda: self.capture_photos("Aleksander"),
-                     height=40).pack(pady=5, padx=20, fill="x")
+        # Кнопки захвата фото для зарегистрированных людей
+        for person_name in self.label_registry.names(include_unknown=False):
+            ctk.CTkButton(right_frame, text=f"📸 Захватить фото {person_name}",
+                         command=lambda name=person_name: self.capture_photos(name),
+                         height=40).pack(pady=5, padx=20, fill="x")
         
-        ctk.CTkButton(right_frame, text="📸 Захватить фото Egorа",
-                     command=lambda: self.capture_photos("Egor"),
-                     height=40).pack(pady=5, padx=20, fill="x")
+        # Захват фото нового человека
+        new_person_frame = ctk.CTkFrame(right_frame)
+        new_person_frame.pack(pady=5, padx=20, fill="x")
+        
+        self.new_person_entry = ctk.CTkEntry(new_person_frame, placeholder_text="Имя нового человека")
+        self.new_person_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        
+        ctk.CTkButton(new_person_frame, text="📸 Захватить",
+                     command=self.capture_new_person,
+                     width=120).pack(side="right")
         
         ctk.CTkButton(right_frame, text="🎓 Обновить модель",
                      command=self.train_model,
@@ -280,69 +305,193 @@ class FaceRecognitionApp(ctk.CTk):
         self.model_info_label = ctk.CTkLabel(model_frame, text="Модель не загружена")
         self.model_info_label.pack()
     
+    @property
+    def dataset_manager(self):
+        """Менеджер датасета (создается при первом обращении)"""
+        with self._lazy_lock:
+            if self._dataset_manager is None:
+                from src.dataset_utils import DatasetManager
+                self._dataset_manager = DatasetManager()
+            return self._dataset_manager
+    
+    @property
+    def trainer(self):
+        """Тренер модели (создается при первом обращении)"""
+        with self._lazy_lock:
+            if self._trainer is None:
+                from src.train_model import FaceTrainer
+                self._trainer = FaceTrainer()
+            return self._trainer
+    
+    @property
+    def worker_pool(self):
+        """Пул процессов распознавания (запускается при первой пакетной обработке)"""
+        with self._lazy_lock:
+            if self._worker_pool is None and self.config.RECOGNITION_WORKERS > 0:
+                from src.worker_pool import RecognitionWorkerPool
+                self._worker_pool = RecognitionWorkerPool()
+            return self._worker_pool
+    
+    def get_file_processor(self, use_pool: bool = False):
+        """
+        Общий процессор файлов (создается один раз после загрузки модели)
+        
+        Args:
+            use_pool: Вернуть процессор, отправляющий пакетные задачи в пул процессов
+        """
+        from src.file_processor import FileProcessor
+        
+        with self._lazy_lock:
+            if self.file_processor is None:
+                self.file_processor = FileProcessor(self.recognizer, use_cache=True,
+                                                    archive_encodings=True)
+            processor = self.file_processor
+        if use_pool and processor.pool is None:
+            processor.pool = self.worker_pool
+        return processor
+    
+    def start_model_loading(self):
+        """Фоновая загрузка модели распознавания (готовность - self.model_ready)"""
+        self.model_info_label.configure(text="⏳ Загрузка модели...")
+        thread = threading.Thread(target=self.load_recognizer, daemon=True)
+        thread.start()
+    
     def load_recognizer(self):
-        """Загрузка модели распознавания"""
+        """
+        Загрузка модели распознавания (вызывается из рабочих потоков)
+        
+        Если модель уже загружается в другом потоке, вызов дожидается ее.
+        """
         try:
-            from src.face_recognizer import FaceRecognizer
-            self.recognizer = FaceRecognizer()
+            with self._recognizer_lock:
+                if self.recognizer is not None:
+                    return
+                from src.face_recognizer import FaceRecognizer
+                self.recognizer = FaceRecognizer()
             
             if self.recognizer.centroids is not None:
                 info = self.recognizer.get_model_info()
                 text = f"✅ Модель загружена ({info['method']})\n"
                 text += f"Классов: {info['num_classes']}"
-                self.model_info_label.configure(text=text)
                 self.log_message("Модель распознавания загружена")
             else:
-                self.model_info_label.configure(text="❌ Модель не обучена")
+                text = "❌ Модель не обучена"
                 self.log_message("Модель не найдена. Сначала обучите модель.")
+            
+            self.ui_bus.call(lambda: self.model_info_label.configure(text=text))
                 
         except Exception as e:
             self.log_message(f"❌ Ошибка загрузки модели: {e}")
+        finally:
+            self.model_ready.set()
+    
+    def reload_recognizer(self):
+        """Горячая перезагрузка модели без остановки распознавания"""
+        if self.recognizer is None:
+            self.load_recognizer()
+            return
+        
+        # Перезагрузка могла уже идти (refresh_if_updated) - дожидаемся актуальной версии
+        self.recognizer.reload_models()
+        
+        info = self.recognizer.get_model_info()
+        text = f"✅ Модель загружена ({info['method']})\n"
+        text += f"Классов: {info['num_classes']}, версия: {info['version']}"
+        self.ui_bus.call(lambda: self.model_info_label.configure(text=text))
+        self.log_message(f"Модель распознавания обновлена (версия {info['version']})")
     
     def log_message(self, message: str):
-        """Добавление сообщения в лог"""
-        def update_log():
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            log_entry = f"[{timestamp}] {message}\n"
-            
-            # Добавляем в основной лог (вкладка Изображения)
-            self.image_log_text.configure(state="normal")
-            self.image_log_text.insert("end", log_entry)
-            self.image_log_text.see("end")
-            self.image_log_text.configure(state="disabled")
-        
-        self.after(0, update_log)
+        """Добавление сообщения в лог (можно вызывать из любого потока)"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.ui_bus.post_log("image", f"[{timestamp}] {message}\n")
     
     def log_upload_message(self, message: str):
-        """Добавление сообщения в лог загрузок"""
-        def update_log():
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            
-            self.upload_log_text.configure(state="normal")
-            self.upload_log_text.insert("end", f"[{timestamp}] {message}\n")
-            self.upload_log_text.see("end")
-            self.upload_log_text.configure(state="disabled")
-        
-        self.after(0, update_log)
+        """Добавление сообщения в лог загрузок (можно вызывать из любого потока)"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.ui_bus.post_log("upload", f"[{timestamp}] {message}\n")
     
-    def update_dataset_stats(self):
-        """Обновление статистики датасета"""
+    def drain_ui_bus(self):
+        """Применение накопленных обновлений GUI (главный поток, раз в GUI_UPDATE_INTERVAL)"""
+        scheduled = False
         try:
-            stats = self.dataset_manager.get_dataset_stats()
+            update = self.ui_bus.drain()
             
-            self.stats_text.configure(state="normal")
-            self.stats_text.delete("1.0", "end")
+            # Отрисовываем только последний кадр, промежуточные уже отброшены
+            if update["frame"] is not None and self.is_running:
+                if self.frame_renderer is None:
+                    from src.frame_renderer import FrameRenderer
+                    self.frame_renderer = FrameRenderer(self.video_label)
+                self.frame_renderer.render(update["frame"])
             
-            total = 0
-            for person, count in stats.items():
-                self.stats_text.insert("end", f"• {person}: {count} фото\n")
-                total += count
+            values = update["values"]
+            if "fps" in values:
+                self.fps_label.configure(text=values["fps"])
+            if "counters" in values:
+                for name, count in values["counters"].items():
+                    if name not in self.stats_labels:
+                        self.add_stats_label(name)
+                    self.stats_labels[name].configure(text=f"{name}: {count}")
             
-            self.stats_text.insert("end", f"\n📈 Всего: {total} фото")
-            self.stats_text.configure(state="disabled")
+            # Строки логов вставляем одной операцией на каждый лог
+            log_widgets = {"image": self.image_log_text, "upload": self.upload_log_text}
+            for target, lines in update["logs"].items():
+                self.append_log_lines(log_widgets[target], "".join(lines))
             
-        except Exception as e:
-            self.log_message(f"Ошибка обновления статистики: {e}")
+            # Следующий цикл планируется до вызовов: модальный диалог (messagebox)
+            # крутит вложенный цикл событий, и кадры продолжают отрисовываться
+            self.schedule_ui_drain()
+            scheduled = True
+            for callback in update["calls"]:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"❌ Ошибка обновления GUI: {e}")
+        finally:
+            if not scheduled:
+                self.schedule_ui_drain()
+    
+    def schedule_ui_drain(self):
+        """Планирование следующего применения обновлений GUI"""
+        self.after(max(1, int(self.config.GUI_UPDATE_INTERVAL * 1000)), self.drain_ui_bus)
+    
+    def append_log_lines(self, textbox, text: str):
+        """Добавление текста в лог с ограничением числа строк"""
+        textbox.configure(state="normal")
+        textbox.insert("end", text)
+        
+        # Удаляем старые строки, чтобы лог не рос бесконечно
+        line_count = int(textbox.index("end-1c").split(".")[0])
+        excess = line_count - self.config.UI_LOG_MAX_LINES
+        if excess > 0:
+            textbox.delete("1.0", f"{excess + 1}.0")
+        
+        textbox.see("end")
+        textbox.configure(state="disabled")
+    
+    def update_dataset_stats(self):
+        """Обновление статистики датасета (менеджер датасета и подсчет - в фоновом потоке)"""
+        def stats_thread():
+            try:
+                stats = self.dataset_manager.get_dataset_stats()
+                self.ui_bus.call(lambda: self.show_dataset_stats(stats))
+            except Exception as e:
+                self.log_message(f"Ошибка обновления статистики: {e}")
+        
+        thread = threading.Thread(target=stats_thread, daemon=True)
+        thread.start()
+    
+    def show_dataset_stats(self, stats: Dict[str, int]):
+        """Отображение статистики датасета (главный поток)"""
+        self.stats_text.configure(state="normal")
+        self.stats_text.delete("1.0", "end")
+        
+        total = 0
+        for person, count in stats.items():
+            self.stats_text.insert("end", f"• {person}: {count} фото\n")
+            total += count
+        
+        self.stats_text.insert("end", f"\n📈 Всего: {total} фото")
+        self.stats_text.configure(state="disabled")
     
     def capture_photos(self, person_name: str):
         """Захват фото для указанного человека"""
@@ -351,13 +500,28 @@ class FaceRecognitionApp(ctk.CTk):
                 self.log_message(f"Начало захвата фото для {person_name}...")
                 count = self.dataset_manager.capture_photos(person_name, num_photos=30)
                 self.log_message(f"✅ Захвачено {count} фото для {person_name}")
-                self.update_dataset_stats()
+                self.ui_bus.call(self.update_dataset_stats)
+                
+                # Если модель уже обучена - добавляем новые фото без полного переобучения
+                new_photos = self.dataset_manager.last_captured
+                if new_photos and self.recognizer is not None and self.recognizer.centroids is not None:
+                    self.enroll_photos(person_name, new_photos, self.dataset_manager.last_encodings)
             except Exception as e:
                 self.log_message(f"❌ Ошибка захвата фото: {e}")
         
         thread = threading.Thread(target=capture_thread, daemon=True)
         thread.start()
     
+    def capture_new_person(self):
+        """Захват фото человека, введенного в поле имени"""
+        person_name = self.new_person_entry.get().strip()
+        if not person_name or person_name == self.label_registry.UNKNOWN_NAME:
+            messagebox.showwarning("Внимание", "Введите имя человека")
+            return
+        
+        self.label_registry.get_label(person_name, create=True)
+        self.capture_photos(person_name)
+    
     def train_model(self):
         """Обучение модели"""
         def train_thread():
@@ -368,21 +532,39 @@ class FaceRecognitionApp(ctk.CTk):
                 
                 if success:
                     self.log_message("✅ Модель успешно обучена!")
-                    messagebox.showinfo("Успех", "Модель успешно обучена!")
+                    self.ui_bus.call(lambda: messagebox.showinfo("Успех", "Модель успешно обучена!"))
                     
-                    # Перезагружаем модель
-                    self.load_recognizer()
+                    # Подменяем модель в работающем распознавателе без его пересоздания
+                    self.reload_recognizer()
                 else:
                     self.log_message("❌ Ошибка обучения модели")
-                    messagebox.showerror("Ошибка", "Не удалось обучить модель")
+                    self.ui_bus.call(lambda: messagebox.showerror("Ошибка", "Не удалось обучить модель"))
                     
             except Exception as e:
                 self.log_message(f"❌ Ошибка обучения: {e}")
-                messagebox.showerror("Ошибка", f"Ошибка обучения: {e}")
+                error_text = f"Ошибка обучения: {e}"
+                self.ui_bus.call(lambda: messagebox.showerror("Ошибка", error_text))
         
         thread = threading.Thread(target=train_thread, daemon=True)
         thread.start()
     
+    def enroll_photos(self, person_name: str, image_paths: List[str],
+                      encodings: Optional[List[Any]] = None):
+        """Онлайн-добавление фото в галерею (вызывается из рабочего потока)"""
+        from src.enrollment import OnlineEnroller
+        
+        self.log_message(f"➕ Добавление {len(image_paths)} фото {person_name} в модель...")
+        # Модель перезагружается один раз - через reload_recognizer ниже
+        enroller = OnlineEnroller()
+        stats = enroller.enroll(person_name, image_paths, encodings=encodings)
+        
+        if stats["version"] is not None:
+            self.log_message(f"✅ {person_name}: добавлено {stats['added']} эмбеддингов "
+                             f"(версия модели {stats['version']})")
+            self.reload_recognizer()
+        else:
+            self.log_message(f"⚠️  {person_name}: на новых фото не найдено лиц")
+    
     def update_threshold(self, value: float):
         """Обновление порога распознавания"""
         self.config.DISTANCE_THRESHOLD = round(value, 2)
@@ -401,16 +583,20 @@ class FaceRecognitionApp(ctk.CTk):
     def start_camera(self):
         """Запуск камеры"""
         try:
+            if not self.model_ready.is_set():
+                # Не блокируем главный поток ожиданием фоновой загрузки
+                messagebox.showinfo("Подождите", "Модель еще загружается, попробуйте через несколько секунд")
+                return
             if self.recognizer is None:
-                self.load_recognizer()
-                if self.recognizer is None:
-                    raise RuntimeError("Модель не загружена")
+                raise RuntimeError("Модель не загружена")
             
-            self.cap = cv2.VideoCapture(self.config.CAMERA_INDEX, cv2.CAP_DSHOW)
+            from src.headless_capture import open_video_source
+            self.cap = open_video_source()
             if not self.cap.isOpened():
                 raise RuntimeError("Не удалось открыть камеру")
             
             # Устанавливаем меньшее разрешение для скорости
+            import cv2
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.CAMERA_WIDTH)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.CAMERA_HEIGHT)
             # Устанавливаем FPS (если поддерживается)
@@ -449,11 +635,23 @@ class FaceRecognitionApp(ctk.CTk):
     
     def process_video(self):
         """Обработка видео потока (оптимизированная версия)"""
-        recognition_count = {"Aleksander": 0, "Egor": 0, "Unknown": 0}
+        from src.frame_controller import AdaptiveFrameController
+        from src.motion_detector import MotionDetector, carry_over_results
+        
+        self.label_registry.load()
+        recognition_count = {name: 0 for name in self.label_registry.names()}
         last_update_time = time.time()
         fps_start_time = time.time()
         fps_frame_count = 0
         
+        # Адаптивный шаг обработки по задержке распознавания и движению в кадре
+        controller = AdaptiveFrameController() if self.config.ADAPTIVE_FRAME_SKIP else None
+        motion_gating = self.config.MOTION_GATED_DETECTION
+        motion_detector = MotionDetector() if (controller is not None or motion_gating) else None
+        frames_since_full_scan = 0
+        # Число детекций по подсказкам с момента последнего полного сканирования
+        hinted_detections = 0
+        
         while self.is_running and self.cap:
             ret, frame = self.cap.read()
             if not ret:
@@ -461,13 +659,70 @@ class FaceRecognitionApp(ctk.CTk):
             
             self.frame_counter += 1
             fps_frame_count += 1
+            frames_since_full_scan += 1
             
-            # Пропускаем кадры для ускорения (обрабатываем каждый N-й кадр)
-            process_frame = (self.frame_counter % self.config.PROCESS_EVERY_N_FRAMES == 0)
+            # Новая версия модели подхватывается в фоне, кадры не пропускаются
+            self.recognizer.refresh_if_updated()
+            
+            if motion_detector is not None:
+                # Уменьшенный grayscale-кадр нужен и для оценки движения, и для детекции
+                scale_factor = controller.scale_factor if controller is not None else self.config.SCALE_FACTOR
+                prepared = self.recognizer.prepare_frame(frame, scale_factor)
+                motion_ratio, motion_regions = motion_detector.update(prepared[1])
+            else:
+                scale_factor = None
+                prepared = None
+                motion_ratio, motion_regions = 1.0, []
+            
+            if controller is not None:
+                controller.update_motion(motion_ratio)
+                process_frame = controller.should_process()
+                cache_limit = controller.cache_frames
+            else:
+                # Пропускаем кадры для ускорения (обрабатываем каждый N-й кадр)
+                process_frame = (self.frame_counter % self.config.PROCESS_EVERY_N_FRAMES == 0)
+                cache_limit = self.config.CACHE_RESULTS_FRAMES
+            
+            # Детекция только в изменившихся областях; статичные кадры пропускаем,
+            # но периодически сканируем кадр целиком
+            regions = None
+            if process_frame and motion_gating and frames_since_full_scan < self.config.MOTION_FULL_SCAN_FRAMES:
+                if motion_regions:
+                    regions = motion_regions
+                else:
+                    process_frame = False
+                    # Сцена не изменилась - прежние результаты остаются актуальными
+                    self.cached_frame_count = 0
             
             if process_frame:
+                # Известные лица ищем повторно только в их окрестности
+                hints = None
+                if self.config.TRACK_HINTS_ENABLED and self.cached_results:
+                    hints = [result['location'] for result in self.cached_results]
+                
+                # Периодически сканируем кадр целиком, чтобы находить новые лица
+                if hints and hinted_detections >= self.config.TRACK_FULL_SCAN_INTERVAL:
+                    hints = None
+                    regions = None
+                
                 # Распознавание лиц (с уменьшенным разрешением)
-                processed_frame, results = self.recognizer.recognize_faces(frame, use_scale=True)
+                recognition_start = time.perf_counter()
+                processed_frame, results, full_scan = self.recognizer.recognize_faces(
+                    frame, use_scale=True, scale_factor=scale_factor,
+                    prepared=prepared, regions=regions, hints=hints
+                )
+                if controller is not None:
+                    controller.record_latency(time.perf_counter() - recognition_start)
+                
+                if full_scan:
+                    hinted_detections = 0
+                    frames_since_full_scan = 0
+                elif hints:
+                    hinted_detections += 1
+                
+                # Лица вне областей движения берем из прежних результатов
+                if regions is not None and not full_scan:
+                    results = carry_over_results(self.cached_results, results, regions, scale_factor)
                 
                 # Обновляем кэш результатов
                 self.cached_results = results
@@ -476,8 +731,7 @@ class FaceRecognitionApp(ctk.CTk):
                 # Обновляем счетчики
                 for result in results:
                     name = result['name']
-                    if name in recognition_count:
-                        recognition_count[name] += 1
+                    recognition_count[name] = recognition_count.get(name, 0) + 1
             else:
                 # Используем кэшированные результаты
                 processed_frame = frame.copy()
@@ -485,7 +739,7 @@ class FaceRecognitionApp(ctk.CTk):
                     results = self.cached_results
                     self.cached_frame_count += 1
                     # Если кэш устарел, очищаем его
-                    if self.cached_frame_count > self.config.CACHE_RESULTS_FRAMES:
+                    if self.cached_frame_count > cache_limit:
                         self.cached_results = []
                 else:
                     results = []
@@ -501,31 +755,16 @@ class FaceRecognitionApp(ctk.CTk):
                 fps_elapsed = current_time - fps_start_time
                 if fps_elapsed >= 1.0:  # Обновляем FPS раз в секунду
                     fps = fps_frame_count / fps_elapsed
-                    self.fps_label.configure(text=f"FPS: {fps:.1f}")
+                    fps_text = f"FPS: {fps:.1f}"
+                    if controller is not None:
+                        fps_text += f" | шаг: {controller.stride}"
+                    self.ui_bus.post_value("fps", fps_text)
                     fps_frame_count = 0
                     fps_start_time = current_time
                 
-                # Конвертация для отображения
-                rgb_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(rgb_frame)
-                
-                # Изменение размера под окно
-                window_width = self.video_label.winfo_width()
-                window_height = self.video_label.winfo_height()
-                
-                if window_width > 1 and window_height > 1:
-                    pil_image = pil_image.resize((window_width, window_height), Image.LANCZOS)
-                
-                tk_image = ImageTk.PhotoImage(pil_image)
-                
-                # Обновление изображения
-                self.video_label.configure(image=tk_image)
-                self.video_label.image = tk_image
-                
-                # Обновляем счетчики в GUI
-                for name, count in recognition_count.items():
-                    if name in self.stats_labels:
-                        self.stats_labels[name].configure(text=f"{name}: {count}")
+                # Кадр и счетчики применяются в главном потоке (drain_ui_bus)
+                self.ui_bus.post_frame(processed_frame)
+                self.ui_bus.post_value("counters", dict(recognition_count))
                 
                 last_update_time = current_time
             
@@ -561,6 +800,7 @@ class FaceRecognitionApp(ctk.CTk):
     def display_original_image(self, image_path: str):
         """Отображение оригинального изображения"""
         try:
+            from PIL import Image, ImageTk
             image = Image.open(image_path)
             image.thumbnail((400, 400), Image.LANCZOS)
             
@@ -593,8 +833,7 @@ class FaceRecognitionApp(ctk.CTk):
                         return
                 
                 # Обрабатываем изображение
-                from src.file_processor import FileProcessor
-                processor = FileProcessor(self.recognizer)
+                processor = self.get_file_processor()
                 
                 result_image, results = processor.process_single_image(
                     image_path, 
@@ -602,13 +841,13 @@ class FaceRecognitionApp(ctk.CTk):
                 )
                 
                 # Отображаем результат
+                import cv2
+                from PIL import Image
                 rgb_image = cv2.cvtColor(result_image, cv2.COLOR_BGR2RGB)
                 pil_image = Image.fromarray(rgb_image)
                 pil_image.thumbnail((400, 400), Image.LANCZOS)
                 
-                tk_image = ImageTk.PhotoImage(pil_image)
-                
-                self.after(0, lambda: self.show_result_image(tk_image, results))
+                self.ui_bus.call(lambda: self.show_result_image(pil_image, results))
                 
                 self.log_message(f"✅ Обработано. Найдено лиц: {len(results)}")
                 
@@ -618,8 +857,10 @@ class FaceRecognitionApp(ctk.CTk):
         thread = threading.Thread(target=process_thread, daemon=True)
         thread.start()
     
-    def show_result_image(self, tk_image, results):
-        """Отображение результата обработки"""
+    def show_result_image(self, pil_image, results):
+        """Отображение результата обработки (главный поток)"""
+        from PIL import ImageTk
+        tk_image = ImageTk.PhotoImage(pil_image)
         self.result_image_label.configure(image=tk_image, text="")
         self.result_image_label.image = tk_image
         
@@ -642,8 +883,7 @@ class FaceRecognitionApp(ctk.CTk):
                         self.log_message("❌ Модель не загружена")
                         return
                 
-                from src.file_processor import FileProcessor
-                processor = FileProcessor(self.recognizer)
+                processor = self.get_file_processor(use_pool=True)
                 
                 statistics = processor.process_directory(folder_path)
                 
@@ -655,9 +895,9 @@ class FaceRecognitionApp(ctk.CTk):
                 self.log_message(f"📊 Найдено лиц: {statistics['faces_found']}")
                 
                 # Показываем статистику
-                messagebox.showinfo("Результаты", 
-                                  f"Обработано: {statistics['processed']}/{statistics['total']}\n"
-                                  f"Найдено лиц: {statistics['faces_found']}")
+                summary = (f"Обработано: {statistics['processed']}/{statistics['total']}\n"
+                           f"Найдено лиц: {statistics['faces_found']}")
+                self.ui_bus.call(lambda: messagebox.showinfo("Результаты", summary))
                 
             except Exception as e:
                 self.log_message(f"❌ Ошибка пакетной обработки: {e}")
@@ -702,7 +942,7 @@ class FaceRecognitionApp(ctk.CTk):
                             processed_files.add(file_path)
                     
                     # Обновляем информацию о папке
-                    self.after(0, self.update_upload_info)
+                    self.ui_bus.call(self.update_upload_info)
                 
                 # Ждем перед следующей проверкой
                 time.sleep(self.config.AUTO_PROCESS_INTERVAL)
@@ -723,20 +963,13 @@ class FaceRecognitionApp(ctk.CTk):
                     self.log_upload_message("❌ Модель не загружена")
                     return
             
-            from src.file_processor import FileProcessor
-            processor = FileProcessor(self.recognizer)
+            processor = self.get_file_processor()
             
             # Обрабатываем файл
             result_image, results = processor.process_single_image(file_path, save_result=True)
             
-            # Перемещаем в архив
-            import shutil
-            archive_dir = os.path.join(self.config.UPLOADS_DIR, "processed")
-            os.makedirs(archive_dir, exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            archive_path = os.path.join(archive_dir, f"processed_{timestamp}_{filename}")
-            shutil.move(file_path, archive_path)
+            # Перемещаем в архив или удаляем (Config.UPLOADS_ARCHIVE_MODE)
+            processor.writer.archive_upload(file_path)
             
             # Логируем результат
             if results:
@@ -902,4 +1135,13 @@ class FaceRecognitionApp(ctk.CTk):
         if self.cap:
             self.cap.release()
         
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+        
+        if self.file_processor is not None:
+            if self.file_processor.cache is not None:
+                self.file_processor.cache.save()
+            if self.file_processor.archive is not None:
+                self.file_processor.archive.flush()
+        
         self.destroy()
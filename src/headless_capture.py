@@ -0,0 +1,271 @@
+import os
+import sys
+import time
+import queue
+import threading
+import argparse
+import cv2
+import numpy as np
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+def open_video_source(source: Optional[Union[int, str]] = None) -> cv2.VideoCapture:
+    """
+    Открытие камеры или видеофайла
+
+    Для камеры выбирается бэкенд платформы: DirectShow в Windows,
+    V4L2 в Linux, автоматический выбор OpenCV в остальных случаях.
+
+    Args:
+        source: Индекс камеры, путь к видеофайлу или None (Config.CAMERA_INDEX)
+    """
+    from config import Config
+
+    if source is None:
+        source = Config.CAMERA_INDEX
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, str):
+        return cv2.VideoCapture(source)
+
+    if sys.platform.startswith("win"):
+        backend = cv2.CAP_DSHOW
+    elif sys.platform.startswith("linux"):
+        backend = cv2.CAP_V4L2
+    else:
+        backend = cv2.CAP_ANY
+    cap = cv2.VideoCapture(source, backend)
+    if not cap.isOpened() and backend != cv2.CAP_ANY:
+        cap = cv2.VideoCapture(source)
+    return cap
+
+
+class HeadlessCapture:
+    """
+    Захват фото для датасета без окна
+
+    Три потока работают параллельно:
+    - основной читает кадры и отдает последний из них на проверку
+      (пока кодировщик занят, промежуточные кадры пропускаются);
+    - кодировщик проверяет качество кадра, извлекает эмбеддинг лица и
+      оставляет кадр, только если он отличается от уже сохраненных
+      (расстояние до ближайшего эмбеддинга не меньше порога разнообразия);
+    - писатель сохраняет JPEG на диск, не задерживая захват.
+    """
+
+    def __init__(self, person_name: str, num_photos: int = 30,
+                 source: Optional[Union[int, str]] = None,
+                 min_distance: Optional[float] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            person_name: Имя человека (папка в DATASET_DIR)
+            num_photos: Сколько фото сохранить
+            source: Индекс камеры или путь к видеофайлу
+            min_distance: Порог разнообразия (по умолчанию Config.CAPTURE_DIVERSITY_DISTANCE)
+            timeout: Максимальное время захвата, сек (по умолчанию Config.CAPTURE_TIMEOUT)
+        """
+        from config import Config
+        from src.dataset_validator import DatasetValidator
+        self.config = Config
+        self.person_name = person_name
+        self.num_photos = num_photos
+        self.source = source
+        self.min_distance = Config.CAPTURE_DIVERSITY_DISTANCE if min_distance is None else min_distance
+        self.timeout = Config.CAPTURE_TIMEOUT if timeout is None else timeout
+        self.person_dir = os.path.join(Config.DATASET_DIR, person_name)
+        self.validator = DatasetValidator()
+
+        self.saved_paths: List[str] = []
+        self.encodings: List[np.ndarray] = []
+        self.stats: Dict[str, int] = {
+            "frames": 0,
+            "checked": 0,
+            "rejected_quality": 0,
+            "rejected_similar": 0,
+            "saved": 0,
+        }
+
+        self._frames: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=1)
+        self._writes: "queue.Queue[Optional[Tuple[str, np.ndarray, Dict[str, Any], np.ndarray]]]" = queue.Queue()
+        self._done = threading.Event()
+        self._kept = np.empty((0, 128))
+        self._encoder: Optional[threading.Thread] = None
+        # Ошибки потоков кодировщика и писателя (повторно выбрасываются из run)
+        self._errors: List[BaseException] = []
+
+    def stop(self) -> None:
+        """Остановка захвата"""
+        self._done.set()
+
+    def _load_known_encodings(self) -> np.ndarray:
+        """Эмбеддинги уже имеющихся фото человека (для оценки разнообразия)"""
+        from src.embedding_store import EmbeddingStore
+        from src.label_registry import LabelRegistry
+
+        store = EmbeddingStore(self.config.EMBEDDINGS_FILE)
+        label = LabelRegistry().get_label(self.person_name)
+        if label == LabelRegistry.UNKNOWN_LABEL or not store.exists():
+            return np.empty((0, 128))
+        X, y = store.load()
+        return X[y == label] if len(X) else np.empty((0, 128))
+
+    def _next_filenames(self) -> Iterator[str]:
+        """Генератор свободных имен файлов в папке человека"""
+        taken = set(os.listdir(self.person_dir))
+        prefix = time.strftime("capture_%Y%m%d_%H%M%S")
+        index = 1
+        while True:
+            name = f"{prefix}_{index:03d}.jpg"
+            index += 1
+            if name not in taken:
+                yield os.path.join(self.person_dir, name)
+
+    def _guarded(self, target: Callable[[], None]) -> None:
+        """Запуск цикла потока с сохранением ошибки и остановкой захвата"""
+        try:
+            target()
+        except BaseException as e:
+            self._errors.append(e)
+            self._done.set()
+
+    def _put_frame(self, frame: Optional[np.ndarray]) -> None:
+        """Передача кадра кодировщику с ожиданием (пока он работает)"""
+        while self._encoder is not None and self._encoder.is_alive():
+            try:
+                self._frames.put(frame, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def _encode_loop(self) -> None:
+        """Поток кодировщика: проверка качества и разнообразия кадров"""
+        from src.batch_encoder import BatchEncoder
+        from src.dataset_validator import STATUS_OK
+
+        encoder = BatchEncoder()
+        filenames = self._next_filenames()
+        while not self._done.is_set():
+            try:
+                frame = self._frames.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if frame is None:
+                break
+
+            self.stats["checked"] += 1
+            rgb = np.ascontiguousarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            record = self.validator.check_frame(frame)
+            if record["status"] != STATUS_OK:
+                self.stats["rejected_quality"] += 1
+                continue
+
+            # Ключевые точки уже посчитаны при проверке качества
+            encodings, _ = encoder.encode(rgb, [tuple(record["faces"][0])],
+                                          landmarks=[np.array(record["landmarks"])])
+            if not len(encodings):
+                self.stats["rejected_quality"] += 1
+                continue
+            encoding = encodings[0]
+
+            if len(self._kept):
+                distance = float(np.linalg.norm(self._kept - encoding, axis=1).min())
+                if distance < self.min_distance:
+                    self.stats["rejected_similar"] += 1
+                    continue
+
+            self._kept = np.vstack([self._kept, encoding])
+            self._writes.put((next(filenames), frame, record, encoding))
+            self.stats["saved"] += 1
+            print(f"  🤖 Снимок {self.stats['saved']}/{self.num_photos}")
+            if self.stats["saved"] >= self.num_photos:
+                self._done.set()
+
+    def _write_loop(self) -> None:
+        """Поток писателя: асинхронное сохранение JPEG (эмбеддинг - только для записанных фото)"""
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.config.CAPTURE_JPEG_QUALITY]
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            filename, frame, record, encoding = item
+            if cv2.imwrite(filename, frame, params):
+                self.validator.remember(filename, record)
+                self.saved_paths.append(filename)
+                self.encodings.append(encoding)
+            else:
+                print(f"  ⚠️  Не удалось сохранить {filename}")
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Захват до набора нужного числа фото, конца видео или таймаута
+
+        Returns:
+            dict: Статистика захвата
+        """
+        os.makedirs(self.person_dir, exist_ok=True)
+        cap = open_video_source(self.source)
+        if not cap.isOpened():
+            raise RuntimeError("Не удалось открыть камеру")
+
+        self._kept = self._load_known_encodings()
+        is_file = isinstance(self.source, str) and not self.source.isdigit()
+
+        print(f"📸 Захват без окна: {self.num_photos} фото для {self.person_name}")
+        self._encoder = encoder = threading.Thread(target=self._guarded, args=(self._encode_loop,), daemon=True)
+        writer = threading.Thread(target=self._guarded, args=(self._write_loop,), daemon=True)
+        encoder.start()
+        writer.start()
+
+        started = time.time()
+        try:
+            while not self._done.is_set() and time.time() - started < self.timeout:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.stats["frames"] += 1
+                if is_file:
+                    # Видеофайл читается быстрее реального времени - ждем кодировщик
+                    self._put_frame(frame)
+                    continue
+                # С камеры отдаем только последний кадр
+                try:
+                    self._frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self._put_frame(frame)
+        finally:
+            cap.release()
+            self._put_frame(None)
+            encoder.join()
+            self._writes.put(None)
+            writer.join()
+            if self.saved_paths:
+                self.validator.save()
+
+        if self._errors:
+            raise self._errors[0]
+
+        self.stats["saved"] = len(self.saved_paths)
+        print(f"✅ Сохранено {self.stats['saved']} фото "
+              f"(кадров: {self.stats['frames']}, проверено: {self.stats['checked']}, "
+              f"похожих: {self.stats['rejected_similar']}, "
+              f"низкого качества: {self.stats['rejected_quality']})")
+        return dict(self.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Захват фото для датасета без окна")
+    parser.add_argument("person", help="имя человека (папка в датасете)")
+    parser.add_argument("--count", type=int, default=30, help="сколько фото сохранить")
+    parser.add_argument("--source", default=None, help="индекс камеры или путь к видеофайлу")
+    parser.add_argument("--min-distance", type=float, default=None,
+                        help="минимальное расстояние между эмбеддингами сохраненных кадров")
+    args = parser.parse_args()
+
+    capture = HeadlessCapture(args.person, args.count, source=args.source,
+                              min_distance=args.min_distance)
+    capture.run()
+
+
+if __name__ == "__main__":
+    main()
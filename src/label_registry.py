@@ -0,0 +1,151 @@
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+
+class LabelRegistry:
+    """
+    Реестр меток классов
+
+    Каждому человеку (папке в DATASET_DIR) назначается стабильный целочисленный
+    ID, который сохраняется рядом с моделью (models/labels.json) и не меняется
+    при добавлении новых людей. Папка Unknown и все неизвестные имена получают
+    метку -1. Реестр также задает цвета рамок для отрисовки.
+
+    Реестр загружают несколько долгоживущих объектов (обучение, GUI,
+    распознавание), поэтому новый ID назначается только под блокировкой
+    файла и после перечитывания реестра с диска.
+    """
+
+    UNKNOWN_LABEL = -1
+    UNKNOWN_NAME = "Unknown"
+
+    # Цвета рамок (BGR) для известных людей по порядку ID
+    PALETTE: List[Tuple[int, int, int]] = [
+        (0, 255, 0),     # Зеленый
+        (255, 0, 0),     # Синий
+        (255, 0, 255),   # Пурпурный
+        (255, 255, 0),   # Голубой
+        (0, 165, 255),   # Оранжевый
+        (128, 0, 128),   # Фиолетовый
+        (0, 128, 128),   # Оливковый
+        (203, 192, 255), # Розовый
+    ]
+    UNKNOWN_COLOR = (0, 0, 255)  # Красный
+    DEFAULT_COLOR = (0, 255, 255)  # Желтый
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Файл реестра (по умолчанию Config.LABELS_FILE)
+        """
+        from config import Config
+        self.config = Config
+        self.path = path or Config.LABELS_FILE
+        self.labels: Dict[int, str] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Загрузка реестра из файла (или из Config.LABELS, если файла нет)"""
+        labels: Dict[int, str] = dict(self.config.LABELS)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    labels = {int(label): name for label, name in json.load(f).items()}
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Не удалось прочитать реестр меток: {e}")
+        labels[self.UNKNOWN_LABEL] = self.UNKNOWN_NAME
+        self.labels = labels
+
+    def save(self) -> None:
+        """Атомарное сохранение реестра"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({str(label): name for label, name in sorted(self.labels.items())},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _find(self, name: str) -> Optional[int]:
+        for label, label_name in self.labels.items():
+            if label_name == name:
+                return label
+        return None
+
+    def _assign(self, name: str) -> int:
+        """Новый ID (больше всех ID, уже записанных в реестр)"""
+        label = max([l for l in self.labels if l >= 0], default=-1) + 1
+        self.labels[label] = name
+        return label
+
+    def get_label(self, name: str, create: bool = False) -> int:
+        """
+        ID класса по имени
+
+        Args:
+            name: Имя человека
+            create: Назначить новый ID, если имени нет в реестре
+        """
+        if name == self.UNKNOWN_NAME:
+            return self.UNKNOWN_LABEL
+        label = self._find(name)
+        if label is not None:
+            return label
+        if not create:
+            return self.UNKNOWN_LABEL
+
+        from src.file_lock import file_lock
+
+        with file_lock(self.path):
+            # Имя могло быть зарегистрировано другим экземпляром реестра
+            self.load()
+            label = self._find(name)
+            if label is None:
+                label = self._assign(name)
+                self.save()
+        return label
+
+    def get_name(self, label: int) -> str:
+        """Имя класса по ID"""
+        return self.labels.get(int(label), f"Class_{label}")
+
+    def names(self, include_unknown: bool = True) -> List[str]:
+        """Имена классов в порядке ID (Unknown - последним)"""
+        names = [self.labels[label] for label in sorted(self.labels) if label >= 0]
+        if include_unknown:
+            names.append(self.UNKNOWN_NAME)
+        return names
+
+    def sync_with_dataset(self) -> Dict[int, str]:
+        """
+        Регистрация всех папок людей из DATASET_DIR
+
+        Returns:
+            dict: Актуальный словарь {ID: имя}
+        """
+        from src.file_lock import file_lock
+
+        dataset_dir = self.config.DATASET_DIR
+        with file_lock(self.path):
+            self.load()
+            changed = not os.path.exists(self.path)
+            if os.path.isdir(dataset_dir):
+                for person_name in sorted(os.listdir(dataset_dir)):
+                    if person_name == self.UNKNOWN_NAME or \
+                            not os.path.isdir(os.path.join(dataset_dir, person_name)):
+                        continue
+                    if self._find(person_name) is None:
+                        self._assign(person_name)
+                        changed = True
+            if changed:
+                self.save()
+        return dict(self.labels)
+
+    def color(self, name: str) -> Tuple[int, int, int]:
+        """Цвет рамки (BGR) для имени"""
+        if name == self.UNKNOWN_NAME:
+            return self.UNKNOWN_COLOR
+        label = self.get_label(name)
+        if label == self.UNKNOWN_LABEL:
+            return self.DEFAULT_COLOR
+        return self.PALETTE[label % len(self.PALETTE)]
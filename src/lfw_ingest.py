@@ -0,0 +1,257 @@
+import os
+import json
+import tarfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+
+def safe_person_name(person_name: str, max_length: int = 30) -> str:
+    """Безопасное имя человека для имени файла"""
+    safe_name = person_name.replace(" ", "_").replace("'", "")
+    return safe_name[:max_length]
+
+
+def encode_image_bytes(data: bytes) -> Optional[np.ndarray]:
+    """
+    Декодирование изображения из памяти и извлечение эмбеддинга первого лица
+    
+    Выполняется в процессах пула, поэтому импорты - внутри функции.
+    """
+    import cv2
+    import face_recognition
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    rgb_image = np.ascontiguousarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    encodings = face_recognition.face_encodings(rgb_image)
+    return encodings[0] if encodings else None
+
+
+class LFWStreamIngestor:
+    """
+    Потоковая загрузка LFW из архива .tgz в датасет
+
+    Архив читается последовательно (tarfile в режиме 'r|gz', без чтения
+    индекса через getmembers), изображения отбираются по людям на лету и
+    сразу записываются в датасет. Записанные элементы отмечаются в манифесте,
+    поэтому прерванную загрузку можно продолжить без повторной записи.
+    """
+
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg')
+
+    def __init__(self, tar_path: str, max_per_person: int = 10,
+                 max_people: Optional[int] = None, max_images: Optional[int] = None,
+                 manifest_path: Optional[str] = None):
+        """
+        Args:
+            tar_path: Путь к архиву LFW (.tgz)
+            max_per_person: Максимальное количество фото от одного человека
+            max_people: Максимальное количество людей (None - без ограничения)
+            max_images: Максимальное количество изображений (None - без ограничения)
+            manifest_path: Файл манифеста для продолжения загрузки
+                           (по умолчанию .lfw_manifest.jsonl в папке назначения)
+        """
+        from config import Config
+        self.config = Config
+        self.tar_path = tar_path
+        self.max_per_person = max_per_person
+        self.max_people = max_people
+        self.max_images = max_images
+        self.manifest_path = manifest_path
+
+    def get_manifest_path(self, dest_dir: str) -> str:
+        """Путь к манифесту загрузки в папку dest_dir"""
+        return self.manifest_path or os.path.join(dest_dir, ".lfw_manifest.jsonl")
+
+    @staticmethod
+    def load_manifest(manifest_path: str) -> Set[str]:
+        """Имена элементов архива, обработанных в предыдущих запусках"""
+        done: Set[str] = set()
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        done.add(json.loads(line)["member"])
+        return done
+
+    def iter_images(self, skip: Optional[Set[str]] = None) -> Iterator[Tuple[str, str, str, Optional[bytes]]]:
+        """
+        Последовательный обход архива с отбором изображений по людям
+
+        Args:
+            skip: Элементы, которые не нужно читать (уже обработаны)
+
+        Yields:
+            tuple: (имя элемента архива, имя человека, имя файла, байты или None для пропущенных)
+        """
+        skip = skip or set()
+        per_person: Dict[str, int] = {}
+        selected = 0
+
+        with tarfile.open(self.tar_path, 'r|gz') as tar:
+            for member in tar:
+                if not member.isfile() or not member.name.lower().endswith(self.IMAGE_EXTENSIONS):
+                    continue
+
+                parts = member.name.split('/')
+                if len(parts) < 2:
+                    continue
+                person_name, filename = parts[-2], parts[-1]
+
+                count = per_person.get(person_name)
+                if count is None:
+                    if self.max_people is not None and len(per_person) >= self.max_people:
+                        continue
+                    count = 0
+                if count >= self.max_per_person:
+                    continue
+                if self.max_images is not None and selected >= self.max_images:
+                    break
+
+                per_person[person_name] = count + 1
+                selected += 1
+
+                if member.name in skip:
+                    yield member.name, person_name, filename, None
+                    continue
+
+                # В потоковом режиме данные элемента доступны только до перехода к следующему
+                data = tar.extractfile(member).read()
+                yield member.name, person_name, filename, data
+
+    def ingest_to_dataset(self, dest_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Запись отобранных изображений в папку датасета за один проход
+
+        Args:
+            dest_dir: Папка назначения (по умолчанию DATASET_DIR/Unknown)
+
+        Returns:
+            dict: Статистика загрузки
+        """
+        dest_dir = dest_dir or os.path.join(self.config.DATASET_DIR, "Unknown")
+        os.makedirs(dest_dir, exist_ok=True)
+        manifest_path = self.get_manifest_path(dest_dir)
+
+        done = self.load_manifest(manifest_path)
+        stats: Dict[str, Any] = {"added": 0, "resumed": 0, "failed": 0, "people": set()}
+
+        print(f"📦 Потоковая загрузка {self.tar_path}")
+        if done:
+            print(f"  Продолжение: уже обработано {len(done)} файлов")
+
+        with open(manifest_path, 'a', encoding='utf-8') as manifest:
+            for member_name, person_name, filename, data in self.iter_images(skip=done):
+                stats["people"].add(person_name)
+                if data is None:
+                    stats["resumed"] += 1
+                    continue
+
+                dst = os.path.join(dest_dir, f"lfw_{safe_person_name(person_name)}_{filename}")
+                try:
+                    # Пишем через временный файл, чтобы в датасете не осталось обрывков
+                    tmp_path = f"{dst}.part"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, dst)
+                except OSError as e:
+                    print(f"⚠️  Ошибка записи {dst}: {e}")
+                    stats["failed"] += 1
+                    continue
+
+                manifest.write(json.dumps({"member": member_name, "file": os.path.basename(dst)}) + "\n")
+                stats["added"] += 1
+                if stats["added"] % 1000 == 0:
+                    manifest.flush()
+                    print(f"  Записано {stats['added']} файлов")
+
+        stats["people"] = len(stats["people"])
+        print(f"✅ Добавлено: {stats['added']} фото ({stats['people']} человек), "
+              f"пропущено как уже загруженные: {stats['resumed']}")
+        return stats
+
+    def ingest_embeddings(self, store_path: Optional[str] = None, workers: Optional[int] = None,
+                          batch_size: int = 256) -> Dict[str, Any]:
+        """
+        Извлечение эмбеддингов прямо из архива без записи изображений на диск
+
+        Изображения декодируются из байтов элементов архива (cv2.imdecode) в пуле
+        процессов, эмбеддинги дописываются в хранилище чанками с меткой Unknown.
+        Число изображений в обработке ограничено, поэтому память не зависит
+        от размера архива.
+
+        Args:
+            store_path: Хранилище эмбеддингов (по умолчанию Config.LFW_EMBEDDINGS_FILE)
+            workers: Число процессов (по умолчанию Config.ENCODING_WORKERS)
+            batch_size: Размер чанка, дописываемого в хранилище
+
+        Returns:
+            dict: Статистика извлечения
+        """
+        from src.embedding_store import EmbeddingStore
+
+        store = EmbeddingStore(store_path or self.config.LFW_EMBEDDINGS_FILE)
+        os.makedirs(os.path.dirname(store.path), exist_ok=True)
+        manifest_path = self.manifest_path or f"{store.path}.manifest.jsonl"
+        workers = workers or self.config.ENCODING_WORKERS
+        max_in_flight = workers * 4
+
+        done = self.load_manifest(manifest_path)
+        stats: Dict[str, Any] = {"encoded": 0, "no_face": 0, "resumed": 0}
+
+        print(f"🧠 Извлечение эмбеддингов из {self.tar_path} ({workers} процессов)")
+        if done:
+            print(f"  Продолжение: уже обработано {len(done)} файлов")
+
+        pending: Deque[Tuple[str, Future]] = deque()
+        batch: List[Tuple[str, Optional[np.ndarray]]] = []
+
+        def flush_batch(manifest) -> None:
+            # Сначала чанк эмбеддингов, затем отметки в манифесте - так
+            # после прерывания ничего не будет потеряно или записано дважды
+            encodings = [encoding for _, encoding in batch if encoding is not None]
+            if encodings:
+                store.append(np.array(encodings), np.full(len(encodings), -1))
+            for member_name, encoding in batch:
+                manifest.write(json.dumps({"member": member_name, "face": encoding is not None}) + "\n")
+            manifest.flush()
+            batch.clear()
+
+        def collect(manifest) -> None:
+            member_name, future = pending.popleft()
+            try:
+                encoding = future.result()
+            except Exception as e:
+                print(f"    ❌ Ошибка {member_name}: {e}")
+                encoding = None
+            if encoding is None:
+                stats["no_face"] += 1
+            else:
+                stats["encoded"] += 1
+            batch.append((member_name, encoding))
+            if len(batch) >= batch_size:
+                flush_batch(manifest)
+                print(f"  Обработано {stats['encoded'] + stats['no_face']} изображений")
+
+        with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            for member_name, _, _, data in self.iter_images(skip=done):
+                if data is None:
+                    stats["resumed"] += 1
+                    continue
+                pending.append((member_name, executor.submit(encode_image_bytes, data)))
+                if len(pending) >= max_in_flight:
+                    collect(manifest)
+
+            while pending:
+                collect(manifest)
+            flush_batch(manifest)
+
+        print(f"✅ Эмбеддингов: {stats['encoded']}, без лица: {stats['no_face']}, "
+              f"пропущено как уже обработанные: {stats['resumed']}")
+        print(f"💾 Эмбеддинги сохранены в: {store.path}")
+        return stats
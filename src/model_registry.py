@@ -0,0 +1,186 @@
+import os
+import json
+import pickle
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class ModelSnapshot:
+    """
+    Неизменяемый снимок обученной модели
+
+    Распознаватель берет ссылку на снимок один раз на кадр, поэтому замена
+    снимка новым (простое присваивание ссылки) безопасна во время обработки.
+    """
+
+    def __init__(self, version: int, centroids: Optional[Dict[int, np.ndarray]],
+                 label_names: Dict[int, str], classifier: Optional[Any] = None,
+                 counts: Optional[Dict[int, float]] = None):
+        self.version = version
+        self.centroids = centroids
+        self.label_names = label_names
+        self.classifier = classifier
+        # Суммарный вес эмбеддингов каждого центроида (для инкрементального обновления)
+        self.counts = counts
+
+        # Матрица центроидов для векторного вычисления расстояний
+        if centroids:
+            self.centroid_labels = np.array(list(centroids.keys()))
+            self.centroid_matrix = np.stack([centroids[label] for label in self.centroid_labels])
+        else:
+            self.centroid_labels = np.array([], dtype=int)
+            self.centroid_matrix = np.empty((0, 128))
+
+    def label_name(self, label: int) -> str:
+        """Имя класса по метке (-1 - Unknown)"""
+        from src.label_registry import LabelRegistry
+        if label == LabelRegistry.UNKNOWN_LABEL:
+            return LabelRegistry.UNKNOWN_NAME
+        return self.label_names.get(label, f"Class_{label}")
+
+    def score(self, encodings: np.ndarray, use_svm: bool = False,
+              threshold: float = 0.6) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Векторное сопоставление эмбеддингов с моделью
+
+        Расстояния до центроидов считаются через матричное произведение
+        (|x|^2 - 2 x*c + |c|^2), поэтому блок из любого числа эмбеддингов
+        обрабатывается несколькими операциями BLAS.
+
+        Args:
+            encodings: Матрица эмбеддингов (N, 128)
+            use_svm: Использовать SVM-классификатор (если загружен)
+            threshold: Порог расстояния для метода центроидов
+
+        Returns:
+            tuple: (метки, уверенность, расстояния) - метка -1 означает Unknown,
+                   расстояние NaN для SVM
+        """
+        from src.label_registry import LabelRegistry
+
+        encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+        count = len(encodings)
+        if count == 0 or not self.centroids:
+            return np.empty((0,), dtype=int), np.empty((0,)), np.empty((0,))
+
+        if use_svm and self.classifier is not None:
+            probs = self.classifier.predict_proba(encodings)
+            best = probs.argmax(axis=1)
+            confidences = probs[np.arange(count), best]
+            labels = np.asarray(self.classifier.classes_)[best].astype(int)
+            unknown = confidences < 0.6
+            labels[unknown] = LabelRegistry.UNKNOWN_LABEL
+            confidences = np.where(unknown, 1 - confidences, confidences)
+            return labels, confidences, np.full(count, np.nan)
+
+        squared = (np.einsum("ij,ij->i", encodings, encodings)[:, None]
+                   - 2.0 * encodings @ self.centroid_matrix.T
+                   + np.einsum("ij,ij->i", self.centroid_matrix, self.centroid_matrix)[None, :])
+        best = squared.argmin(axis=1)
+        distances = np.sqrt(np.maximum(squared[np.arange(count), best], 0.0))
+        labels = self.centroid_labels[best].astype(int)
+        unknown = distances > threshold
+        labels[unknown] = LabelRegistry.UNKNOWN_LABEL
+        confidences = np.where(unknown, 1 - distances / 2.0, 1 - distances / threshold)
+        return labels, confidences, distances
+
+    @classmethod
+    def empty(cls) -> "ModelSnapshot":
+        """Снимок без обученной модели"""
+        return cls(version=0, centroids=None, label_names={})
+
+
+class ModelRegistry:
+    """
+    Версионированный реестр файлов модели
+
+    Файлы модели записываются во временный файл и атомарно переименовываются
+    (os.replace), после чего публикуется новый номер версии. Читатели дешево
+    проверяют номер версии и загружают новый снимок только при его изменении.
+
+    Изменение модели (полное обучение, онлайн-добавление) выполняется под
+    блокировкой lock(), чтобы изменения не перезаписывали друг друга.
+    """
+
+    def __init__(self):
+        from config import Config
+        self.config = Config
+        self.version_file = Config.MODEL_VERSION_FILE
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Монопольное изменение файлов модели (чтение-изменение-публикация)"""
+        from src.file_lock import file_lock
+
+        with file_lock(self.version_file):
+            yield
+
+    @staticmethod
+    def write_atomic(path: str, obj: Any) -> None:
+        """Запись объекта в pickle через временный файл и атомарное переименование"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def current_version(self) -> int:
+        """Номер опубликованной версии модели (0 - версия не публиковалась)"""
+        try:
+            with open(self.version_file, 'r', encoding='utf-8') as f:
+                return int(json.load(f).get("version", 0))
+        except (OSError, ValueError):
+            return 0
+
+    def publish(self) -> int:
+        """
+        Публикация новой версии после записи всех файлов модели
+
+        Returns:
+            int: Номер новой версии
+        """
+        version = self.current_version() + 1
+        info = {"version": version, "published_at": time.time()}
+
+        tmp_path = f"{self.version_file}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(tmp_path, self.version_file)
+
+        print(f"📦 Опубликована версия модели: {version}")
+        return version
+
+    def load_snapshot(self, use_svm: bool = False) -> ModelSnapshot:
+        """
+        Загрузка согласованного снимка модели
+
+        Если во время чтения была опубликована новая версия, чтение повторяется.
+        """
+        for _ in range(3):
+            version = self.current_version()
+            snapshot = self._read_snapshot(version, use_svm)
+            if self.current_version() == version:
+                return snapshot
+        return snapshot
+
+    def _read_snapshot(self, version: int, use_svm: bool) -> ModelSnapshot:
+        """Чтение файлов модели"""
+        if not os.path.exists(self.config.CENTROIDS_FILE):
+            return ModelSnapshot(version, None, {})
+
+        # Файл центроидов: (центроиды, имена) или (центроиды, имена, количества)
+        with open(self.config.CENTROIDS_FILE, 'rb') as f:
+            data = pickle.load(f)
+        centroids, label_names = data[0], data[1]
+        counts = data[2] if len(data) > 2 else None
+
+        classifier = None
+        if use_svm and os.path.exists(self.config.CLASSIFIER_FILE):
+            with open(self.config.CLASSIFIER_FILE, 'rb') as f:
+                classifier = pickle.load(f)
+
+        return ModelSnapshot(version, centroids, label_names, classifier, counts)
@@ -0,0 +1,156 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+Region = Tuple[int, int, int, int]  # (x, y, w, h)
+
+
+class MotionDetector:
+    """
+    Дешевый детектор движения на уменьшенных grayscale-кадрах
+
+    Поддерживает фоновую модель (скользящее среднее) и для каждого кадра
+    возвращает долю изменившихся пикселей и прямоугольники областей изменений.
+    Используется для пропуска детекции на статичных кадрах и для ограничения
+    detectMultiScale только изменившимися областями.
+    """
+
+    def __init__(self):
+        from config import Config
+        self.config = Config
+        self.background: Optional[np.ndarray] = None
+        self.motion_ratio = 0.0
+        self.regions: List[Region] = []
+
+    def reset(self) -> None:
+        """Сброс фоновой модели"""
+        self.background = None
+        self.motion_ratio = 0.0
+        self.regions = []
+
+    def update(self, gray: np.ndarray) -> Tuple[float, List[Region]]:
+        """
+        Обновление фоновой модели новым кадром
+
+        Args:
+            gray: Уменьшенный grayscale-кадр (тот же, что используется для детекции)
+
+        Returns:
+            tuple: (доля изменившихся пикселей, области изменений в координатах gray)
+        """
+        height, width = gray.shape[:2]
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        # Первый кадр - изменившимся считается весь кадр
+        if self.background is None:
+            self.background = blurred.astype(np.float32)
+            self.motion_ratio = 1.0
+            self.regions = [(0, 0, width, height)]
+            return self.motion_ratio, self.regions
+
+        # Смена масштаба детекции (см. AdaptiveFrameController) - масштабируем фон,
+        # а не сбрасываем его, иначе каждая адаптация выглядит как движение во весь кадр
+        if self.background.shape != blurred.shape:
+            self.background = cv2.resize(self.background, (width, height), interpolation=cv2.INTER_AREA)
+
+        diff = cv2.absdiff(blurred, cv2.convertScaleAbs(self.background))
+        _, mask = cv2.threshold(diff, self.config.MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+
+        self.motion_ratio = cv2.countNonZero(mask) / float(mask.size)
+        cv2.accumulateWeighted(blurred, self.background, self.config.MOTION_BACKGROUND_ALPHA)
+
+        if self.motion_ratio < self.config.MOTION_IDLE_THRESHOLD:
+            self.regions = []
+            return self.motion_ratio, self.regions
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.config.MOTION_MIN_REGION_AREA
+        boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) >= min_area]
+
+        self.regions = merge_regions(
+            [expand_region(box, self.config.MOTION_REGION_MARGIN, width, height) for box in boxes]
+        )
+        return self.motion_ratio, self.regions
+
+
+def expand_region(region: Region, margin: float, width: int, height: int,
+                  min_size: int = 24) -> Region:
+    """
+    Расширение области на долю margin от ее размера с обрезкой по границам кадра
+
+    Движется обычно только часть головы, поэтому область расширяется, чтобы
+    в нее целиком попало лицо.
+    """
+    x, y, w, h = region
+    pad_x = max(int(w * margin), (min_size - w) // 2, 0)
+    pad_y = max(int(h * margin), (min_size - h) // 2, 0)
+
+    left = max(0, x - pad_x)
+    top = max(0, y - pad_y)
+    right = min(width, x + w + pad_x)
+    bottom = min(height, y + h + pad_y)
+    return left, top, right - left, bottom - top
+
+
+def merge_regions(regions: List[Region]) -> List[Region]:
+    """Объединение пересекающихся областей, чтобы лица не детектировались дважды"""
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        result: List[Region] = []
+        for region in merged:
+            for i, other in enumerate(result):
+                if _intersects(region, other):
+                    result[i] = _union(region, other)
+                    changed = True
+                    break
+            else:
+                result.append(region)
+        merged = result
+    return merged
+
+
+def _intersects(a: Region, b: Region) -> bool:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def _union(a: Region, b: Region) -> Region:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    left, top = min(ax, bx), min(ay, by)
+    right, bottom = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+    return left, top, right - left, bottom - top
+
+
+def carry_over_results(previous: List[Dict[str, Any]], current: List[Dict[str, Any]],
+                       regions: List[Region], scale_factor: float) -> List[Dict[str, Any]]:
+    """
+    Объединение новых результатов с прежними из неизменившихся областей
+
+    Детекция запускается только в областях движения, поэтому лица вне них
+    (неподвижные) берутся из предыдущих результатов, если они не были
+    найдены заново (например, повторной детекцией по подсказкам).
+
+    Args:
+        previous: Результаты с предыдущего распознавания (координаты исходного кадра)
+        current: Результаты распознавания в областях движения
+        regions: Области движения в координатах уменьшенного кадра
+        scale_factor: Масштаб уменьшенного кадра
+    """
+    def to_region(location: Tuple[int, int, int, int]) -> Region:
+        top, right, bottom, left = location
+        return (int(left * scale_factor), int(top * scale_factor),
+                max(1, int((right - left) * scale_factor)),
+                max(1, int((bottom - top) * scale_factor)))
+
+    occupied = list(regions) + [to_region(result['location']) for result in current]
+    kept: List[Dict[str, Any]] = []
+    for result in previous:
+        box = to_region(result['location'])
+        if not any(_intersects(box, region) for region in occupied):
+            kept.append(result)
+    return kept + current
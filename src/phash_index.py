@@ -0,0 +1,148 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Число единичных битов для каждого значения байта
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(hashes: np.ndarray, query: int) -> np.ndarray:
+    """
+    Расстояния Хэмминга от хэша query до массива 64-битных хэшей
+
+    Args:
+        hashes: Массив хэшей (uint64)
+        query: Хэш запроса
+
+    Returns:
+        np.ndarray: Расстояния (uint8)
+    """
+    xor = np.bitwise_xor(hashes, np.uint64(query))
+    return _POPCOUNT[xor.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+
+def hash_file(path: str) -> Optional[int]:
+    """dHash файла изображения (None, если файл не читается)"""
+    import cv2
+    from src.dataset_validator import compute_dhash
+
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    return compute_dhash(gray)
+
+
+class PHashIndex:
+    """
+    Индекс перцептивных хэшей (dHash) фото датасета
+
+    Хэши хранятся массивом uint64, поэтому запрос - это один XOR и подсчет
+    битов по всему массиву. Хэши берутся из кэша проверки качества
+    (DatasetValidator), недостающие считаются по уменьшенному изображению.
+    """
+
+    def __init__(self, max_distance: Optional[int] = None):
+        """
+        Args:
+            max_distance: Порог расстояния Хэмминга для дубликатов
+                          (по умолчанию Config.DUPLICATE_MAX_DISTANCE)
+        """
+        from config import Config
+        self.config = Config
+        self.max_distance = Config.DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+        self.paths: List[str] = []
+        self.hashes = np.empty((0,), dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str], validator: Optional[object] = None,
+                   max_distance: Optional[int] = None) -> "PHashIndex":
+        """
+        Построение индекса по файлам
+
+        Args:
+            paths: Пути к фото
+            validator: DatasetValidator, из кэша которого берутся хэши
+            max_distance: Порог расстояния Хэмминга для дубликатов
+        """
+        index = cls(max_distance)
+        items: List[Tuple[str, int]] = []
+        for path in paths:
+            record = validator.get_cached(path) if validator is not None else None
+            value = int(record["dhash"], 16) if record and record.get("dhash") else hash_file(path)
+            if value is not None:
+                items.append((path, value))
+        index.paths = [path for path, _ in items]
+        index.hashes = np.array([value for _, value in items], dtype=np.uint64)
+        return index
+
+    def add(self, path: str, value: int) -> None:
+        """Добавление хэша в индекс"""
+        self.paths.append(path)
+        self.hashes = np.append(self.hashes, np.uint64(value))
+
+    def query(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Поиск похожих фото
+
+        Returns:
+            list: Пары (путь, расстояние) по возрастанию расстояния
+        """
+        if not len(self.hashes):
+            return []
+        max_distance = self.max_distance if max_distance is None else max_distance
+        distances = hamming_distances(self.hashes, value)
+        matches = np.flatnonzero(distances <= max_distance)
+        matches = matches[np.argsort(distances[matches], kind="stable")]
+        return [(self.paths[i], int(distances[i])) for i in matches]
+
+    def is_duplicate(self, value: int) -> bool:
+        """Есть ли в индексе почти такое же фото"""
+        return bool(len(self.hashes)) and \
+            int(hamming_distances(self.hashes, value).min()) <= self.max_distance
+
+    def duplicate_groups(self, block_size: int = 256) -> np.ndarray:
+        """
+        Группировка почти одинаковых фото
+
+        Все пары сравниваются блоками (XOR блока с массивом), пары в пределах
+        порога объединяются (система непересекающихся множеств).
+
+        Returns:
+            np.ndarray: Номер группы для каждого фото индекса
+        """
+        count = len(self.hashes)
+        parent = np.arange(count)
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        packed = self.hashes.view(np.uint8).reshape(-1, 8)
+        for start in range(0, count, block_size):
+            block = packed[start:start + block_size]
+            # Сравниваем блок только с фото, идущими после его начала
+            xor = np.bitwise_xor(block[:, None, :], packed[None, start:, :])
+            distances = _POPCOUNT[xor].sum(axis=2, dtype=np.uint8)
+            rows, cols = np.nonzero(distances <= self.max_distance)
+            rows, cols = rows + start, cols + start
+            for row, col in zip(rows[rows < cols], cols[rows < cols]):
+                root_a, root_b = find(row), find(col)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+        return np.array([find(i) for i in range(count)], dtype=int)
+
+    def weights(self) -> Dict[str, float]:
+        """
+        Веса фото для обучения: каждая группа дубликатов в сумме весит 1
+
+        Returns:
+            dict: {путь: вес}
+        """
+        groups = self.duplicate_groups()
+        _, inverse, sizes = np.unique(groups, return_inverse=True, return_counts=True)
+        return {path: 1.0 / sizes[inverse[i]] for i, path in enumerate(self.paths)}
@@ -0,0 +1,219 @@
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Маркер конца потока задач
+_STOP = object()
+
+
+class StageMetrics:
+    """Метрики стадии конвейера: число элементов, время работы и ожидания"""
+
+    def __init__(self, name: str, threads: int):
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0  # Время обработки элементов (сумма по потокам)
+        self.wait_input = 0.0  # Простой в ожидании входных данных
+        self.wait_output = 0.0  # Простой из-за заполненной следующей очереди
+        self._lock = threading.Lock()
+
+    def add(self, busy: float = 0.0, wait_input: float = 0.0, wait_output: float = 0.0,
+            items: int = 0, errors: int = 0) -> None:
+        with self._lock:
+            self.busy += busy
+            self.wait_input += wait_input
+            self.wait_output += wait_output
+            self.items += items
+            self.errors += errors
+
+    def to_dict(self, wall_time: float) -> Dict[str, Any]:
+        """Метрики со средней загрузкой потоков стадии"""
+        capacity = max(wall_time * self.threads, 1e-9)
+        return {
+            "threads": self.threads,
+            "items": self.items,
+            "errors": self.errors,
+            "busy": round(self.busy, 3),
+            "wait_input": round(self.wait_input, 3),
+            "wait_output": round(self.wait_output, 3),
+            "utilization": round(min(self.busy / capacity, 1.0), 3),
+        }
+
+
+class ImagePipeline:
+    """
+    Трехстадийный конвейер пакетной обработки изображений
+
+    Потоки чтения декодируют файлы, потоки распознавания обрабатывают
+    изображения, потоки записи кодируют и сохраняют результаты. Стадии
+    связаны очередями ограниченной глубины, поэтому быстрая стадия
+    останавливается (backpressure), а не накапливает кадры в памяти.
+    Пока идет распознавание, чтение и запись соседних файлов продолжаются.
+
+    При batch_size > 1 стадия обработки забирает из очереди сразу несколько
+    готовых элементов и передает их process_fn списками (пакетное
+    извлечение эмбеддингов), не дожидаясь заполнения пакета. Если пакет
+    завершился ошибкой, его элементы обрабатываются повторно по одному,
+    и ошибка достается только плохому элементу.
+    """
+
+    def __init__(self, read_fn: Callable[[str], Any], process_fn: Callable[[str, Any], Any],
+                 write_fn: Callable[[str, Any], Any], readers: Optional[int] = None,
+                 workers: Optional[int] = None, writers: Optional[int] = None,
+                 depth: Optional[int] = None, batch_size: int = 1):
+        """
+        Args:
+            read_fn: Чтение: путь -> данные
+            process_fn: Обработка: (путь, данные) -> результат
+            write_fn: Запись: (путь, результат) -> итог для вызывающего кода
+            readers: Потоков чтения (по умолчанию Config.PIPELINE_READERS)
+            workers: Потоков обработки (по умолчанию Config.PIPELINE_WORKERS)
+            writers: Потоков записи (по умолчанию Config.PIPELINE_WRITERS)
+            depth: Глубина очередей между стадиями (по умолчанию Config.PIPELINE_QUEUE_DEPTH)
+            batch_size: Максимум элементов в пакете обработки; при batch_size > 1
+                        process_fn принимает (пути, данные) списками и возвращает список
+        """
+        from config import Config
+        self.config = Config
+        self.read_fn = read_fn
+        self.process_fn = process_fn
+        self.write_fn = write_fn
+        self.readers = readers or Config.PIPELINE_READERS
+        self.workers = workers or Config.PIPELINE_WORKERS
+        self.writers = writers or Config.PIPELINE_WRITERS
+        self.depth = depth or Config.PIPELINE_QUEUE_DEPTH
+        self.batch_size = max(1, batch_size)
+        self.metrics: Dict[str, StageMetrics] = {}
+
+    def _stage(self, name: str, fn: Callable[..., Any], inbox: "queue.Queue", outbox: "queue.Queue",
+               metrics: StageMetrics, remaining: List[int], lock: threading.Lock,
+               downstream: int, first: bool, batch_size: int = 1) -> None:
+        """Поток стадии: берет элементы из inbox, кладет результаты в outbox"""
+        stopping = False
+        while not stopping:
+            started = time.perf_counter()
+            item = inbox.get()
+            waited = time.perf_counter() - started
+            if item is _STOP:
+                metrics.add(wait_input=waited)
+                break
+
+            # Добираем в пакет элементы, которые уже ждут в очереди
+            items = [item]
+            while len(items) < batch_size:
+                try:
+                    extra = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is _STOP:
+                    stopping = True
+                    break
+                items.append(extra)
+
+            entries = [[item, None, None] if first else list(item) for item in items]
+            # Ошибки предыдущей стадии передаются дальше без обработки
+            pending = [entry for entry in entries if entry[2] is None]
+            failed = 0
+            started = time.perf_counter()
+            if batch_size > 1 and pending:
+                try:
+                    outputs = fn([entry[0] for entry in pending], [entry[1] for entry in pending])
+                    for entry, output in zip(pending, outputs):
+                        entry[1] = output
+                except Exception:
+                    # Пакет повторяется по одному элементу: ошибка остается только у плохого
+                    for entry in pending:
+                        try:
+                            entry[1] = fn([entry[0]], [entry[1]])[0]
+                        except Exception as e:
+                            entry[1], entry[2] = None, e
+                            failed += 1
+            else:
+                for entry in pending:
+                    try:
+                        entry[1] = fn(entry[0]) if first else fn(entry[0], entry[1])
+                    except Exception as e:
+                        entry[1], entry[2] = None, e
+                        failed += 1
+            busy = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for entry in entries:
+                outbox.put(tuple(entry))
+            metrics.add(busy=busy, wait_input=waited, wait_output=time.perf_counter() - started,
+                        items=len(entries), errors=failed)
+
+        # Последний завершившийся поток стадии останавливает следующую стадию
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(downstream):
+                outbox.put(_STOP)
+
+    def run(self, paths: Iterable[str], on_result: Callable[[str, Any, Optional[Exception]], None]) -> Dict[str, Any]:
+        """
+        Обработка набора файлов
+
+        Args:
+            paths: Пути к изображениям
+            on_result: Вызывается для каждого файла: (путь, итог записи, ошибка или None)
+
+        Returns:
+            dict: Метрики стадий и общее время
+        """
+        paths_queue: "queue.Queue" = queue.Queue()
+        decoded: "queue.Queue" = queue.Queue(maxsize=self.depth)
+        processed: "queue.Queue" = queue.Queue(maxsize=self.depth)
+        done: "queue.Queue" = queue.Queue()
+
+        total = 0
+        for path in paths:
+            paths_queue.put(path)
+            total += 1
+        for _ in range(self.readers):
+            paths_queue.put(_STOP)
+
+        self.metrics = {
+            "read": StageMetrics("read", self.readers),
+            "process": StageMetrics("process", self.workers),
+            "write": StageMetrics("write", self.writers),
+        }
+        stages = [
+            ("read", self.read_fn, paths_queue, decoded, self.readers, self.workers, True, 1),
+            ("process", self.process_fn, decoded, processed, self.workers, self.writers, False, self.batch_size),
+            ("write", self.write_fn, processed, done, self.writers, 1, False, 1),
+        ]
+
+        started = time.perf_counter()
+        threads: List[threading.Thread] = []
+        for name, fn, inbox, outbox, count, downstream, first, batch_size in stages:
+            remaining, lock = [count], threading.Lock()
+            for _ in range(count):
+                thread = threading.Thread(
+                    target=self._stage,
+                    args=(name, fn, inbox, outbox, self.metrics[name], remaining, lock, downstream, first,
+                          batch_size),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        # Итоги отдаются вызывающему коду в его потоке
+        while True:
+            item = done.get()
+            if item is _STOP:
+                break
+            on_result(*item)
+
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - started
+
+        report = {name: stage.to_dict(wall_time) for name, stage in self.metrics.items()}
+        report["wall_time"] = round(wall_time, 3)
+        report["total"] = total
+        return report
@@ -0,0 +1,195 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class ResultCache:
+    """
+    Кэш результатов распознавания по содержимому файла
+
+    Ключ - хэш байтов изображения, поэтому повторная загрузка того же файла
+    (под любым именем) не требует декодирования, детекции и извлечения
+    эмбеддингов. Вместе с результатами хранятся эмбеддинги лиц: после смены
+    модели или порога заново выполняется только сопоставление
+    (FaceRecognizer.match_encodings). Размер ограничен (LRU).
+
+    На диске кэш - снимок (path) и журнал (path.log): при сохранении в журнал
+    дописываются только новые и пересопоставленные записи, снимок
+    перезаписывается целиком лишь когда журнал становится больше самого кэша.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            path: Файл кэша (по умолчанию Config.RESULT_CACHE_FILE)
+            max_entries: Максимум изображений в кэше (по умолчанию Config.RESULT_CACHE_SIZE)
+        """
+        from config import Config
+        self.config = Config
+        self.path = path or Config.RESULT_CACHE_FILE
+        self.max_entries = max_entries or Config.RESULT_CACHE_SIZE
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.rematched = 0
+        self.misses = 0
+        self.log_path = f"{self.path}.log"
+        # Ключи, измененные после последнего сохранения
+        self._changed: Set[str] = set()
+        # Записей в журнале после последнего сжатия
+        self._logged = 0
+        self._last_save = time.time()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    self.entries = pickle.load(f)
+            except Exception as e:
+                print(f"⚠️  Кэш результатов поврежден, будет создан заново: {e}")
+                self.entries = OrderedDict()
+
+        if not os.path.exists(self.log_path):
+            return
+        # Журнал - последовательность пакетов [(ключ, запись), ...]; недописанный
+        # после сбоя хвост отрезается, иначе следующие пакеты не прочитаются
+        broken_at: Optional[int] = None
+        with open(self.log_path, 'rb') as f:
+            while True:
+                position = f.tell()
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception as e:
+                    print(f"⚠️  Журнал кэша результатов прочитан не полностью: {e}")
+                    broken_at = position
+                    break
+                for key, entry in batch:
+                    self.entries[key] = entry
+                    self.entries.move_to_end(key)
+                self._logged += len(batch)
+        if broken_at is not None:
+            os.truncate(self.log_path, broken_at)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def content_key(data: Any) -> str:
+        """Хэш содержимого файла (bytes или массив uint8)"""
+        return hashlib.blake2b(memoryview(data), digest_size=16).hexdigest()
+
+    def _detector_signature(self) -> Tuple[float, str]:
+        # Рамки зависят от масштаба обработки, эмбеддинги - от модели ключевых точек
+        return float(self.config.SCALE_FACTOR), self.config.LANDMARK_MODEL
+
+    def lookup(self, key: str, recognizer: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        Результаты для изображения из кэша
+
+        Если с момента записи изменилась модель или порог, лица
+        сопоставляются заново по сохраненным эмбеддингам.
+
+        Returns:
+            list: Результаты распознавания или None, если изображения нет в кэше
+        """
+        model = recognizer.model
+        signature = recognizer.match_signature(model)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["detector"] != self._detector_signature():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            results = entry["results"]
+            stale = entry["match"] != signature
+
+        if stale:
+            # Сопоставление заново; ключевые точки и поза сохраняются
+            results = recognizer.rematch(results, model)
+            with self._lock:
+                entry.update(results=results, match=signature)
+                self.rematched += 1
+                self._changed.add(key)
+        else:
+            with self._lock:
+                self.hits += 1
+        return [dict(result) for result in results]
+
+    def put(self, key: str, results: List[Dict[str, Any]], recognizer: Any) -> None:
+        """Сохранение результатов изображения (только при загруженной модели)"""
+        model = recognizer.model
+        if model.centroids is None:
+            return
+        with self._lock:
+            self.entries[key] = {
+                "results": [dict(result) for result in results],
+                "match": recognizer.match_signature(model),
+                "detector": self._detector_signature(),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._changed.add(key)
+
+    def save(self, force: bool = True) -> None:
+        """
+        Сохранение изменений на диск: дозапись в журнал, при его разрастании - сжатие
+
+        Args:
+            force: False - сохранять не чаще Config.RESULT_CACHE_SAVE_INTERVAL
+        """
+        from src.file_lock import file_lock
+
+        with self._lock:
+            if not self._changed:
+                return
+            if not force and time.time() - self._last_save < self.config.RESULT_CACHE_SAVE_INTERVAL:
+                return
+            # В порядке LRU; вытесненные ключи не пишутся - при загрузке кэш снова обрезается
+            batch = [(key, dict(entry)) for key, entry in self.entries.items() if key in self._changed]
+            self._changed.clear()
+            self._logged += len(batch)
+            compact = self._logged > len(self.entries)
+            snapshot = OrderedDict(self.entries) if compact else None
+            if compact:
+                self._logged = 0
+            self._last_save = time.time()
+
+        if snapshot is not None:
+            self.compact(snapshot)
+            return
+        with file_lock(self.path), open(self.log_path, 'ab') as f:
+            pickle.dump(batch, f)
+            f.flush()
+
+    def compact(self, snapshot: Optional["OrderedDict[str, Dict[str, Any]]"] = None) -> None:
+        """Перезапись снимка кэша целиком и удаление журнала"""
+        from src.file_lock import file_lock
+        from src.model_registry import ModelRegistry
+
+        if snapshot is None:
+            with self._lock:
+                snapshot = OrderedDict(self.entries)
+                self._logged = 0
+        with file_lock(self.path):
+            ModelRegistry.write_atomic(self.path, snapshot)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика обращений к кэшу"""
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "rematched": self.rematched,
+            "misses": self.misses,
+        }
@@ -0,0 +1,166 @@
+import os
+import json
+import shutil
+import threading
+import cv2
+import numpy as np
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Режимы сохранения результатов обработки изображений
+OUTPUT_RESULTS = "results"  # Только записи в DETECTIONS_FILE, без изображений
+OUTPUT_THUMBNAIL = "thumbnail"  # Уменьшенная копия с разметкой
+OUTPUT_CROPS = "crops"  # Отдельный файл для каждого лица
+OUTPUT_FULL = "full"  # Полноразмерная копия с разметкой
+OUTPUT_MODES = (OUTPUT_RESULTS, OUTPUT_THUMBNAIL, OUTPUT_CROPS, OUTPUT_FULL)
+
+# Что делать с обработанным файлом из uploads
+ARCHIVE_MOVE = "move"
+ARCHIVE_DELETE = "delete"
+
+
+class ResultWriter:
+    """
+    Сохранение результатов обработки изображений
+
+    Распознавания каждого изображения дописываются строкой JSON в
+    DETECTIONS_FILE, изображения пишутся в зависимости от режима: ничего,
+    миниатюра, вырезки лиц или полная размеченная копия. Исходное
+    изображение не изменяется - разметка рисуется на копии или миниатюре.
+    """
+
+    def __init__(self, draw_fn: Callable[[np.ndarray, List[Dict[str, Any]]], np.ndarray],
+                 mode: Optional[str] = None, jpeg_quality: Optional[int] = None):
+        """
+        Args:
+            draw_fn: Отрисовка результатов на кадре (FaceRecognizer.draw_results)
+            mode: Режим сохранения (по умолчанию Config.RESULT_OUTPUT_MODE)
+            jpeg_quality: Качество JPEG (по умолчанию Config.RESULT_JPEG_QUALITY)
+        """
+        from config import Config
+        self.config = Config
+        self.draw_fn = draw_fn
+        self.mode = mode or Config.RESULT_OUTPUT_MODE
+        if self.mode not in OUTPUT_MODES:
+            raise ValueError(f"Неизвестный режим сохранения результатов: {self.mode}")
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY,
+                            jpeg_quality or Config.RESULT_JPEG_QUALITY]
+        self.detections_file = Config.DETECTIONS_FILE
+        self._lock = threading.Lock()
+
+    @property
+    def needs_image(self) -> bool:
+        """Нужно ли изображение для сохранения (в режиме results - нет)"""
+        return self.mode != OUTPUT_RESULTS
+
+    def _output_path(self, image_path: str, prefix: str, subdir: str = "images") -> str:
+        """Путь файла результата в RESULTS_DIR/<subdir>"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        directory = os.path.join(self.config.RESULTS_DIR, subdir)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{prefix}_{timestamp}_{name}.jpg")
+
+    def _write_image(self, path: str, image: np.ndarray) -> Optional[str]:
+        if cv2.imwrite(path, image, self.jpeg_params):
+            return path
+        print(f"⚠️  Не удалось сохранить {path}")
+        return None
+
+    def _write_thumbnail(self, image_path: str, image: np.ndarray,
+                         results: List[Dict[str, Any]]) -> List[str]:
+        # Разметка рисуется уже на миниатюре: подписи остаются читаемыми
+        size = self.config.RESULT_THUMBNAIL_SIZE
+        scale = min(1.0, size / float(max(image.shape[:2])))
+        thumbnail = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) \
+            if scale < 1.0 else image.copy()
+        scaled = [
+            dict(result, location=tuple(int(value * scale) for value in result['location']))
+            for result in results
+        ]
+        path = self._write_image(self._output_path(image_path, "thumb"), self.draw_fn(thumbnail, scaled))
+        return [path] if path else []
+
+    def _write_crops(self, image_path: str, image: np.ndarray,
+                     results: List[Dict[str, Any]]) -> List[str]:
+        height, width = image.shape[:2]
+        margin = self.config.RESULT_CROP_MARGIN
+        paths: List[str] = []
+        for i, result in enumerate(results):
+            top, right, bottom, left = result['location']
+            pad_y, pad_x = int((bottom - top) * margin), int((right - left) * margin)
+            crop = image[max(0, top - pad_y):min(height, bottom + pad_y),
+                         max(0, left - pad_x):min(width, right + pad_x)]
+            if crop.size == 0:
+                continue
+            path = self._output_path(image_path, f"face{i + 1}", os.path.join("faces", result['name']))
+            if self._write_image(path, crop):
+                paths.append(path)
+        return paths
+
+    def _append_detections(self, image_path: str, results: List[Dict[str, Any]],
+                           outputs: List[str]) -> None:
+        record = {
+            "source": image_path,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "faces": [
+                {
+                    "name": result['name'],
+                    "confidence": round(float(result['confidence']), 4),
+                    "distance": None if result.get('distance') is None else round(float(result['distance']), 4),
+                    "location": [int(value) for value in result['location']],
+                }
+                for result in results
+            ],
+            "outputs": [os.path.relpath(path, self.config.RESULTS_DIR) for path in outputs],
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.detections_file), exist_ok=True)
+            with open(self.detections_file, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def write(self, image_path: str, image: Optional[np.ndarray],
+              results: List[Dict[str, Any]]) -> List[str]:
+        """
+        Сохранение результатов одного изображения
+
+        Args:
+            image_path: Путь или имя источника
+            image: Исходное изображение без разметки (BGR), в режиме results не нужно
+            results: Результаты распознавания
+
+        Returns:
+            list: Пути сохраненных изображений
+        """
+        outputs: List[str] = []
+        if image is not None and results:
+            if self.mode == OUTPUT_FULL:
+                path = self._write_image(self._output_path(image_path, "result"),
+                                         self.draw_fn(image.copy(), results))
+                outputs = [path] if path else []
+            elif self.mode == OUTPUT_THUMBNAIL:
+                outputs = self._write_thumbnail(image_path, image, results)
+            elif self.mode == OUTPUT_CROPS:
+                outputs = self._write_crops(image_path, image, results)
+        self._append_detections(image_path, results, outputs)
+        return outputs
+
+    def archive_upload(self, file_path: str) -> Optional[str]:
+        """
+        Архивирование обработанного файла из uploads (Config.UPLOADS_ARCHIVE_MODE)
+
+        Returns:
+            str: Путь в архиве или None, если файл удален
+        """
+        if self.config.UPLOADS_ARCHIVE_MODE == ARCHIVE_DELETE:
+            os.remove(file_path)
+            return None
+
+        archive_dir = os.path.join(self.config.UPLOADS_DIR, "processed")
+        os.makedirs(archive_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        archive_path = os.path.join(archive_dir, f"processed_{timestamp}_{os.path.basename(file_path)}")
+        # В пределах одной файловой системы это переименование, без копирования данных
+        shutil.move(file_path, archive_path)
+        return archive_path
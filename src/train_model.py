@@ -1,18 +1,32 @@
 import os
-import pickle
+import time
 import numpy as np
 import face_recognition
 from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-from typing import Tuple, Optional, Any, Dict
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Tuple, Optional, Any, Deque, Dict, List
 import warnings
 warnings.filterwarnings("ignore")
 
 class FaceTrainer:
     def __init__(self):
         from config import Config
+        from src.model_registry import ModelRegistry
+        from src.embedding_store import EmbeddingStore
+        from src.label_registry import LabelRegistry
+        from src.dataset_catalog import DatasetCatalog
+        from src.dataset_validator import DatasetValidator
         self.config = Config
+        self.labels = LabelRegistry()
+        self.registry = ModelRegistry()
+        self.store = EmbeddingStore(Config.EMBEDDINGS_FILE)
+        self.catalog = DatasetCatalog()
+        self.validator = DatasetValidator()
+        # Негативы, извлеченные прямо из архива LFW (см. LFWStreamIngestor)
+        self.external_store = EmbeddingStore(Config.LFW_EMBEDDINGS_FILE)
     
     def extract_embeddings(self) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -23,50 +37,184 @@ class FaceTrainer:
         """
         X: List[np.ndarray] = []  # Эмбеддинги
         y: List[int] = []  # Метки
+        w: List[float] = []  # Веса (почти одинаковые фото делят вес группы)
         
         print("📊 Извлечение эмбеддингов из датасета...")
         
-        for person_name in os.listdir(self.config.DATASET_DIR):
-            person_path = os.path.join(self.config.DATASET_DIR, person_name)
-            if not os.path.isdir(person_path):
-                continue
-            
-            # Определяем метку класса
-            if person_name == "Aleksander":
-                label = 0
-            elif person_name == "Egor":
-                label = 1
-            elif person_name == "Unknown":
-                label = -1
-            else:
-                label = -1  # Другие папки тоже считаем неизвестными
-            
-            print(f"  Обработка: {person_name} (класс {label})")
-            
-            # Обрабатываем все изображения в папке
-            processed = 0
-            for file in os.listdir(person_path):
-                if not file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    continue
-                
-                img_path = os.path.join(person_path, file)
+        # Каждая папка датасета получает стабильный ID класса
+        self.labels.sync_with_dataset()
+        
+        from src.dataset_validator import STATUS_UNREADABLE, is_trainable
+        from src.phash_index import PHashIndex
+        from src.batch_encoder import BatchEncoder, encode_augmented_chips
+        from src.chip_cache import ChipCache
+        
+        encoder = BatchEncoder()
+        batch_size = self.config.ENCODING_BATCH_SIZE
+        # Вырезки лиц строятся один раз на фото и переиспользуются при переобучении
+        chip_cache = ChipCache() if self.config.CHIP_CACHE_ENABLED else None
+        aligned = 0
+        
+        # Искажения при обучении: эмбеддинг фото усредняется по вариантам вырезки
+        num_jitters = self.config.TRAIN_NUM_JITTERS
+        flip = self.config.TRAIN_AUGMENT_FLIP
+        passes = max(num_jitters, 1) * (2 if flip else 1)
+        workers = self.config.ENCODING_WORKERS if passes > 1 else 1
+        # Время на фото: {с искажениями/без: [секунды, фото]}
+        costs: Dict[bool, List[float]] = {True: [0.0, 0], False: [0.0, 0]}
+        
+        def encode_batch(chips: np.ndarray, augment: bool) -> np.ndarray:
+            if augment:
+                return encoder.encode_augmented(chips, num_jitters, flip)
+            return encoder.encode_chips(chips)
+        
+        def encode_each(batch_paths: List[str], batch_chips: np.ndarray,
+                        augment: bool) -> List[Tuple[str, np.ndarray]]:
+            # Пакет с ошибкой повторяется по одной вырезке: пропускается только плохое фото
+            encoded = []
+            for img_path, chip in zip(batch_paths, batch_chips):
                 try:
-                    # Загружаем и кодируем изображение
-                    image = face_recognition.load_image_file(img_path)
-                    encodings = face_recognition.face_encodings(image)
+                    encoded.append((img_path, encode_batch(chip[np.newaxis], augment)[0]))
+                except Exception as e:
+                    print(f"    ❌ Ошибка {os.path.basename(img_path)}: {e}")
+            return encoded
+        
+        # Пакеты, отправленные в пул; не больше max_in_flight, чтобы вырезки
+        # и результаты всех пакетов человека не копились в памяти
+        pending: Deque[Tuple[List[str], np.ndarray, List[Future]]] = deque()
+        max_in_flight = workers * 2
+        
+        def collect(augment: bool) -> List[Tuple[str, np.ndarray]]:
+            batch_paths, batch_chips, futures = pending.popleft()
+            try:
+                return list(zip(batch_paths, np.concatenate([future.result() for future in futures])))
+            except Exception as e:
+                print(f"    ⚠️  Ошибка пакета из {len(batch_paths)} фото, повтор по одному: {e}")
+                return encode_each(batch_paths, batch_chips, augment)
+        
+        # Лица ищутся один раз: рамки и метрики качества берутся из кэша проверки
+        people = self.catalog.people()
+        quality = self.validator.validate(
+            [img_path for person_name in people for img_path in self.catalog.files(person_name)]
+        )
+        skipped: Dict[str, int] = {}
+        
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        if passes > 1:
+            print(f"🎲 Искажения при обучении: jitter {num_jitters}, зеркало: {'да' if flip else 'нет'} "
+                  f"({passes} проходов сети на фото, процессов: {workers})")
+        
+        # Процессы пула останавливаются и при ошибке посреди обучения
+        try:
+            for person_name in people:
+                
+                # Определяем метку класса
+                label = self.labels.get_label(person_name)
+                
+                print(f"  Обработка: {person_name} (класс {label})")
+                
+                # Плохие фото пропускаются без повторного декодирования
+                good_paths: List[str] = []
+                for img_path in self.catalog.files(person_name):
+                    record = quality.get(img_path)
+                    if not is_trainable(record, self.config):
+                        status = record["status"] if record else STATUS_UNREADABLE
+                        skipped[status] = skipped.get(status, 0) + 1
+                    else:
+                        good_paths.append(img_path)
+                
+                # Почти одинаковые фото (по dHash) получают общий вес
+                weights = PHashIndex.from_paths(good_paths, self.validator).weights()
+                duplicates = sum(1 for weight in weights.values() if weight < 1.0)
+                if duplicates:
+                    print(f"    🔁 Почти одинаковых фото: {duplicates} (вес снижен)")
+                
+                # Папка Unknown по умолчанию кодируется без искажений
+                augment = passes > 1 and (label != self.labels.UNKNOWN_LABEL or self.config.TRAIN_AUGMENT_UNKNOWN)
+                started = time.perf_counter()
+                
+                # Обрабатываем изображения пакетами: лица кодируются одним вызовом сети на пакет
+                processed = 0
+                encoded: List[Tuple[str, np.ndarray]] = []
+                for start in range(0, len(good_paths), batch_size):
+                    batch_paths = good_paths[start:start + batch_size]
+                    # Выровненные вырезки из кэша - без декодирования и выравнивания
+                    chips = chip_cache.get_many(batch_paths) if chip_cache is not None else {}
+                    for img_path in batch_paths:
+                        if img_path in chips:
+                            continue
+                        try:
+                            # Загружаем изображение, лицо кодируется по готовой рамке
+                            image = face_recognition.load_image_file(img_path)
+                            # Ключевые точки лица берутся из кэша проверки (выравнивание без предиктора)
+                            record = quality[img_path]
+                            landmarks = [np.array(record["landmarks"])] if record.get("landmarks") else None
+                            image_chips, _ = encoder.align(image, [tuple(record["faces"][0])], landmarks)
+                        except Exception as e:
+                            print(f"    ❌ Ошибка {os.path.basename(img_path)}: {e}")
+                            continue
+                        chips[img_path] = image_chips[0]
+                        if chip_cache is not None:
+                            chip_cache.add(img_path, image_chips[0])
+                            aligned += 1
                     
-                    if encodings:
-                        X.append(encodings[0])  # Берем первое лицо
-                        y.append(label)
-                        processed += 1
+                    batch_paths = [img_path for img_path in batch_paths if img_path in chips]
+                    if not batch_paths:
+                        continue
+                    batch_chips = np.array([chips[img_path] for img_path in batch_paths])
                     
-                except Exception as e:
-                    print(f"    ❌ Ошибка {file}: {e}")
+                    if augment and executor is not None:
+                        # Пакет делится между процессами, пока основной готовит следующий
+                        chunk = -(-len(batch_paths) // workers)
+                        pending.append((batch_paths, batch_chips, [
+                            executor.submit(encode_augmented_chips, batch_chips[i:i + chunk], num_jitters, flip)
+                            for i in range(0, len(batch_paths), chunk)
+                        ]))
+                        if len(pending) >= max_in_flight:
+                            encoded.extend(collect(augment))
+                        continue
+                    
+                    try:
+                        encoded.extend(zip(batch_paths, encode_batch(batch_chips, augment)))
+                    except Exception as e:
+                        print(f"    ⚠️  Ошибка пакета из {len(batch_paths)} фото, повтор по одному: {e}")
+                        encoded.extend(encode_each(batch_paths, batch_chips, augment))
+                
+                while pending:
+                    encoded.extend(collect(augment))
+                
+                for img_path, encoding in encoded:
+                    X.append(encoding)
+                    y.append(label)
+                    w.append(weights.get(img_path, 1.0))
+                    processed += 1
+                
+                costs[augment][0] += time.perf_counter() - started
+                costs[augment][1] += processed
+                print(f"    ✅ Обработано фото: {processed}")
             
-            print(f"    ✅ Обработано фото: {processed}")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        
+        print(f"\n⏱️  Время на фото:")
+        for augmented, (seconds, count) in costs.items():
+            if count:
+                kind = f"с искажениями ({passes} проходов сети)" if augmented else "без искажений"
+                print(f"  {kind}: {seconds / count * 1000:.1f} мс ({count} фото)")
+        
+        if chip_cache is not None:
+            chip_cache.prune()
+            chip_cache.save()
+            print(f"\n🧩 Вырезки лиц: {len(chip_cache)} в кэше, построено заново: {aligned}")
+        
+        if skipped:
+            details = ", ".join(f"{status}: {count}" for status, count in sorted(skipped.items()))
+            print(f"\n⚠️  Пропущено фото по качеству: {sum(skipped.values())} ({details})")
         
         X_array = np.array(X)
         y_array = np.array(y)
+        w_array = np.array(w)
         
         print(f"\n📈 Итоговая статистика:")
         print(f"  Всего эмбеддингов: {len(X_array)}")
@@ -75,17 +223,33 @@ class FaceTrainer:
         unique_labels = np.unique(y_array)
         for label in unique_labels:
             count = np.sum(y_array == label)
-            name = self.config.LABELS.get(label, f"Class_{label}")
+            name = self.labels.get_name(label)
             print(f"  {name}: {count} эмбеддингов")
         
         # Сохраняем эмбеддинги
-        with open(self.config.EMBEDDINGS_FILE, 'wb') as f:
-            pickle.dump((X_array, y_array), f)
+        self.store.replace(X_array, y_array, w_array)
         
         print(f"💾 Эмбеддинги сохранены в: {self.config.EMBEDDINGS_FILE}")
         
         return X_array, y_array
     
+    def load_training_embeddings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Загрузка эмбеддингов для обучения: датасет + внешние негативы
+        
+        Returns:
+            tuple: (эмбеддинги, метки, веса)
+        """
+        X, y, w = self.store.load(with_weights=True)
+        if self.external_store.exists():
+            X_ext, y_ext, w_ext = self.external_store.load(with_weights=True)
+            if len(X_ext):
+                print(f"  + {len(X_ext)} эмбеддингов из {self.external_store.path}")
+                X = np.concatenate([X, X_ext]) if len(X) else X_ext
+                y = np.concatenate([y, y_ext]) if len(y) else y_ext
+                w = np.concatenate([w, w_ext]) if len(w) else w_ext
+        return X, y, w
+    
     def train_classifier(self) -> Optional[SVC]:
         """
         Обучение SVM классификатора
@@ -96,20 +260,19 @@ class FaceTrainer:
         print("🎓 Обучение SVM классификатора...")
         
         # Загружаем эмбеддинги
-        if not os.path.exists(self.config.EMBEDDINGS_FILE):
+        if not (self.store.exists() or self.external_store.exists()):
             print("❌ Файл с эмбеддингами не найден")
             return None
         
-        with open(self.config.EMBEDDINGS_FILE, 'rb') as f:
-            X, y = pickle.load(f)
+        X, y, w = self.load_training_embeddings()
         
         if len(X) < 10:
             print("❌ Недостаточно данных для обучения")
             return None
         
         # Разделяем на обучающую и тестовую выборки
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+        X_train, X_test, y_train, y_test, w_train, _ = train_test_split(
+            X, y, w, test_size=0.2, random_state=42, stratify=y
         )
         
         print(f"  Размер обучающей выборки: {len(X_train)}")
@@ -122,7 +285,7 @@ class FaceTrainer:
             class_weight='balanced'
         )
         
-        clf.fit(X_train, y_train)
+        clf.fit(X_train, y_train, sample_weight=w_train)
         
         # Оцениваем модель
         y_pred = clf.predict(X_test)
@@ -132,15 +295,13 @@ class FaceTrainer:
         print(f"  Точность: {accuracy:.2%}")
         
         # Подробный отчет
-        target_names = [self.config.LABELS.get(i, f"Class_{i}") 
-                       for i in np.unique(y)]
+        target_names = [self.labels.get_name(i) for i in np.unique(y)]
         report = classification_report(y_test, y_pred, 
                                       target_names=target_names)
         print(f"\nОтчет классификации:\n{report}")
         
         # Сохраняем модель
-        with open(self.config.CLASSIFIER_FILE, 'wb') as f:
-            pickle.dump(clf, f)
+        self.registry.write_atomic(self.config.CLASSIFIER_FILE, clf)
         
         print(f"💾 Модель сохранена в: {self.config.CLASSIFIER_FILE}")
         
@@ -156,35 +317,36 @@ class FaceTrainer:
         print("🎯 Вычисление центроидов...")
         
         # Загружаем эмбеддинги
-        if not os.path.exists(self.config.EMBEDDINGS_FILE):
+        if not (self.store.exists() or self.external_store.exists()):
             print("❌ Файл с эмбеддингами не найден")
             return None, None
         
-        with open(self.config.EMBEDDINGS_FILE, 'rb') as f:
-            X, y = pickle.load(f)
+        X, y, w = self.load_training_embeddings()
         
         # Вычисляем центроиды для каждого класса
         centroids: Dict[int, np.ndarray] = {}
         label_names: Dict[int, str] = {}
+        counts: Dict[int, float] = {}
         
         unique_labels = np.unique(y)
         for label in unique_labels:
             # Эмбеддинги данного класса
-            class_embeddings = X[y == label]
+            mask = y == label
+            class_embeddings = X[mask]
             
-            # Вычисляем центроид (среднее значение)
-            centroid = class_embeddings.mean(axis=0)
+            # Вычисляем центроид (взвешенное среднее: дубликаты не перетягивают его)
+            centroid = np.average(class_embeddings, axis=0, weights=w[mask])
             centroids[label] = centroid
+            counts[label] = float(w[mask].sum())
             
             # Сохраняем имя класса
-            name = self.config.LABELS.get(label, f"Class_{label}")
+            name = self.labels.get_name(label)
             label_names[label] = name
             
             print(f"  {name}: центроид вычислен ({len(class_embeddings)} эмбеддингов)")
         
         # Сохраняем центроиды
-        with open(self.config.CENTROIDS_FILE, 'wb') as f:
-            pickle.dump((centroids, label_names), f)
+        self.registry.write_atomic(self.config.CENTROIDS_FILE, (centroids, label_names, counts))
         
         print(f"💾 Центроиды сохранены в: {self.config.CENTROIDS_FILE}")
         
@@ -202,27 +364,32 @@ class FaceTrainer:
         print("=" * 50)
         
         try:
-            # 1. Извлечение эмбеддингов
-            X, y = self.extract_embeddings()
-            
-            if len(X) == 0:
-                print("❌ Нет данных для обучения")
-                return False
-            
-            # 2. Вычисление центроидов
-            centroids, label_names = self.compute_centroids()
-            
-            if centroids is None:
-                print("❌ Не удалось вычислить центроиды")
-                return False
-            
-            # 3. Обучение SVM (опционально)
-            if len(np.unique(y)) >= 2:  # SVM нужны минимум 2 класса
-                clf = self.train_classifier()
-                if clf is None:
-                    print("⚠️  SVM не обучен, но центроиды готовы")
-                else:
-                    print("✅ SVM успешно обучен")
+            # Онлайн-добавление (OnlineEnroller) ждет окончания обучения
+            with self.registry.lock():
+                # 1. Извлечение эмбеддингов
+                X, y = self.extract_embeddings()
+                
+                if len(X) == 0:
+                    print("❌ Нет данных для обучения")
+                    return False
+                
+                # 2. Вычисление центроидов
+                centroids, label_names = self.compute_centroids()
+                
+                if centroids is None:
+                    print("❌ Не удалось вычислить центроиды")
+                    return False
+                
+                # 3. Обучение SVM (опционально)
+                if len(np.unique(y)) >= 2:  # SVM нужны минимум 2 класса
+                    clf = self.train_classifier()
+                    if clf is None:
+                        print("⚠️  SVM не обучен, но центроиды готовы")
+                    else:
+                        print("✅ SVM успешно обучен")
+                
+                # 4. Публикация новой версии для работающих распознавателей
+                self.registry.publish()
             
             print("\n✅ Обучение завершено успешно!")
             return True
@@ -0,0 +1,77 @@
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+
+class UIUpdateBus:
+    """
+    Шина обновлений GUI
+
+    Рабочие потоки не обращаются к Tk напрямую, а публикуют сюда состояние:
+    последний кадр, значения виджетов (FPS, счетчики), строки логов и разовые
+    вызовы. Главный поток периодически забирает все накопленное через drain().
+    Кадры и значения схлопываются - при отставании GUI берется только последнее.
+    """
+
+    def __init__(self, max_log_lines: int = 500):
+        """
+        Args:
+            max_log_lines: Максимум строк каждого лога между двумя проходами
+                           (более старые строки отбрасываются)
+        """
+        self._lock = threading.Lock()
+        self._frame: Optional[np.ndarray] = None
+        self._values: Dict[str, Any] = {}
+        self._logs: Dict[str, Deque[str]] = {}
+        self._calls: Deque[Callable[[], None]] = deque()
+        self.max_log_lines = max_log_lines
+        self.dropped_frames = 0
+
+    def post_frame(self, frame: np.ndarray) -> None:
+        """Публикация кадра видео (неотрисованный предыдущий кадр отбрасывается)"""
+        with self._lock:
+            if self._frame is not None:
+                self.dropped_frames += 1
+            self._frame = frame
+
+    def post_value(self, key: str, value: Any) -> None:
+        """Публикация значения виджета (сохраняется только последнее)"""
+        with self._lock:
+            self._values[key] = value
+
+    def post_log(self, target: str, line: str) -> None:
+        """Добавление строки в лог target"""
+        with self._lock:
+            log = self._logs.get(target)
+            if log is None:
+                log = deque(maxlen=self.max_log_lines)
+                self._logs[target] = log
+            log.append(line)
+
+    def call(self, callback: Callable[[], None]) -> None:
+        """Выполнение callback в главном потоке при следующем проходе"""
+        with self._lock:
+            self._calls.append(callback)
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Получение всех накопленных обновлений (вызывается из главного потока)
+
+        Returns:
+            dict: {"frame": последний кадр или None, "values": {ключ: значение},
+                   "logs": {лог: [строки]}, "calls": [callback]}
+        """
+        with self._lock:
+            update: Dict[str, Any] = {
+                "frame": self._frame,
+                "values": self._values,
+                "logs": {target: list(lines) for target, lines in self._logs.items() if lines},
+                "calls": list(self._calls),
+            }
+            self._frame = None
+            self._values = {}
+            self._logs.clear()
+            self._calls.clear()
+        return update
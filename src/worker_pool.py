@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+# Типы задач протокола: путь к файлу, байты закодированного изображения,
+# кадр в разделяемой памяти (имя блока, форма, тип)
+TASK_PATH = "path"
+TASK_BYTES = "bytes"
+TASK_FRAME = "frame"
+
+# Состояние процесса-исполнителя (создается один раз в инициализаторе)
+_worker_processor: Optional[Any] = None
+
+
+def _init_worker(base_dir: str, use_svm: bool) -> None:
+    """Инициализатор процесса пула: импорт face_recognition и загрузка модели"""
+    global _worker_processor
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+
+    from src.face_recognizer import FaceRecognizer
+    from src.file_processor import FileProcessor
+
+    _worker_processor = FileProcessor(FaceRecognizer(use_svm=use_svm))
+
+
+def _decode_task(kind: str, payload: Any) -> Tuple[np.ndarray, str]:
+    """Получение изображения из задачи: (изображение BGR, имя источника)"""
+    import cv2
+
+    if kind == TASK_PATH:
+        image = cv2.imread(payload)
+        if image is None:
+            raise ValueError(f"Не удалось загрузить изображение: {payload}")
+        return image, payload
+    if kind == TASK_BYTES:
+        data, name = payload
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Не удалось декодировать изображение: {name}")
+        return image, name
+    if kind == TASK_FRAME:
+        shm_name, shape, dtype, name = payload
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            image = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+        return image, name
+    raise ValueError(f"Неизвестный тип задачи: {kind}")
+
+
+def _run_task(kind: str, payload: Any, save_result: bool) -> Dict[str, Any]:
+    """Выполнение задачи в процессе пула"""
+    processor = _worker_processor
+    # Модель подхватывается без перезапуска пула, если опубликована новая версия
+    processor.recognizer.refresh_if_updated()
+
+    image, name = _decode_task(kind, payload)
+    _, results = processor.process_image(image, name, save_result=save_result)
+    return {
+        "source": name,
+        "results": results,
+        "model_version": processor.recognizer.model.version,
+    }
+
+
+def _warmup() -> int:
+    """Пустая задача: дожидается инициализации процесса"""
+    # Короткая пауза, чтобы каждая задача прогрева досталась своему процессу
+    time.sleep(0.2)
+    return os.getpid()
+
+
+class RecognitionWorkerPool:
+    """
+    Долгоживущий пул процессов распознавания
+
+    Каждый процесс один раз импортирует face_recognition/dlib, загружает
+    каскад и модель и затем обрабатывает сколько угодно задач: путь к файлу,
+    байты изображения или кадр, переданный через разделяемую память (без
+    сериализации пикселей). Новая версия модели подхватывается процессами
+    автоматически (FaceRecognizer.refresh_if_updated).
+    """
+
+    def __init__(self, workers: Optional[int] = None, use_svm: bool = False):
+        """
+        Args:
+            workers: Число процессов (по умолчанию Config.RECOGNITION_WORKERS)
+            use_svm: Использовать SVM-классификатор
+        """
+        from config import Config
+        self.config = Config
+        self.workers = workers or Config.RECOGNITION_WORKERS
+        # spawn: процессы не наследуют потоки GUI и одинаково работают в Windows и Linux
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(Config.BASE_DIR, use_svm),
+        )
+
+    def warmup(self) -> None:
+        """Запуск всех процессов и загрузка в них модели"""
+        pids = {future.result() for future in [self.executor.submit(_warmup) for _ in range(self.workers)]}
+        print(f"✅ Пул распознавания готов: {len(pids)} процессов")
+
+    def submit_path(self, image_path: str, save_result: bool = True) -> Future:
+        """Распознавание файла изображения"""
+        return self.executor.submit(_run_task, TASK_PATH, image_path, save_result)
+
+    def submit_bytes(self, data: bytes, name: str = "image.jpg", save_result: bool = True) -> Future:
+        """Распознавание закодированного изображения (JPEG/PNG) из памяти"""
+        return self.executor.submit(_run_task, TASK_BYTES, (data, name), save_result)
+
+    def submit_frame(self, frame: np.ndarray, name: str = "frame.jpg", save_result: bool = False) -> Future:
+        """Распознавание кадра через разделяемую память"""
+        shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[...] = frame
+        payload = (shm.name, frame.shape, frame.dtype.str, name)
+        future = self.executor.submit(_run_task, TASK_FRAME, payload, save_result)
+
+        def release(_: Future) -> None:
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(release)
+        return future
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Остановка пула"""
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Замер времени запуска приложения
+
+Для каждого модуля запускается отдельный интерпретатор с -X importtime,
+выводятся самые дорогие импорты и проверяется, что модули интерфейса не
+тянут за собой тяжелые библиотеки (OpenCV, dlib, face_recognition,
+scikit-learn).
+С флагом --window дополнительно замеряется время до появления окна и до
+готовности модели (нужен дисплей).
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from typing import List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Модули, которые не должны импортироваться до появления окна
+HEAVY_MODULES = ("cv2", "dlib", "face_recognition", "face_recognition_models", "sklearn", "tqdm")
+
+# Модули пути запуска: (модуль, должен ли он быть легким)
+STARTUP_MODULES = [
+    ("main", True),
+    ("src.gui_app", True),
+    ("src.face_recognizer", False),
+]
+
+WINDOW_SCRIPT = """
+import time
+started = time.perf_counter()
+from src.gui_app import FaceRecognitionApp
+app = FaceRecognitionApp()
+app.update()
+window = time.perf_counter() - started
+while not app.model_ready.is_set():
+    app.update()
+    time.sleep(0.01)
+ready = time.perf_counter() - started
+print(f"{window:.3f} {ready:.3f}")
+app.on_closing()
+"""
+
+
+def measure_imports(module: str) -> List[Tuple[int, int, str]]:
+    """
+    Импорт модуля в отдельном процессе с -X importtime
+
+    Returns:
+        list: (собственное время мкс, накопленное время мкс, имя модуля)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr[-2000:]}")
+
+    rows: List[Tuple[int, int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def measure_window() -> Tuple[float, float]:
+    """Время до появления окна и до готовности модели (сек)"""
+    result = subprocess.run(
+        [sys.executable, "-c", WINDOW_SCRIPT],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось запустить окно:\n{result.stderr[-2000:]}")
+    window, ready = result.stdout.strip().splitlines()[-1].split()
+    return float(window), float(ready)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер времени запуска")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых дорогих импортов показать")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="максимальное время импорта легких модулей (мс)")
+    parser.add_argument("--window", action="store_true",
+                        help="замерить время до появления окна (нужен дисплей)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ВРЕМЯ ЗАПУСКА")
+    print("=" * 60)
+
+    failed = False
+    for module, must_be_light in STARTUP_MODULES:
+        rows = measure_imports(module)
+        total_ms = next((cumulative for _, cumulative, name in rows if name == module), 0) / 1000
+        print(f"\n📦 import {module}: {total_ms:.1f} мс")
+
+        for self_us, cumulative_us, name in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} мс  (собственное {self_us / 1000:6.1f})  {name}")
+
+        if not must_be_light:
+            continue
+        heavy = sorted({name for _, _, name in rows if name.split(".")[0] in HEAVY_MODULES})
+        if heavy:
+            print(f"❌ {module} импортирует тяжелые модули: {', '.join(heavy)}")
+            failed = True
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            print(f"❌ {module}: {total_ms:.1f} мс больше бюджета {args.budget_ms:.1f} мс")
+            failed = True
+
+    if args.window:
+        window, ready = measure_window()
+        print(f"\n🪟 Окно появилось через {window:.2f} с, модель готова через {ready:.2f} с")
+
+    print("\n" + ("❌ Есть регрессии времени запуска" if failed else "✅ Путь запуска в порядке"))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()